@@ -0,0 +1,81 @@
+"""Overdue detection and aging buckets for installments.
+
+Pending installments whose due date has passed are moved to 'Overdue' with a
+range scan on idx_installments_status_due, so each run only touches rows that
+fell due since the last one. installment_aging then holds one row per bucket
+counted from the overdue rows alone, so collection figures never scan paid
+or future installments.
+"""
+
+# (bucket, first day overdue, last day overdue or None for open-ended)
+AGING_BUCKETS = (
+    ('1-30', 1, 30),
+    ('31-60', 31, 60),
+    ('61-90', 61, 90),
+    ('90+', 91, None),
+)
+
+def create_aging_table(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS installment_aging (
+            bucket TEXT PRIMARY KEY,
+            min_days INTEGER NOT NULL,
+            max_days INTEGER,
+            installment_count INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            as_of DATE
+        ) WITHOUT ROWID
+    ''')
+    c.executemany('''
+        INSERT OR IGNORE INTO installment_aging (bucket, min_days, max_days)
+        VALUES (?, ?, ?)
+    ''', AGING_BUCKETS)
+
+def sales_falling_due(c, as_of):
+    """Ids of sales that mark_overdue(as_of) would touch"""
+    rows = c.execute('''
+        SELECT DISTINCT sale_id FROM installments
+        WHERE status = 'Pending' AND due_date < date(?)
+    ''', (as_of,)).fetchall()
+    return [row[0] for row in rows]
+
+def mark_overdue(c, as_of):
+    """Move pending installments due before as_of to 'Overdue'; returns the count"""
+    c.execute('''
+        UPDATE installments
+        SET status = 'Overdue'
+        WHERE status = 'Pending' AND due_date < date(?)
+    ''', (as_of,))
+    return c.rowcount
+
+def refresh_aging(c, as_of):
+    """Recount every bucket from the overdue installments as of a date"""
+    c.execute('''
+        WITH overdue AS (
+            SELECT
+                CAST(julianday(date(:as_of)) - julianday(due_date) AS INTEGER) AS days,
+                amount - paid_amount AS amount
+            FROM installments
+            WHERE status = 'Overdue'
+        )
+        UPDATE installment_aging
+        SET installment_count = (
+                SELECT COUNT(*) FROM overdue
+                WHERE days >= installment_aging.min_days
+                AND (installment_aging.max_days IS NULL OR days <= installment_aging.max_days)
+            ),
+            total_amount = (
+                SELECT COALESCE(SUM(amount), 0) FROM overdue
+                WHERE days >= installment_aging.min_days
+                AND (installment_aging.max_days IS NULL OR days <= installment_aging.max_days)
+            ),
+            as_of = date(:as_of)
+    ''', {'as_of': as_of})
+
+def get_aging(c):
+    rows = c.execute('''
+        SELECT bucket, min_days, max_days, installment_count, total_amount, as_of
+        FROM installment_aging
+        ORDER BY min_days
+    ''').fetchall()
+    return [dict(row) for row in rows]
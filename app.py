@@ -0,0 +1,448 @@
+import functools
+import hashlib
+import io
+import os
+from datetime import datetime, timezone
+from flask import (Flask, Response, jsonify, make_response, request,
+                   render_template, stream_with_context)
+from models import (Database, ProductModel, CustomerModel, SaleModel,
+                    InstallmentModel, DashboardModel, SettingsModel)
+import importer
+import exporter
+import inventory
+import plan_engine
+import receipts
+import reports
+
+app = Flask(__name__)
+
+_db = None
+# Extra Database arguments for this process, e.g. a worker's pool size
+_db_options = {}
+
+def get_db():
+    """Return this process's Database, creating its connection pool on first use"""
+    global _db
+    if _db is None:
+        options = {'storage_profile': os.environ.get('SALES_DB_PROFILE', 'durable')}
+        options.update(_db_options)
+        _db = Database(**options)
+    return _db
+
+def close_db():
+    """Close this process's connection pool; the next get_db() opens a new one"""
+    global _db
+    if _db is not None:
+        _db.close()
+        _db = None
+
+def configure_db(**options):
+    """Set Database arguments for this process, reopening it on next use"""
+    close_db()
+    _db_options.update(options)
+
+def get_field(data, name, camel_name):
+    """Read a payload field sent either in snake_case or camelCase"""
+    return data[name] if name in data else data.get(camel_name)
+
+def page_args():
+    """Common keyset pagination query parameters"""
+    return {
+        'limit': request.args.get('limit', type=int),
+        'after_id': request.args.get('after_id', type=int),
+        'view': request.args.get('view', 'list'),
+        'with_total': request.args.get('total') in ('1', 'true'),
+        'sort': request.args.get('sort') or None,
+        'descending': request.args.get('desc') in ('1', 'true'),
+        'after_value': request.args.get('after_value')
+    }
+
+def cache_validators(tables, full_path):
+    """ETag and Last-Modified for a URL whose response depends only on tables"""
+    versions = get_db().get_table_versions(tables)
+    etag = hashlib.sha1((full_path + repr(sorted(versions.items()))).encode()).hexdigest()
+    last_modified = max(
+        datetime.strptime(changed_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        for _, changed_at in versions.values()
+    )
+    return etag, last_modified
+
+def not_modified(etag, last_modified, if_none_match, if_modified_since):
+    """Whether a client's copy is current; if_none_match is a werkzeug ETags"""
+    # If-None-Match wins; Last-Modified only has one-second resolution
+    if if_none_match:
+        return if_none_match.contains(etag)
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+def stream_chunks(chunks, **response_args):
+    """Stream a generator of chunks as the response.
+
+    The first chunk is pulled now so bad arguments become a 400, not a
+    broken stream; headers that depend on the arguments are set on the
+    returned response once that has passed.
+    """
+    first = next(chunks)
+
+    def generate():
+        yield first
+        yield from chunks
+
+    return Response(stream_with_context(generate()), **response_args)
+
+def conditional(*tables):
+    """Answer a GET with 304 Not Modified while the tables behind it are unchanged.
+
+    The ETag hashes the request URL with the tables' change counters and
+    Last-Modified is their latest change, so revalidation costs one primary
+    key lookup instead of running the query and encoding JSON.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = cache_validators(tables, request.full_path)
+            if not_modified(etag, last_modified, request.if_none_match, request.if_modified_since):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+@app.errorhandler(ValueError)
+def handle_value_error(error):
+    return jsonify({'error': str(error)}), 400
+
+@app.errorhandler(inventory.InsufficientStockError)
+def handle_insufficient_stock(error):
+    return jsonify({'error': str(error), 'available': error.available}), 409
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+# Products
+@app.route('/api/products', methods=['GET'])
+@conditional('products')
+def list_products():
+    page = ProductModel(get_db()).get_products_page(
+        search_term=request.args.get('search') or None,
+        after_rank=request.args.get('after_rank', type=float),
+        **page_args()
+    )
+    return jsonify(page)
+
+@app.route('/api/products', methods=['POST'])
+def create_product():
+    data = request.get_json()
+    product_id = ProductModel(get_db()).add_product({
+        'name': data['name'],
+        'brand': data['brand'],
+        'model': data['model'],
+        'category': data['category'],
+        'price': data['price'],
+        'stock': data['stock'],
+        'description': data.get('description', ''),
+        'features': data.get('features', []),
+        'tags': data.get('tags', [])
+    })
+    return jsonify({'id': product_id}), 201
+
+# Stock held while a sale form is open; pass its id with the sale as reservation_id
+@app.route('/api/products/<int:product_id>/reservations', methods=['POST'])
+def reserve_stock(product_id):
+    data = request.get_json(silent=True) or {}
+    model = ProductModel(get_db())
+    if model.get_available_stock(product_id) is None:
+        return jsonify({'error': 'Product not found'}), 404
+    reservation = model.reserve_stock(
+        product_id, int(data.get('quantity', 1)),
+        int(data.get('ttl', inventory.DEFAULT_RESERVATION_TTL))
+    )
+    return jsonify(reservation), 201
+
+@app.route('/api/reservations/<int:reservation_id>', methods=['DELETE'])
+def release_reservation(reservation_id):
+    if not ProductModel(get_db()).release_reservation(reservation_id):
+        return jsonify({'error': 'Reservation not found'}), 404
+    return jsonify({'success': True})
+
+# Bulk import: upload a CSV/JSONL file as multipart 'file' or as the raw body
+@app.route('/api/import/<entity>', methods=['POST'])
+def bulk_import(entity):
+    upload = request.files.get('file')
+    if upload is not None:
+        binary = upload.stream
+        file_format = request.args.get('format') or importer.detect_format(upload.filename)
+    else:
+        binary = request.stream
+        file_format = request.args.get('format', 'csv')
+
+    stream = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+    report = importer.import_file(
+        get_db(), entity, stream, file_format,
+        chunk_size=request.args.get('chunk_size', importer.DEFAULT_CHUNK_SIZE, type=int)
+    )
+    return jsonify(report)
+
+# Streaming export: /api/export/sales.csv, /api/export/installments.jsonl, ...
+@app.route('/api/export/<entity>.<file_format>', methods=['GET'])
+def export(entity, file_format):
+    start_date = request.args.get('start_date') or None
+    end_date = request.args.get('end_date') or None
+    response = stream_chunks(
+        exporter.export_chunks(get_db(), entity, file_format, start_date, end_date)
+    )
+    response.mimetype = exporter.CONTENT_TYPES[file_format]
+    response.headers['Content-Disposition'] = f'attachment; filename={entity}.{file_format}'
+    return response
+
+# Streaming reports: /api/reports/sales.html, /api/reports/customers.csv, ...
+@app.route('/api/reports/<report_type>.<file_format>', methods=['GET'])
+def report(report_type, file_format):
+    response = stream_chunks(reports.report_chunks(
+        get_db(), report_type, file_format,
+        request.args.get('start_date') or None, request.args.get('end_date') or None,
+        low_stock_threshold=request.args.get('low_stock_threshold', 5, type=int)
+    ))
+    response.mimetype = reports.CONTENT_TYPES[file_format]
+    if file_format == 'csv':
+        response.headers['Content-Disposition'] = f'attachment; filename={report_type}-report.csv'
+    return response
+
+# Receipts and statements rendered on the server
+@app.route('/api/receipts/<int:sale_id>', methods=['GET'])
+@conditional('sales', 'installments', 'customers', 'products', 'settings')
+def receipt(sale_id):
+    db = get_db()
+    sale = receipts.load_sale(db, sale_id)
+    if sale is None:
+        return jsonify({'error': 'Sale not found'}), 404
+    return Response(
+        receipts.render_receipt(
+            sale, SettingsModel(db).get_settings(), request.args.get('kind', 'receipt'),
+            print_on_load=request.args.get('print') in ('1', 'true')
+        ),
+        mimetype='text/html'
+    )
+
+# Month-end bundle: /api/receipts/bundle.html?kind=statement&start_date=...&end_date=...
+@app.route('/api/receipts/bundle.html', methods=['GET'])
+def receipt_bundle():
+    db = get_db()
+    chunks = receipts.iter_bundle(
+        db, SettingsModel(db).get_settings(), request.args.get('kind', 'receipt'),
+        request.args.get('start_date') or None, request.args.get('end_date') or None
+    )
+    return stream_chunks(chunks, mimetype='text/html')
+
+# Customers
+@app.route('/api/customers', methods=['GET'])
+@conditional('customers', 'sales', 'installments')
+def list_customers():
+    page = CustomerModel(get_db()).get_customers_page(
+        search_term=request.args.get('search') or None,
+        after_rank=request.args.get('after_rank', type=float),
+        **page_args()
+    )
+    return jsonify(page)
+
+@app.route('/api/customers/<int:customer_id>/balance', methods=['GET'])
+@conditional('sales', 'installments', 'products')
+def customer_balance(customer_id):
+    return jsonify(CustomerModel(get_db()).get_customer_balance(customer_id))
+
+@app.route('/api/customers/<int:customer_id>/sales', methods=['GET'])
+@conditional('customers', 'sales', 'installments', 'products')
+def customer_sales(customer_id):
+    customer = CustomerModel(get_db()).get_customer_sales(customer_id)
+    if customer is None:
+        return jsonify({'error': 'Customer not found'}), 404
+    return jsonify(customer)
+
+@app.route('/api/customers/merge', methods=['POST'])
+def merge_customers():
+    return jsonify(CustomerModel(get_db()).merge_duplicates())
+
+# Sales
+@app.route('/api/sales/cash', methods=['POST'])
+def create_cash_sale():
+    data = request.get_json()
+    sale_id = SaleModel(get_db()).create_cash_sale({
+        'customer_name': get_field(data, 'customer_name', 'customerName'),
+        'contact_number': get_field(data, 'contact_number', 'contactNumber'),
+        'address': data['address'],
+        'product_id': get_field(data, 'product_id', 'productId'),
+        'quantity': data.get('quantity', 1),
+        'amount': data['amount'],
+        'reservation_id': get_field(data, 'reservation_id', 'reservationId')
+    })
+    return jsonify({'id': sale_id}), 201
+
+@app.route('/api/sales/installment', methods=['POST'])
+def create_installment_sale():
+    data = request.get_json()
+    db = get_db()
+    product_id = get_field(data, 'product_id', 'productId')
+    product = ProductModel(db).get_product(product_id)
+    if product is None:
+        return jsonify({'error': 'Product not found'}), 404
+
+    markup = float(get_field(data, 'markup_percentage', 'markupPercentage') or 0)
+    advance = float(get_field(data, 'advance_payment', 'advancePayment') or 0)
+    count = int(get_field(data, 'installment_count', 'installmentCount'))
+    plan = plan_engine.calculate_plan(product['price'], advance, count, markup)
+
+    # The advance is recorded on the sale itself; only monthly dues are stored
+    installments = [
+        {
+            'number': inst['number'],
+            'amount': inst['amount'],
+            'due_date': inst['due_date'].isoformat(),
+            'remaining_balance': inst['remaining_balance']
+        }
+        for inst in plan['installments'] if inst['status'] == 'Pending'
+    ]
+
+    sale_id = SaleModel(db).create_installment_sale({
+        'customer_name': get_field(data, 'customer_name', 'customerName'),
+        'contact_number': get_field(data, 'contact_number', 'contactNumber'),
+        'cnic': data['cnic'],
+        'address': data['address'],
+        'witness_name': get_field(data, 'witness_name', 'witnessName'),
+        'witness_cnic': get_field(data, 'witness_cnic', 'witnessCnic'),
+        'witness_address': get_field(data, 'witness_address', 'witnessAddress'),
+        'product_id': product_id,
+        'amount': product['price'],
+        'markup_percentage': markup,
+        'total_with_markup': plan['total_with_markup'],
+        'advance_payment': advance,
+        'installment_count': count,
+        'installments': installments,
+        'reservation_id': get_field(data, 'reservation_id', 'reservationId')
+    })
+    return jsonify({'id': sale_id}), 201
+
+@app.route('/api/sales/installment/plans', methods=['POST'])
+def compare_installment_plans():
+    """Price one amount under several markup/tenure options at once"""
+    data = request.get_json()
+    amount = data.get('amount')
+    if amount is None:
+        product = ProductModel(get_db()).get_product(get_field(data, 'product_id', 'productId'))
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 404
+        amount = product['price']
+    advance = float(get_field(data, 'advance_payment', 'advancePayment') or 0)
+    options = [
+        (float(get_field(option, 'markup_percentage', 'markupPercentage') or 0),
+         int(get_field(option, 'installment_count', 'installmentCount')))
+        for option in data.get('options', [])
+    ]
+    if not options:
+        raise ValueError("At least one plan option is required")
+    return jsonify({
+        'amount': amount,
+        'advance_payment': advance,
+        'plans': plan_engine.compare_options(amount, advance, options)
+    })
+
+# Installments
+@app.route('/api/installments', methods=['GET'])
+@conditional('installments', 'sales', 'customers', 'products')
+def list_installments():
+    status = request.args.get('status')
+    args = page_args()
+    page = InstallmentModel(get_db()).get_installments_page(
+        status=status.title() if status else None,
+        search_term=request.args.get('search') or None,
+        after_due_date=request.args.get('after_due_date'),
+        **args
+    )
+    return jsonify(page)
+
+@app.route('/api/installments/<int:sale_id>/<int:installment_number>/pay', methods=['POST'])
+def pay_installment(sale_id, installment_number):
+    InstallmentModel(get_db()).mark_installment_paid(sale_id, installment_number)
+    return jsonify({'success': True})
+
+@app.route('/api/installments/payments', methods=['POST'])
+def post_installment_payments():
+    """Post a batch of (possibly partial) payments in one transaction"""
+    data = request.get_json(silent=True)
+    payments = data.get('payments') if isinstance(data, dict) else None
+    if not isinstance(payments, list) or not payments:
+        raise ValueError("payments must be a non-empty list of payment objects")
+    # Anything that is not an object is reported as a failed item of the batch
+    items = [
+        {
+            'sale_id': get_field(item, 'sale_id', 'saleId'),
+            'installment_number': get_field(item, 'installment_number', 'installmentNumber'),
+            'amount': item.get('amount')
+        } if isinstance(item, dict) else item
+        for item in payments
+    ]
+    result = InstallmentModel(get_db()).post_payments(
+        items,
+        paid_date=get_field(data, 'paid_date', 'paidDate'),
+        all_or_nothing=bool(get_field(data, 'all_or_nothing', 'allOrNothing'))
+    )
+    return jsonify(result)
+
+@app.route('/api/installments/aging', methods=['GET'])
+def installment_aging():
+    return jsonify(InstallmentModel(get_db()).get_aging_summary())
+
+@app.route('/api/installments/aging/refresh', methods=['POST'])
+def refresh_installment_aging():
+    model = InstallmentModel(get_db())
+    result = model.refresh_overdue()
+    return jsonify(dict(result, **model.get_aging_summary()))
+
+# Reports
+@app.route('/api/reports/summary', methods=['GET'])
+@conditional('sales')
+def sales_summary():
+    rows = SaleModel(get_db()).get_sales_summary(
+        request.args.get('start_date') or None,
+        request.args.get('end_date') or None
+    )
+    totals = {row['sale_type']: row['total_amount'] or 0 for row in rows}
+    return jsonify({
+        'cash_sales': totals.get('cash', 0),
+        'installment_sales': totals.get('installment', 0),
+        'by_type': rows
+    })
+
+# Dashboard
+DASHBOARD_TABLES = ('sales', 'installments', 'products', 'customers')
+
+@app.route('/api/dashboard', methods=['GET'])
+@conditional(*DASHBOARD_TABLES)
+def dashboard():
+    return jsonify(DashboardModel(get_db()).get_dashboard(
+        low_stock_threshold=request.args.get('low_stock_threshold', 5, type=int)
+    ))
+
+# Cache statistics
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(get_db().get_cache_stats())
+
+# Settings
+@app.route('/api/settings', methods=['GET'])
+@conditional('settings')
+def get_settings():
+    return jsonify(SettingsModel(get_db()).get_settings() or {})
+
+@app.route('/api/settings', methods=['POST'])
+def update_settings():
+    data = request.get_json()
+    SettingsModel(get_db()).update_settings({
+        'business_name': get_field(data, 'business_name', 'businessName'),
+        'business_address': get_field(data, 'business_address', 'businessAddress'),
+        'business_phone': get_field(data, 'business_phone', 'businessPhone')
+    })
+    return jsonify({'success': True})
@@ -0,0 +1,274 @@
+"""ASGI entry point: the web API on asyncio with the database on an executor.
+
+Requests are accepted by the event loop, so idle keep-alive clients only
+cost a socket. Blocking work never runs on the loop: model calls go through
+a DatabaseExecutor, a thread pool sized to the connection pool. The
+dashboard is served natively so its three independent reads run at once.
+Every other route is the Flask application, run one request per executor
+thread, so both servers share one set of handlers and responses;
+uploads and streamed exports are relayed chunk by chunk.
+
+Serve with `run.py serve --asgi` (gunicorn with uvicorn workers) or any
+ASGI server as `asgi:application`, configured from SALES_DB_THREADS.
+"""
+import asyncio
+import functools
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.http import http_date, parse_date, parse_etags
+
+import app as web
+import server
+from models import DashboardModel
+
+DEFAULT_DB_THREADS = 8
+
+# Chunks a streamed response may buffer before its producer thread waits
+STREAM_BUFFER = 8
+
+class DatabaseExecutor:
+    """Runs blocking model calls on a thread pool for the event loop"""
+
+    def __init__(self, max_workers=DEFAULT_DB_THREADS):
+        self.max_workers = max_workers
+        self._executor = None
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='db')
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin1')
+    return None
+
+def _full_path(scope):
+    # Matches Flask's request.full_path, so both servers give the same ETags
+    return scope['path'] + '?' + scope['query_string'].decode('latin1')
+
+class RequestBody(io.RawIOBase):
+    """wsgi.input that pulls the request body from receive() as it is read.
+
+    Reads happen on the executor thread and wait for the event loop to hand
+    over the next message, so an upload streams through to the handler
+    instead of being held in memory whole.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._chunk = b''
+        self._offset = 0
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._offset == len(self._chunk):
+            if not self._more:
+                return 0
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                raise OSError('Client disconnected before sending the whole request body')
+            self._chunk = message.get('body', b'')
+            self._offset = 0
+            self._more = message.get('more_body', False)
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+def _wsgi_environ(scope, body):
+    host, port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': host,
+        'SERVER_PORT': str(port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # The body ends where the client's last message does, with or
+        # without a content-length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1')
+        value = value.decode('latin1')
+        if name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+            continue
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+            continue
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class Application:
+    def __init__(self, db_threads=None, overdue_interval=None):
+        self.db_threads = db_threads or int(
+            os.environ.get('SALES_DB_THREADS', DEFAULT_DB_THREADS)
+        )
+        self.overdue_interval = overdue_interval or float(
+            os.environ.get('SALES_OVERDUE_INTERVAL', 3600)
+        )
+        self.db = DatabaseExecutor(self.db_threads)
+        self.routes = {('GET', '/api/dashboard'): self.dashboard}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            handler = self.routes.get((scope['method'], scope['path']), self.call_flask)
+            await handler(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # One connection per executor thread plus one for the writer thread,
+                # which also runs the overdue job's writes
+                web.configure_db(pool_size=self.db_threads + 1)
+                self.db.start()
+                db = await self.db.run(web.get_db)
+                server.start_overdue_job(db.db_file, self.overdue_interval)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                server.stop_overdue_job()
+                self.db.shutdown()
+                web.close_db()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, send, status, body=b'', headers=()):
+        headers = [(name.encode('latin1'), value.encode('latin1')) for name, value in headers]
+        headers.append((b'content-length', str(len(body)).encode('latin1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def dashboard(self, scope, receive, send):
+        etag, last_modified = await self.db.run(
+            web.cache_validators, web.DASHBOARD_TABLES, _full_path(scope)
+        )
+        validators = [
+            ('etag', f'"{etag}"'),
+            ('last-modified', http_date(last_modified)),
+            ('cache-control', 'no-cache')
+        ]
+        if web.not_modified(
+            etag, last_modified,
+            parse_etags(_header(scope, b'if-none-match')),
+            parse_date(_header(scope, b'if-modified-since'))
+        ):
+            await self.respond(send, 304, headers=validators)
+            return
+
+        query = parse_qs(scope['query_string'].decode('latin1'))
+        try:
+            low_stock_threshold = int(query.get('low_stock_threshold', ['5'])[0])
+        except ValueError:
+            low_stock_threshold = 5
+
+        model = DashboardModel(web.get_db())
+        totals, recent_sales, upcoming_installments = await asyncio.gather(
+            self.db.run(model.get_dashboard_totals, low_stock_threshold),
+            self.db.run(model.get_recent_sales),
+            self.db.run(model.get_upcoming_installments)
+        )
+        body = web.app.json.dumps(dict(
+            totals, recent_sales=recent_sales, upcoming_installments=upcoming_installments
+        ), separators=(',', ':'))
+        await self.respond(send, 200, body.encode('utf-8'),
+                           [('content-type', 'application/json')] + validators)
+
+    async def call_flask(self, scope, receive, send):
+        """Run the request through the Flask app on one executor thread.
+
+        The request body is read from receive() as the handler consumes it.
+        The thread hands the status and each body chunk to the loop through
+        a bounded queue, so a slow client holds back a large export instead
+        of buffering it.
+        """
+        loop = asyncio.get_running_loop()
+        environ = _wsgi_environ(scope, io.BufferedReader(RequestBody(receive, loop)))
+        queue = asyncio.Queue(STREAM_BUFFER)
+        cancelled = False
+
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def produce():
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started.append((int(status.split(' ', 1)[0]), headers))
+
+            try:
+                result = web.app(environ, start_response)
+                try:
+                    put(('start',) + started[0])
+                    for chunk in result:
+                        if cancelled:
+                            break
+                        if chunk:
+                            put(('body', chunk))
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+            except Exception as e:
+                put(('error', e))
+            put(('end', None))
+
+        producer = asyncio.ensure_future(self.db.run(produce))
+        finished = False
+        try:
+            while True:
+                kind, *payload = await queue.get()
+                if kind == 'start':
+                    status, headers = payload
+                    await send({
+                        'type': 'http.response.start', 'status': status,
+                        'headers': [(k.lower().encode('latin1'), v.encode('latin1'))
+                                    for k, v in headers]
+                    })
+                elif kind == 'body':
+                    await send({'type': 'http.response.body', 'body': payload[0],
+                                'more_body': True})
+                elif kind == 'error':
+                    raise payload[0]
+                else:
+                    finished = True
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+        finally:
+            if not finished:
+                # Client went away: let the producer finish and release its thread
+                cancelled = True
+                while (await queue.get())[0] != 'end':
+                    pass
+            await producer
+
+application = Application()
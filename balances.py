@@ -0,0 +1,75 @@
+"""Per-sale balance ledger for installment sales.
+
+sale_balances keeps one row per installment sale with what has been paid,
+what is still owed, the overdue part and the next due date. Every write that
+changes a sale's installments refreshes that sale's row in the same
+transaction, so "what does this customer owe" reads one row per sale instead
+of aggregating installment rows.
+"""
+
+_BALANCE_SELECT = '''
+    SELECT
+        s.id, s.customer_id, COALESCE(s.total_with_markup, s.amount),
+        COALESCE(s.advance_payment, 0) + COALESCE(SUM(i.paid_amount), 0),
+        ROUND(COALESCE(SUM(i.amount - i.paid_amount), 0), 2),
+        ROUND(COALESCE(SUM(CASE WHEN i.status = 'Overdue'
+                                THEN i.amount - i.paid_amount END), 0), 2),
+        MIN(CASE WHEN i.status != 'Paid' THEN i.due_date END),
+        CURRENT_TIMESTAMP
+    FROM sales s
+    LEFT JOIN installments i ON i.sale_id = s.id
+    WHERE s.sale_type = 'installment'
+'''
+
+_BALANCE_COLUMNS = '''
+    sale_id, customer_id, total_amount, paid_to_date,
+    outstanding_amount, overdue_amount, next_due_date, updated_at
+'''
+
+def create_balance_table(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sale_balances (
+            sale_id INTEGER PRIMARY KEY,
+            customer_id INTEGER NOT NULL,
+            total_amount REAL NOT NULL DEFAULT 0,
+            paid_to_date REAL NOT NULL DEFAULT 0,
+            outstanding_amount REAL NOT NULL DEFAULT 0,
+            overdue_amount REAL NOT NULL DEFAULT 0,
+            next_due_date DATE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales (id)
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sale_balances_customer_id
+        ON sale_balances (customer_id)
+    ''')
+
+def refresh_sales(c, sale_ids):
+    """Recompute the balance rows of the given sales; call inside their transaction"""
+    sale_ids = list(sale_ids)
+    if not sale_ids:
+        return
+    placeholders = ', '.join('?' for _ in sale_ids)
+    c.execute(f'''
+        INSERT INTO sale_balances ({_BALANCE_COLUMNS})
+        {_BALANCE_SELECT} AND s.id IN ({placeholders})
+        GROUP BY s.id
+        ON CONFLICT (sale_id) DO UPDATE SET
+            customer_id = excluded.customer_id,
+            total_amount = excluded.total_amount,
+            paid_to_date = excluded.paid_to_date,
+            outstanding_amount = excluded.outstanding_amount,
+            overdue_amount = excluded.overdue_amount,
+            next_due_date = excluded.next_due_date,
+            updated_at = excluded.updated_at
+    ''', sale_ids)
+
+def rebuild_sale_balances(c):
+    """Recompute every balance row from the installments table"""
+    c.execute('DELETE FROM sale_balances')
+    c.execute(f'''
+        INSERT INTO sale_balances ({_BALANCE_COLUMNS})
+        {_BALANCE_SELECT}
+        GROUP BY s.id
+    ''')
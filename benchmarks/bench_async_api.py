@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Load test of the sync (gunicorn) and ASGI (uvicorn) servers on the same database.
+
+Each run holds --idle connections open without sending, while --clients
+connections send requests back to back for --seconds. A sync worker thread
+waits on each idle connection it accepts, so once idle connections
+outnumber workers x threads the busy clients time out; the ASGI server only
+keeps a socket per idle client. Needs gunicorn and uvicorn installed.
+
+Usage: python benchmarks/bench_async_api.py [--clients N] [--idle N] [--seconds S]
+       [--workers N] [--threads N] [--path /api/dashboard]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import Database, ProductModel, SaleModel
+
+# A request slower than this counts as an error
+REQUEST_TIMEOUT = 5.0
+
+def seed(db_file, sales):
+    """A product and installment sales for the server to read"""
+    db = Database(db_file)
+    product_id = ProductModel(db).add_product({
+        'name': 'Benchmark TV', 'brand': 'Bench', 'model': 'B1',
+        'category': 'electronics', 'price': 120000.0, 'stock': sales + 3,
+        'description': '', 'features': [], 'tags': []
+    })
+    today = date.today()
+    model = SaleModel(db)
+    for _ in range(sales):
+        model.create_installment_sale({
+            'customer_name': 'Benchmark Customer', 'contact_number': '0300-0000000',
+            'cnic': '00000-0000000-0', 'address': 'Benchmark Street',
+            'witness_name': 'Benchmark Witness', 'witness_cnic': '00000-0000000-1',
+            'witness_address': 'Benchmark Street', 'product_id': product_id,
+            'amount': 120000.0, 'markup_percentage': 0, 'total_with_markup': 120000.0,
+            'advance_payment': 0, 'installment_count': 12,
+            'installments': [
+                {
+                    'number': n + 2, 'amount': 10000.0,
+                    'due_date': (today + timedelta(days=30 * (n - 2))).isoformat(),
+                    'remaining_balance': 10000.0 * (11 - n)
+                }
+                for n in range(12)
+            ]
+        })
+    db.close()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(workdir, port, args, asgi):
+    command = [
+        sys.executable, os.path.join(ROOT, 'run.py'), 'serve', '--host', '127.0.0.1',
+        '--port', str(port), '--workers', str(args.workers), '--threads', str(args.threads),
+        '--keep-alive', str(args.seconds + 30)
+    ]
+    if asgi:
+        command.append('--asgi')
+    process = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, env=dict(os.environ, PYTHONPATH=ROOT))
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+async def fetch(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def client(port, request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(fetch(reader, writer, request), REQUEST_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            errors.append('failed')
+            writer.close()
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            continue
+        if status != 200:
+            errors.append(status)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def load(port, args):
+    idle = []
+    for _ in range(args.idle):
+        idle.append(await asyncio.open_connection('127.0.0.1', port))
+    request = f'GET {args.path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode()
+    latencies, errors = [], []
+    deadline = time.monotonic() + args.seconds
+    await asyncio.gather(*[
+        client(port, request, deadline, latencies, errors) for _ in range(args.clients)
+    ])
+    for _, writer in idle:
+        writer.close()
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50, help='busy keep-alive connections')
+    parser.add_argument('--idle', type=int, default=500, help='idle keep-alive connections')
+    parser.add_argument('--seconds', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--sales', type=int, default=200)
+    parser.add_argument('--path', default='/api/dashboard')
+    args = parser.parse_args()
+
+    print(f"path={args.path} clients={args.clients} idle={args.idle} "
+          f"workers={args.workers} threads={args.threads}")
+    print(f"{'server':>8} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        seed(os.path.join(workdir, 'sales_management.db'), args.sales)
+        for name, asgi in (('sync', False), ('asgi', True)):
+            port = free_port()
+            process = start_server(workdir, port, args, asgi)
+            try:
+                latencies, errors = asyncio.run(load(port, args))
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait(30)
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+            print(f"{name:>8} {len(latencies) / args.seconds:>11.0f} "
+                  f"{statistics.median(latencies or [0]) * 1000:>8.2f} {p99 * 1000:>8.2f} "
+                  f"{len(errors):>7}")
+
+if __name__ == '__main__':
+    main()
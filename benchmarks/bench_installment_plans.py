@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Time to generate many installment plans with each plan engine backend.
+
+Usage: python benchmarks/bench_installment_plans.py [--plans N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plan_engine
+
+TENURES = [3, 6, 12, 24, 36]
+MARKUPS = [0, 5, 10, 12.5, 20]
+
+def make_inputs(count, seed=42):
+    rng = random.Random(seed)
+    amounts = [round(rng.uniform(5000, 500000), 2) for _ in range(count)]
+    advances = [round(a * rng.choice([0, 0.1, 0.2, 0.3]), 2) for a in amounts]
+    counts = [rng.choice(TENURES) for _ in range(count)]
+    markups = [rng.choice(MARKUPS) for _ in range(count)]
+    return amounts, advances, counts, markups
+
+def batch_runner(backend):
+    def run(amounts, advances, counts, markups):
+        plans = plan_engine.compute_plans(amounts, advances, counts, markups, backend=backend)
+        plan_engine.balance_matrix(plans, backend=backend)
+    return run
+
+def per_plan(amounts, advances, counts, markups):
+    # One full schedule of dicts per plan, as calculate_installments returns
+    for plan in zip(amounts, advances, counts, markups):
+        plan_engine.calculate_plan(*plan)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plans', type=int, default=10000, help='plans per run')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per backend')
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.plans)
+    runners = [('python batch', batch_runner('python')), ('per-plan dicts', per_plan)]
+    if plan_engine.np is not None:
+        runners.insert(0, ('numpy batch', batch_runner('numpy')))
+    else:
+        print("NumPy not installed; skipping the numpy backend")
+
+    print(f"plans={args.plans} repeat={args.repeat}")
+    print(f"{'backend':>16} {'best ms':>9} {'mean ms':>9} {'plans/s':>11}")
+    for name, run in runners:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run(*inputs)
+            timings.append((time.perf_counter() - start) * 1000)
+        best = min(timings)
+        print(f"{name:>16} {best:>9.1f} {statistics.mean(timings):>9.1f} "
+              f"{args.plans / best * 1000:>11.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Per-sale commit latency of SaleModel.create_installment_sale as the plan grows.
+
+Usage: python benchmarks/bench_installment_sale.py [--sales N] [--profile NAME]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database, ProductModel, SaleModel
+
+INSTALLMENT_COUNTS = [1, 6, 12, 24, 36]
+
+def make_sale(product_id, installment_count):
+    today = date.today()
+    amount = 100000.0
+    monthly = round(amount / installment_count, 2)
+    return {
+        'customer_name': 'Benchmark Customer',
+        'contact_number': '0300-0000000',
+        'cnic': '00000-0000000-0',
+        'address': 'Benchmark Street',
+        'witness_name': 'Benchmark Witness',
+        'witness_cnic': '00000-0000000-1',
+        'witness_address': 'Benchmark Street',
+        'product_id': product_id,
+        'amount': amount,
+        'markup_percentage': 0,
+        'total_with_markup': amount,
+        'advance_payment': 0,
+        'installment_count': installment_count,
+        'installments': [
+            {
+                'number': n + 2,
+                'amount': monthly,
+                'due_date': (today + timedelta(days=30 * (n + 1))).isoformat(),
+                'remaining_balance': max(amount - monthly * (n + 1), 0)
+            }
+            for n in range(installment_count)
+        ]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=200, help='sales per installment count')
+    parser.add_argument('--profile', default='durable', help='storage profile')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), storage_profile=args.profile)
+        product_id = ProductModel(db).add_product({
+            'name': 'Benchmark TV', 'brand': 'Bench', 'model': 'B1',
+            'category': 'electronics', 'price': 100000.0,
+            'stock': args.sales * len(INSTALLMENT_COUNTS),
+            'description': '', 'features': [], 'tags': []
+        })
+        sales = SaleModel(db)
+
+        print(f"profile={args.profile} sales per row={args.sales}")
+        print(f"{'installments':>12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'sales/s':>9}")
+        for count in INSTALLMENT_COUNTS:
+            data = make_sale(product_id, count)
+            timings = []
+            for _ in range(args.sales):
+                start = time.perf_counter()
+                sales.create_installment_sale(data)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            mean = statistics.mean(timings)
+            print(f"{count:>12} {mean:>9.3f} {statistics.median(timings):>9.3f} "
+                  f"{p95:>9.3f} {1000 / mean:>9.0f}")
+        db.close()
+
+if __name__ == '__main__':
+    main()
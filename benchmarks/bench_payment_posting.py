@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Payment posting throughput: one mark_installment_paid call per payment vs post_payments.
+
+Usage: python benchmarks/bench_payment_posting.py [--payments N] [--batch N] [--profile NAME]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database, ProductModel, SaleModel, InstallmentModel
+
+INSTALLMENTS_PER_SALE = 12
+
+def make_sales(db, count):
+    """Create installment sales and return their ids"""
+    product_id = ProductModel(db).add_product({
+        'name': 'Benchmark TV', 'brand': 'Bench', 'model': 'B1',
+        'category': 'electronics', 'price': 120000.0, 'stock': count,
+        'description': '', 'features': [], 'tags': []
+    })
+    today = date.today()
+    sales = SaleModel(db)
+    sale_ids = []
+    for _ in range(count):
+        sale_ids.append(sales.create_installment_sale({
+            'customer_name': 'Benchmark Customer', 'contact_number': '0300-0000000',
+            'cnic': '00000-0000000-0', 'address': 'Benchmark Street',
+            'witness_name': 'Benchmark Witness', 'witness_cnic': '00000-0000000-1',
+            'witness_address': 'Benchmark Street', 'product_id': product_id,
+            'amount': 120000.0, 'markup_percentage': 0, 'total_with_markup': 120000.0,
+            'advance_payment': 0, 'installment_count': INSTALLMENTS_PER_SALE,
+            'installments': [
+                {
+                    'number': n + 2, 'amount': 10000.0,
+                    'due_date': (today + timedelta(days=30 * (n + 1))).isoformat(),
+                    'remaining_balance': 10000.0 * (INSTALLMENTS_PER_SALE - n - 1)
+                }
+                for n in range(INSTALLMENTS_PER_SALE)
+            ]
+        }))
+    return sale_ids
+
+def payments_for(sale_ids, count):
+    """The first count (sale_id, installment_number) pairs, one per sale in turn"""
+    pairs = []
+    number = 2
+    while len(pairs) < count:
+        for sale_id in sale_ids:
+            pairs.append((sale_id, number))
+            if len(pairs) == count:
+                break
+        number += 1
+    return pairs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--payments', type=int, default=2000, help='payments to post per run')
+    parser.add_argument('--batch', type=int, default=500, help='payments per post_payments call')
+    parser.add_argument('--profile', default='durable', help='storage profile')
+    args = parser.parse_args()
+
+    sales_needed = max(1, -(-args.payments // INSTALLMENTS_PER_SALE))
+    print(f"profile={args.profile} payments={args.payments} batch={args.batch}")
+    print(f"{'path':>16} {'seconds':>9} {'payments/s':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('one at a time', 'batched'):
+            db = Database(os.path.join(tmp, f'{name[0]}.db'), storage_profile=args.profile)
+            pairs = payments_for(make_sales(db, sales_needed), args.payments)
+            model = InstallmentModel(db)
+
+            start = time.perf_counter()
+            if name == 'one at a time':
+                for sale_id, number in pairs:
+                    model.mark_installment_paid(sale_id, number)
+            else:
+                for offset in range(0, len(pairs), args.batch):
+                    result = model.post_payments([
+                        {'sale_id': sale_id, 'installment_number': number}
+                        for sale_id, number in pairs[offset:offset + args.batch]
+                    ])
+                    assert not result['failed'], result['results'][:3]
+            elapsed = time.perf_counter() - start
+            print(f"{name:>16} {elapsed:>9.3f} {len(pairs) / elapsed:>11.0f}")
+            db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Sale commit latency with many tills writing at once, with and without the write queue.
+
+Each of --tills threads records --sales installment sales back to back on a
+shared Database, like request threads in one server worker. Without the
+queue every sale takes the SQLite write lock itself and waits out the
+others through busy_timeout; with it the writer thread group-commits the
+sales queued behind the one it is running.
+
+Usage: python benchmarks/bench_sale_commits.py [--tills N] [--sales N] [--profile NAME]
+       [--busy-timeout MS]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_installment_sale import make_sale
+from models import Database, ProductModel, SaleModel
+
+def percentile(timings, fraction):
+    return timings[min(int(len(timings) * fraction), len(timings) - 1)]
+
+def run(db_file, args, serialize_writes):
+    overrides = {'busy_timeout': args.busy_timeout} if args.busy_timeout is not None else None
+    db = Database(db_file, pool_size=args.tills + 1, storage_profile=args.profile,
+                  storage_overrides=overrides, serialize_writes=serialize_writes)
+    product_id = ProductModel(db).add_product({
+        'name': 'Benchmark TV', 'brand': 'Bench', 'model': 'B1',
+        'category': 'electronics', 'price': 100000.0, 'stock': args.tills * args.sales,
+        'description': '', 'features': [], 'tags': []
+    })
+    data = make_sale(product_id, 12)
+    model = SaleModel(db)
+    timings, errors = [], []
+    start_line = threading.Barrier(args.tills)
+
+    def till():
+        start_line.wait()
+        for _ in range(args.sales):
+            start = time.perf_counter()
+            try:
+                model.create_installment_sale(data)
+            except Exception as e:
+                errors.append(e)
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=till) for _ in range(args.tills)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    stats = db.writer.stats() if db.writer is not None else None
+    db.close()
+    return timings, errors, elapsed, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tills', type=int, default=16, help='concurrent writer threads')
+    parser.add_argument('--sales', type=int, default=50, help='sales per till')
+    parser.add_argument('--profile', default='durable', help='storage profile')
+    parser.add_argument('--busy-timeout', type=int, help='override the profile busy_timeout (ms)')
+    args = parser.parse_args()
+
+    print(f"profile={args.profile} tills={args.tills} sales per till={args.sales}")
+    print(f"{'writes':>7} {'sales/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'errors':>7} {'group':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, serialize_writes in (('direct', False), ('queued', True)):
+            timings, errors, elapsed, stats = run(
+                os.path.join(tmp, f'{name}.db'), args, serialize_writes
+            )
+            timings.sort()
+            group = stats['average_group'] if stats and stats['average_group'] else '-'
+            print(f"{name:>7} {len(timings) / elapsed:>8.0f} "
+                  f"{percentile(timings, 0.5) if timings else 0:>8.2f} "
+                  f"{percentile(timings, 0.95) if timings else 0:>8.2f} "
+                  f"{percentile(timings, 0.99) if timings else 0:>8.2f} "
+                  f"{timings[-1] if timings else 0:>8.2f} {len(errors):>7} {group!s:>6}")
+            for message in sorted({str(e) for e in errors}):
+                print(f"        {message}")
+
+if __name__ == '__main__':
+    main()
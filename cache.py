@@ -0,0 +1,140 @@
+"""In-process read-through cache for model queries.
+
+Entries are keyed by (namespace, ...), expire after a per-entry TTL and are
+evicted least-recently-used once the cache is full. Model reads opt in with
+@cached(namespace) and writes drop whole namespaces with @invalidates(...).
+Cached values are shared between callers and must be treated as read-only.
+
+@invalidates only reaches this process. When the cache is given a versions
+function, each entry also records the version of its namespace's data when
+it was loaded and is only served while that version is current, so writes
+made by other processes, or not yet invalidated here, are not hidden past
+the next version check.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    def __init__(self, maxsize=1024, default_ttl=30.0, versions=None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        # versions(namespace) returns a token that changes with the data behind
+        # the namespace, or None when it has nothing to check
+        self.versions = versions
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {}
+        # Bumped on invalidation so a load that raced a write is not stored
+        self._generations = {}
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def _count(self, namespace, field):
+        counters = self._counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+        counters[field] += 1
+
+    def get(self, key, version=None):
+        """Return (found, value) for a key stored at version, counting the hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_version, value = entry
+                if expires_at <= time.monotonic():
+                    del self._entries[key]
+                    self.expirations += 1
+                elif entry_version != version:
+                    del self._entries[key]
+                    self.stale += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._count(key[0], 'hits')
+                    return True, value
+            self._count(key[0], 'misses')
+            return False, None
+
+    def set(self, key, value, ttl=None, generation=None, version=None):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (expires_at, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, load, ttl=None):
+        # Read before loading, so a change made during the load leaves the
+        # entry stamped with the older version and it is reloaded next time
+        version = self.versions(key[0]) if self.versions is not None else None
+        found, value = self.get(key, version)
+        if found:
+            return value
+        with self._lock:
+            generation = self._generations.get(key[0], 0)
+        value = load()
+        self.set(key, value, ttl, generation, version)
+        return value
+
+    def invalidate(self, *namespaces):
+        """Drop every entry in the given namespaces"""
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [k for k in self._entries if k[0] in namespaces]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            namespaces = {}
+            hits = misses = 0
+            for namespace, counters in self._counters.items():
+                lookups = counters['hits'] + counters['misses']
+                namespaces[namespace] = dict(
+                    counters, hit_rate=round(counters['hits'] / lookups, 3) if lookups else None
+                )
+                hits += counters['hits']
+                misses += counters['misses']
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale': self.stale,
+                'namespaces': namespaces
+            }
+
+def cached(namespace, ttl=None):
+    """Cache a model method's result in self.db.cache under a namespace"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.db.cache
+            if cache is None:
+                return method(self, *args, **kwargs)
+            key = (namespace, method.__qualname__, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_load(key, lambda: method(self, *args, **kwargs), ttl)
+        return wrapper
+    return decorator
+
+def invalidates(*namespaces):
+    """Drop the given cache namespaces after a model write succeeds"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if self.db.cache is not None:
+                self.db.cache.invalidate(*namespaces)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+"""Customer identity: normalized CNIC and phone keys, upsert and duplicate merging.
+
+A customer is identified by CNIC when one is known, otherwise by phone
+number. Both are stored normalized in customers.cnic_key and
+customers.contact_key, which the unique indexes below cover, so a repeat
+buyer's sale reuses their row instead of inserting a new one. Phone keys
+are only unique among customers without a CNIC: relatives often share a
+number but not an identity card.
+"""
+import re
+
+_NON_DIGITS = re.compile(r'\D')
+
+def normalize_cnic(cnic):
+    """Digits only, so '35202-1234567-1' and '3520212345671' match"""
+    digits = _NON_DIGITS.sub('', str(cnic or ''))
+    return digits or None
+
+def normalize_contact(contact_number):
+    """Digits only in local form, so '+92 300 1234567' matches '0300-1234567'"""
+    digits = _NON_DIGITS.sub('', str(contact_number or ''))
+    if digits.startswith('0092'):
+        digits = digits[2:]
+    if digits.startswith('92') and len(digits) == 12:
+        digits = '0' + digits[2:]
+    return digits or None
+
+def create_customer_keys(c):
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_cnic_key
+        ON customers (cnic_key) WHERE cnic_key IS NOT NULL
+    ''')
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_contact_key
+        ON customers (contact_key) WHERE cnic_key IS NULL AND contact_key IS NOT NULL
+    ''')
+
+def _only_cnic_holder(c, contact_key):
+    # A phone shared by several CNIC holders does not identify any of them
+    rows = c.execute(
+        'SELECT id FROM customers WHERE contact_key = ? AND cnic_key IS NOT NULL LIMIT 2',
+        (contact_key,)
+    ).fetchall()
+    return rows[0][0] if len(rows) == 1 else None
+
+def find_customer(c, cnic_key, contact_key):
+    """The id of the customer these keys identify, or None"""
+    if cnic_key:
+        row = c.execute('SELECT id FROM customers WHERE cnic_key = ?', (cnic_key,)).fetchone()
+        if row:
+            return row[0]
+    if contact_key:
+        row = c.execute(
+            'SELECT id FROM customers WHERE contact_key = ? AND cnic_key IS NULL',
+            (contact_key,)
+        ).fetchone()
+        if row:
+            return row[0]
+        if not cnic_key:
+            return _only_cnic_holder(c, contact_key)
+    return None
+
+def upsert_customer(c, name, contact_number, address, cnic=None):
+    """Return the id of the matching customer, inserting one if there is none.
+
+    A returning customer keeps their name; their phone and address are
+    updated to the latest given, and a CNIC is recorded the first time one
+    is given. Call inside the sale's transaction.
+    """
+    cnic = (str(cnic).strip() or None) if cnic else None
+    cnic_key = normalize_cnic(cnic)
+    contact_key = normalize_contact(contact_number)
+
+    customer_id = find_customer(c, cnic_key, contact_key)
+    if customer_id is None:
+        c.execute('''
+            INSERT INTO customers (
+                name, contact_number, cnic, address, cnic_key, contact_key
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+        ''', (name, contact_number, cnic, address, cnic_key, contact_key))
+        if c.rowcount:
+            return c.lastrowid
+        # Inserted by another process since the lookup
+        customer_id = find_customer(c, cnic_key, contact_key)
+
+    c.execute('''
+        UPDATE customers
+        SET contact_number = ?, contact_key = ?, address = ?,
+            cnic = COALESCE(cnic, ?), cnic_key = COALESCE(cnic_key, ?)
+        WHERE id = ?
+    ''', (contact_number, contact_key, address, cnic, cnic_key, customer_id))
+    return customer_id
+
+def merge_duplicates(c):
+    """Fold customers that share a key into the oldest one and repoint their sales.
+
+    Also fills in keys for rows written without them. Returns the number
+    of customers merged away; call inside a transaction.
+    """
+    rows = c.execute(
+        'SELECT id, contact_number, cnic, cnic_key, contact_key FROM customers ORDER BY id'
+    ).fetchall()
+
+    merged = {}
+    keys = {}
+    by_cnic = {}
+    cnic_holders = {}
+    for customer_id, contact_number, cnic, _, _ in rows:
+        cnic_key = normalize_cnic(cnic)
+        if not cnic_key:
+            continue
+        survivor = by_cnic.setdefault(cnic_key, customer_id)
+        if survivor != customer_id:
+            merged[customer_id] = survivor
+            continue
+        contact_key = normalize_contact(contact_number)
+        keys[customer_id] = (cnic_key, contact_key)
+        if contact_key:
+            cnic_holders.setdefault(contact_key, []).append(customer_id)
+
+    by_contact = {}
+    for customer_id, contact_number, cnic, _, _ in rows:
+        if normalize_cnic(cnic):
+            continue
+        contact_key = normalize_contact(contact_number)
+        holders = cnic_holders.get(contact_key, ())
+        if contact_key in by_contact:
+            merged[customer_id] = by_contact[contact_key]
+        elif contact_key and len(holders) == 1:
+            merged[customer_id] = holders[0]
+        else:
+            if contact_key:
+                by_contact[contact_key] = customer_id
+            keys[customer_id] = (None, contact_key)
+
+    repoint = [(survivor, duplicate) for duplicate, survivor in merged.items()]
+    c.executemany('UPDATE sales SET customer_id = ? WHERE customer_id = ?', repoint)
+    c.executemany('UPDATE sale_balances SET customer_id = ? WHERE customer_id = ?', repoint)
+    c.executemany('DELETE FROM customers WHERE id = ?', [(d,) for d in merged])
+
+    # Only rows whose stored keys are missing or stale
+    c.executemany('UPDATE customers SET cnic_key = ?, contact_key = ? WHERE id = ?', [
+        keys[customer_id] + (customer_id,)
+        for customer_id, _, _, cnic_key, contact_key in rows
+        if customer_id in keys and keys[customer_id] != (cnic_key, contact_key)
+    ])
+    return len(merged)
@@ -0,0 +1,111 @@
+"""Streaming export of sales, installments and customers to CSV or JSONL.
+
+Exports read through a dedicated connection with fetchmany, so memory stays
+constant however much history is pulled, and a long download never holds
+one of the pool's connections. With WAL enabled the read does not block
+sales being written meanwhile.
+"""
+import csv
+import io
+import json
+
+DEFAULT_BATCH_SIZE = 1000
+
+# entity -> (SELECT ... FROM ... WHERE 1=1, date column for range filters, ORDER BY)
+EXPORTS = {
+    'sales': ('''
+        SELECT
+            s.id, s.created_at, s.sale_type,
+            c.name AS customer_name, c.contact_number, c.cnic,
+            p.name AS product_name, p.brand, p.model, p.category,
+            s.amount, s.markup_percentage, s.total_with_markup,
+            s.advance_payment, s.installment_count
+        FROM sales s
+        JOIN customers c ON s.customer_id = c.id
+        JOIN products p ON s.product_id = p.id
+        WHERE 1=1
+    ''', 's.created_at', 's.id'),
+    'installments': ('''
+        SELECT
+            i.id, i.sale_id, i.installment_number, i.due_date, i.amount,
+            i.status, i.paid_amount, i.paid_date, i.remaining_balance,
+            c.name AS customer_name, c.contact_number,
+            p.name AS product_name
+        FROM installments i
+        JOIN sales s ON i.sale_id = s.id
+        JOIN customers c ON s.customer_id = c.id
+        JOIN products p ON s.product_id = p.id
+        WHERE 1=1
+    ''', 'i.due_date', 'i.id'),
+    'customers': ('''
+        SELECT id, name, contact_number, cnic, address, created_at
+        FROM customers
+        WHERE 1=1
+    ''', 'created_at', 'id'),
+}
+
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+def date_range_clause(column, start_date=None, end_date=None):
+    """SQL fragment and params limiting column to whole days, both ends inclusive"""
+    # Half-open range on the raw column so its index can be used
+    sql = ''
+    params = []
+    if start_date:
+        sql += f' AND {column} >= date(?)'
+        params.append(start_date)
+    if end_date:
+        sql += f" AND {column} < date(?, '+1 day')"
+        params.append(end_date)
+    return sql, params
+
+def iter_batches(db, entity, start_date=None, end_date=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield (columns, rows) batches for an export from a server-side cursor"""
+    if entity not in EXPORTS:
+        raise ValueError(f"Unknown export '{entity}'. Choose one of: {', '.join(EXPORTS)}")
+    query, date_column, order_by = EXPORTS[entity]
+
+    clause, params = date_range_clause(date_column, start_date, end_date)
+    query += clause + f' ORDER BY {order_by}'
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.execute(query, params)
+        columns = [d[0] for d in cursor.description]
+        # The first batch is yielded even when empty so CSV still gets a header
+        rows = cursor.fetchmany(batch_size)
+        yield columns, rows
+        while rows:
+            rows = cursor.fetchmany(batch_size)
+            if rows:
+                yield columns, rows
+    finally:
+        conn.close()
+
+def export_chunks(db, entity, file_format='csv', start_date=None, end_date=None,
+                  batch_size=DEFAULT_BATCH_SIZE):
+    """Yield the export as text chunks, one per fetched batch"""
+    if file_format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported export format '{file_format}'. Use csv or jsonl")
+
+    batches = iter_batches(db, entity, start_date, end_date, batch_size)
+    header_written = False
+    for columns, rows in batches:
+        buffer = io.StringIO()
+        if file_format == 'csv':
+            writer = csv.writer(buffer)
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(tuple(row) for row in rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(columns, row))))
+                buffer.write('\n')
+        yield buffer.getvalue()
+
+def export_to_file(db, entity, stream, file_format='csv', start_date=None, end_date=None,
+                   batch_size=DEFAULT_BATCH_SIZE):
+    """Write an export to an open text stream"""
+    for chunk in export_chunks(db, entity, file_format, start_date, end_date, batch_size):
+        stream.write(chunk)
@@ -0,0 +1,239 @@
+"""Streaming bulk import of products and customers from CSV or JSONL.
+
+Rows are read lazily from the stream, validated, and written in chunked
+transactions with executemany, so a large import pays one commit per chunk
+rather than per row. Secondary indexes and full-text search triggers on the
+target table are suspended for the duration and rebuilt once at the end.
+Their SQL is saved in suspended_schema in the same transaction that drops
+them, so an import that dies midway is finished by the next startup. A
+customer whose CNIC or phone is already on file is counted as a duplicate
+and skipped.
+"""
+import csv
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+
+import customers
+import inventory
+import search
+from utils import validate_required_fields
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+def _list_field(value):
+    """Accept a list, a JSON array string or a comma-separated string"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return value
+    value = str(value).strip()
+    if value.startswith('['):
+        return json.loads(value)
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+def _product_params(row):
+    return (
+        row['name'].strip(), row['brand'].strip(), row['model'].strip(),
+        row['category'].strip(), float(row['price']),
+        inventory.check_stock_level(None, row['stock']),
+        row.get('description') or '',
+        json.dumps(_list_field(row.get('features'))),
+        json.dumps(_list_field(row.get('tags')))
+    )
+
+def _customer_params(row):
+    contact_number = str(row['contact_number']).strip()
+    cnic = (str(row['cnic']).strip() or None) if row.get('cnic') else None
+    return (
+        row['name'].strip(), contact_number, cnic, row['address'].strip(),
+        customers.normalize_cnic(cnic), customers.normalize_contact(contact_number)
+    )
+
+# entity -> (table, required fields, row -> parameters, INSERT statement)
+IMPORTERS = {
+    'products': (
+        'products',
+        ['name', 'brand', 'model', 'category', 'price', 'stock'],
+        _product_params,
+        '''
+            INSERT INTO products (
+                name, brand, model, category, price, stock,
+                description, features, tags
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+    ),
+    'customers': (
+        'customers',
+        ['name', 'contact_number', 'address'],
+        _customer_params,
+        '''
+            INSERT INTO customers (
+                name, contact_number, cnic, address, cnic_key, contact_key
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+        '''
+    ),
+}
+
+def detect_format(filename, default='csv'):
+    ext = os.path.splitext(filename or '')[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(ext, default)
+
+def read_rows(stream, file_format):
+    """Yield one dict per record from a text stream without reading it all"""
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+    elif file_format == 'jsonl':
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Reported as a per-row error by import_rows
+                    yield None
+    else:
+        raise ValueError(f"Unsupported import format '{file_format}'. Use csv or jsonl")
+
+def create_import_tables(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS suspended_schema (
+            name TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            tbl_name TEXT NOT NULL,
+            sql TEXT NOT NULL
+        )
+    ''')
+
+def _suspend_table_maintenance(conn, table):
+    """Drop non-unique indexes and FTS triggers on a table, saving their SQL"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        saved = conn.execute('''
+            SELECT name, type, tbl_name, sql FROM sqlite_master
+            WHERE tbl_name = ? AND sql IS NOT NULL
+            AND (
+                (type = 'index' AND sql NOT LIKE 'CREATE UNIQUE%')
+                OR (type = 'trigger' AND name LIKE '%_fts_%')
+            )
+        ''', (table,)).fetchall()
+        for name, kind, tbl_name, sql in saved:
+            conn.execute('''
+                INSERT OR IGNORE INTO suspended_schema (name, type, tbl_name, sql)
+                VALUES (?, ?, ?, ?)
+            ''', (name, kind, tbl_name, sql))
+            conn.execute(f'DROP {kind.upper()} {name}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def resume_table_maintenance(conn, table=None):
+    """Recreate the indexes and triggers a bulk import suspended.
+
+    Rebuilds the search index of each table whose triggers were suspended.
+    Runs at the end of every import and at startup, for imports that died.
+    """
+    if conn.in_transaction:
+        conn.rollback()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        where, params = ('WHERE tbl_name = ?', (table,)) if table else ('', ())
+        suspended = conn.execute(
+            f'SELECT name, type, tbl_name, sql FROM suspended_schema {where}', params
+        ).fetchall()
+        rebuild = set()
+        for name, kind, tbl_name, sql in suspended:
+            # Another process may have resumed it first
+            if not conn.execute('SELECT 1 FROM sqlite_master WHERE name = ?', (name,)).fetchone():
+                conn.execute(sql)
+            if kind == 'trigger':
+                rebuild.add(f'{tbl_name}_fts')
+        conn.execute(f'DELETE FROM suspended_schema {where}', params)
+        for fts_table in sorted(rebuild & set(search.SEARCH_TABLES)):
+            conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def import_rows(db, entity, rows, chunk_size=DEFAULT_CHUNK_SIZE, defer_indexes=True):
+    """Import an iterable of dict rows into products or customers.
+
+    Returns a report with counts, throughput and the first per-row errors.
+    """
+    if entity not in IMPORTERS:
+        raise ValueError(f"Unknown import target '{entity}'. Choose one of: {', '.join(IMPORTERS)}")
+    table, required, to_params, insert_sql = IMPORTERS[entity]
+
+    report = {'entity': entity, 'rows_read': 0, 'imported': 0, 'duplicates': 0, 'failed': 0,
+              'errors': []}
+
+    def record_error(row_number, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': row_number, 'error': message})
+
+    start = time.perf_counter()
+    rows = enumerate(rows, start=1)
+    with db.connection() as conn:
+        if defer_indexes:
+            _suspend_table_maintenance(conn, table)
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                report['rows_read'] += len(chunk)
+
+                batch = []
+                for row_number, row in chunk:
+                    if not isinstance(row, dict):
+                        record_error(row_number, "Malformed record")
+                        continue
+                    missing = validate_required_fields(row, required)
+                    if missing:
+                        record_error(row_number, f"Missing fields: {', '.join(missing)}")
+                        continue
+                    try:
+                        batch.append((row_number, to_params(row)))
+                    except (ValueError, TypeError, AttributeError) as e:
+                        record_error(row_number, f"Invalid value: {e}")
+
+                try:
+                    # Rows skipped by ON CONFLICT DO NOTHING are not counted
+                    cursor = conn.executemany(insert_sql, [params for _, params in batch])
+                    inserted = cursor.rowcount
+                    conn.commit()
+                    report['imported'] += inserted
+                    report['duplicates'] += len(batch) - inserted
+                except sqlite3.IntegrityError:
+                    # Retry row by row so one bad row does not sink the chunk
+                    conn.rollback()
+                    for row_number, params in batch:
+                        try:
+                            if conn.execute(insert_sql, params).rowcount:
+                                report['imported'] += 1
+                            else:
+                                report['duplicates'] += 1
+                        except sqlite3.IntegrityError as e:
+                            record_error(row_number, str(e))
+                    conn.commit()
+        finally:
+            if defer_indexes:
+                resume_table_maintenance(conn, table)
+
+    if db.cache is not None:
+        db.cache.invalidate(entity, 'dashboard')
+
+    elapsed = time.perf_counter() - start
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows_read'] / elapsed) if elapsed else None
+    return report
+
+def import_file(db, entity, stream, file_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Import from an open text stream in CSV or JSONL format"""
+    return import_rows(db, entity, read_rows(stream, file_format), chunk_size)
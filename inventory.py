@@ -0,0 +1,149 @@
+"""Oversell-safe stock changes and short-lived stock reservations.
+
+A sale takes stock with one conditional UPDATE that only matches while
+enough units are free, so two tills selling the last unit cannot both
+succeed: the second gets InsufficientStockError and its sale rolls back.
+Free units are the product's stock minus the live reservations on it.
+
+A reservation holds units for a sale form while it is open. It expires
+on its own after a few minutes, so an abandoned form does not hold stock;
+the sale that completes the form consumes it.
+"""
+
+# Seconds a reservation holds stock unless the sale completes or releases it
+DEFAULT_RESERVATION_TTL = 600
+MAX_RESERVATION_TTL = 3600
+
+_RESERVED = '''(
+    SELECT COALESCE(SUM(r.quantity), 0) FROM stock_reservations r
+    WHERE r.product_id = products.id AND r.expires_at > datetime('now')
+)'''
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product_id, requested, available):
+        super().__init__(
+            f"Only {available} of product {product_id} available, {requested} requested"
+        )
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+def create_inventory_tables(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS stock_reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_reservations_product
+        ON stock_reservations (product_id, expires_at)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_reservations_expires_at
+        ON stock_reservations (expires_at)
+    ''')
+    # Safety net for writes that bypass take_stock; stock that is already
+    # negative can still be raised
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_stock_not_negative
+        BEFORE UPDATE OF stock ON products
+        WHEN NEW.stock < 0 AND NEW.stock < OLD.stock BEGIN
+            SELECT RAISE(ABORT, 'stock cannot go below zero');
+        END
+    ''')
+
+def available_stock(c, product_id):
+    """Units not held by a live reservation, or None for an unknown product"""
+    row = c.execute(
+        f'SELECT stock - {_RESERVED} FROM products WHERE id = ?', (product_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+def check_stock_level(c, stock, product_id=None):
+    """Validate a stock count being set directly, as a whole number.
+
+    Raises ValueError if it is negative or, for an existing product, below
+    the units its live reservations hold.
+    """
+    try:
+        stock = int(stock)
+    except (TypeError, ValueError):
+        raise ValueError("Stock must be a whole number")
+    if stock < 0:
+        raise ValueError("Stock cannot be negative")
+    if product_id is not None:
+        row = c.execute(f'SELECT {_RESERVED} FROM products WHERE id = ?', (product_id,)).fetchone()
+        if row and stock < row[0]:
+            raise ValueError(f"Stock cannot be set below the {row[0]} units currently reserved")
+    return stock
+
+def _check_quantity(quantity):
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError("Quantity must be a whole number")
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1")
+    return quantity
+
+def _insufficient(c, product_id, quantity):
+    available = available_stock(c, product_id)
+    if available is None:
+        return ValueError(f"Product {product_id} not found")
+    return InsufficientStockError(product_id, quantity, max(available, 0))
+
+def take_stock(c, product_id, quantity, reservation_id=None):
+    """Take units out of stock, consuming the sale's reservation if it has one.
+
+    Raises InsufficientStockError, changing nothing, when fewer units are
+    free. Call inside the sale's transaction.
+    """
+    quantity = _check_quantity(quantity)
+    if reservation_id is not None:
+        # The reserved units become free for this sale to take
+        c.execute(
+            'DELETE FROM stock_reservations WHERE id = ? AND product_id = ?',
+            (reservation_id, product_id)
+        )
+    c.execute(f'''
+        UPDATE products
+        SET stock = stock - ?
+        WHERE id = ? AND stock - {_RESERVED} >= ?
+    ''', (quantity, product_id, quantity))
+    if not c.rowcount:
+        raise _insufficient(c, product_id, quantity)
+
+def reserve_stock(c, product_id, quantity, ttl=DEFAULT_RESERVATION_TTL):
+    """Hold free units for ttl seconds; returns the reservation.
+
+    Raises InsufficientStockError when fewer units are free.
+    """
+    quantity = _check_quantity(quantity)
+    ttl = max(1, min(int(ttl), MAX_RESERVATION_TTL))
+    purge_expired(c)
+    c.execute(f'''
+        INSERT INTO stock_reservations (product_id, quantity, expires_at)
+        SELECT id, ?, datetime('now', ?) FROM products
+        WHERE id = ? AND stock - {_RESERVED} >= ?
+    ''', (quantity, f'+{ttl} seconds', product_id, quantity))
+    if not c.rowcount:
+        raise _insufficient(c, product_id, quantity)
+    reservation = c.execute(
+        'SELECT id, product_id, quantity, expires_at FROM stock_reservations WHERE id = ?',
+        (c.lastrowid,)
+    ).fetchone()
+    return dict(reservation)
+
+def release_reservation(c, reservation_id):
+    """Give back a reservation's units; returns False if it was already gone"""
+    c.execute('DELETE FROM stock_reservations WHERE id = ?', (reservation_id,))
+    return c.rowcount > 0
+
+def purge_expired(c):
+    c.execute("DELETE FROM stock_reservations WHERE expires_at <= datetime('now')")
+    return c.rowcount
@@ -2,13 +2,21 @@ import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QStackedWidget, QPushButton, QLabel, 
                             QLineEdit, QComboBox, QSpinBox, QTableWidget, 
-                            QTableWidgetItem, QMessageBox, QDialog, QFormLayout,
-                            QDoubleSpinBox, QTextEdit, QDateEdit)
-from PyQt6.QtCore import Qt, QDate
+                            QTableWidgetItem, QTableView, QMessageBox, QDialog, QFormLayout,
+                            QDoubleSpinBox, QTextEdit, QTextBrowser, QDateEdit)
+from PyQt6.QtCore import Qt, QDate, QThreadPool
 from PyQt6.QtGui import QIcon, QFont
 import sqlite3
 from datetime import datetime, timedelta
 import json
+from models import (Database, ProductModel, CustomerModel, InstallmentModel,
+                    DashboardModel, SaleModel)
+from utils import (calculate_installments, format_currency, format_date, generate_report_html,
+                   show_error_message)
+from scheduler import PeriodicJob
+from table_models import Column, LazyTableModel, SqlSortFilterProxyModel
+from workers import TaskRunner
+import reports
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -16,6 +24,14 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Sales Management System")
         self.setMinimumSize(1200, 800)
         
+        # Shared database with a pooled connection for every page
+        self.db = Database()
+
+        # Mark late installments overdue now and hourly while the app is open
+        self.overdue_job = PeriodicJob('overdue-check',
+                                       InstallmentModel(self.db).refresh_overdue, 3600)
+        self.overdue_job.start()
+        
         # Create main widget and layout
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
@@ -73,14 +89,14 @@ class MainWindow(QMainWindow):
         
         # Create pages
         self.pages = {
-            "dashboard": DashboardPage(),
-            "cash_sale": CashSalePage(),
-            "installment_sale": InstallmentSalePage(),
-            "inventory": InventoryPage(),
-            "customers": CustomersPage(),
-            "installments": InstallmentsPage(),
-            "reports": ReportsPage(),
-            "settings": SettingsPage()
+            "dashboard": DashboardPage(self.db),
+            "cash_sale": CashSalePage(self.db),
+            "installment_sale": InstallmentSalePage(self.db),
+            "inventory": InventoryPage(self.db),
+            "customers": CustomersPage(self.db),
+            "installments": InstallmentsPage(self.db),
+            "reports": ReportsPage(self.db),
+            "settings": SettingsPage(self.db)
         }
         
         # Add pages to stack
@@ -94,6 +110,7 @@ class MainWindow(QMainWindow):
         # Set initial page
         self.nav_buttons[0].setChecked(True)
         self.stack.setCurrentWidget(self.pages["dashboard"])
+        self.pages["dashboard"].refresh_data()
 
     def navigate(self):
         # Uncheck all buttons except the clicked one
@@ -108,13 +125,35 @@ class MainWindow(QMainWindow):
         # Refresh page data
         self.pages[page].refresh_data()
 
-class DashboardPage(QWidget):
-    def __init__(self):
+    def closeEvent(self, event):
+        self.overdue_job.stop()
+        # Let background queries finish before their pool is closed
+        QThreadPool.globalInstance().waitForDone(5000)
+        self.db.close()
+        super().closeEvent(event)
+
+class BackgroundMixin:
+    """Runs a page's queries on the thread pool and shows a loading label meanwhile"""
+
+    def setup_background(self):
+        self.runner = TaskRunner(self)
+        self.loading_label = QLabel("Loading...")
+        self.loading_label.setVisible(False)
+        self.runner.busy_changed.connect(self.loading_label.setVisible)
+
+    def show_load_error(self, message):
+        show_error_message(self, f"Could not load data: {message}")
+
+class DashboardPage(BackgroundMixin, QWidget):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
         layout = QVBoxLayout(self)
+        self.setup_background()
+        layout.addWidget(self.loading_label)
         
         # Stats cards
         stats_layout = QHBoxLayout()
@@ -173,29 +212,53 @@ class DashboardPage(QWidget):
         stats_layout.addWidget(stock_card)
         
         # Recent Sales Table
-        sales_table = QTableWidget()
-        sales_table.setColumnCount(5)
-        sales_table.setHorizontalHeaderLabels(["Date", "Customer", "Product", "Amount", "Type"])
+        self.sales_table = QTableWidget()
+        self.sales_table.setColumnCount(5)
+        self.sales_table.setHorizontalHeaderLabels(["Date", "Customer", "Product", "Amount", "Type"])
         
         # Due Installments Table
-        installments_table = QTableWidget()
-        installments_table.setColumnCount(5)
-        installments_table.setHorizontalHeaderLabels(["Due Date", "Customer", "Product", "Amount", "Status"])
+        self.installments_table = QTableWidget()
+        self.installments_table.setColumnCount(5)
+        self.installments_table.setHorizontalHeaderLabels(["Due Date", "Customer", "Product", "Amount", "Status"])
         
         # Add all widgets to main layout
         layout.addLayout(stats_layout)
         layout.addWidget(QLabel("Recent Sales"))
-        layout.addWidget(sales_table)
+        layout.addWidget(self.sales_table)
         layout.addWidget(QLabel("Upcoming Installments"))
-        layout.addWidget(installments_table)
+        layout.addWidget(self.installments_table)
     
     def refresh_data(self):
-        # Update dashboard data from database
-        pass
+        # Update dashboard data from database off the GUI thread
+        self.runner.submit('dashboard', DashboardModel(self.db).get_dashboard,
+                           self.show_dashboard, self.show_load_error)
+
+    def show_dashboard(self, dashboard):
+        self.total_sales_amount.setText(format_currency(dashboard['total_sales']))
+        self.active_installments_count.setText(str(dashboard['active_installments']))
+        self.low_stock_count.setText(str(dashboard['low_stock_count']))
+        
+        self.fill_table(self.sales_table, [
+            [sale['created_at'][:10], sale['customer_name'], sale['product_name'],
+             format_currency(sale['amount']), sale['sale_type'].title()]
+            for sale in dashboard['recent_sales']
+        ])
+        self.fill_table(self.installments_table, [
+            [format_date(inst['due_date']), inst['customer_name'], inst['product_name'],
+             format_currency(inst['amount']), inst['status']]
+            for inst in dashboard['upcoming_installments']
+        ])
+    
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(str(value)))
 
 class CashSalePage(QWidget):
-    def __init__(self):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
@@ -258,13 +321,16 @@ class CashSalePage(QWidget):
         # Refresh product list
         pass
 
-class InstallmentSalePage(QWidget):
-    def __init__(self):
+class InstallmentSalePage(BackgroundMixin, QWidget):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
         layout = QVBoxLayout(self)
+        self.setup_background()
+        layout.addWidget(self.loading_label)
         
         # Customer Details Section
         customer_group = QWidget()
@@ -318,6 +384,12 @@ class InstallmentSalePage(QWidget):
         preview_btn = QPushButton("Preview Installment Plan")
         preview_btn.clicked.connect(self.preview_plan)
         
+        # Installment plan preview
+        self.plan_summary = QLabel()
+        self.plan_table = QTableWidget()
+        self.plan_table.setColumnCount(4)
+        self.plan_table.setHorizontalHeaderLabels(["#", "Due Date", "Amount", "Remaining"])
+        
         # Complete Sale Button
         complete_btn = QPushButton("Complete Sale")
         complete_btn.setStyleSheet("""
@@ -341,24 +413,84 @@ class InstallmentSalePage(QWidget):
         layout.addWidget(QLabel("Product and Installment Details"))
         layout.addWidget(details_group)
         layout.addWidget(preview_btn)
+        layout.addWidget(self.plan_summary)
+        layout.addWidget(self.plan_table)
         layout.addStretch()
         layout.addWidget(complete_btn)
     
     def preview_plan(self):
-        # Show installment plan preview
-        pass
+        # The combo holds each product's price as its item data
+        price = self.product_combo.currentData()
+        if price is None:
+            show_error_message(self, "Select a product first")
+            return
+        try:
+            plan = calculate_installments(price, self.advance_amount.value(),
+                                          self.months_spin.value(), self.markup_spin.value())
+        except ValueError as e:
+            show_error_message(self, str(e))
+            return
+        
+        self.plan_summary.setText(
+            f"Total with markup: {format_currency(plan['total_with_markup'])} "
+            f"(markup {format_currency(plan['markup_amount'])}), "
+            f"{self.months_spin.value()} monthly installments of "
+            f"{format_currency(plan['installment_amount'])}"
+        )
+        rows = plan['installments']
+        self.plan_table.setRowCount(len(rows))
+        for row, inst in enumerate(rows):
+            values = [inst['number'], format_date(inst['due_date']),
+                      format_currency(inst['amount']), format_currency(inst['remaining_balance'])]
+            for column, value in enumerate(values):
+                self.plan_table.setItem(row, column, QTableWidgetItem(str(value)))
     
     def complete_sale(self):
         # Handle installment sale completion
         pass
     
     def refresh_data(self):
-        # Refresh product list
-        pass
+        self.runner.submit('products', ProductModel(self.db).get_products,
+                           self.show_products, self.show_load_error)
 
-class InventoryPage(QWidget):
-    def __init__(self):
+    def show_products(self, products):
+        selected = self.product_combo.currentText()
+        self.product_combo.clear()
+        for product in products:
+            self.product_combo.addItem(
+                f"{product['name']} ({format_currency(product['price'])})", product['price']
+            )
+        index = self.product_combo.findText(selected)
+        if index >= 0:
+            self.product_combo.setCurrentIndex(index)
+
+class LazyTableMixin(BackgroundMixin):
+    """Shows a page's list in self.table through a LazyTableModel.
+
+    Rows are fetched a keyset page at a time on the thread pool as the view
+    scrolls, and header clicks and filters go through self.proxy to the
+    page's fetch_page query.
+    """
+
+    def setup_table(self, columns):
+        self.setup_background()
+        self.model = LazyTableModel(columns, self.fetch_page, self, self.runner)
+        self.proxy = SqlSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        # No sort column until a header is clicked, so lists start in query order
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+
+    def reload_table(self):
+        self.model.refresh()
+
+class InventoryPage(LazyTableMixin, QWidget):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
@@ -390,28 +522,74 @@ class InventoryPage(QWidget):
         toolbar.addWidget(add_btn)
         
         # Products Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Product Name", "Brand", "Category", "Price",
-            "Stock", "Status", "Actions"
+        self.setup_table([
+            Column("Product Name", lambda p: p['name'], 'name'),
+            Column("Brand", lambda p: p['brand'], 'brand'),
+            Column("Category", lambda p: p['category'], 'category'),
+            Column("Price", lambda p: format_currency(p['price']), 'price'),
+            Column("Stock", lambda p: p['stock'], 'stock'),
+            Column("Status", lambda p: "Low Stock" if p['stock'] <= 5 else "In Stock"),
+            Column("Actions", lambda p: "")
         ])
+        self.search_box.textChanged.connect(
+            lambda text: self.proxy.set_filter('search', text.strip())
+        )
         
         # Add widgets to layout
         layout.addLayout(toolbar)
+        layout.addWidget(self.loading_label)
         layout.addWidget(self.table)
     
     def add_product(self):
         # Show add product dialog
         pass
     
+    def fetch_page(self, cursor, sort, descending, filters):
+        return ProductModel(self.db).get_products_page(
+            filters.get('search'), sort=sort, descending=descending, **cursor
+        )
+    
     def refresh_data(self):
         # Refresh inventory table
-        pass
+        self.reload_table()
 
-class CustomersPage(QWidget):
-    def __init__(self):
+class CustomerHistoryDialog(QDialog):
+    """Every sale of one customer with what is still owed on each"""
+
+    def __init__(self, customer, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Sales History - {customer['name']}")
+        self.setMinimumSize(800, 400)
+        layout = QVBoxLayout(self)
+
+        sales = customer['sales']
+        outstanding = sum(sale['outstanding_amount'] for sale in sales)
+        layout.addWidget(QLabel(
+            f"{customer['contact_number']}   {customer['cnic'] or ''}\n"
+            f"{len(sales)} sales, {format_currency(outstanding)} outstanding"
+        ))
+
+        table = QTableWidget(len(sales), 6)
+        table.setHorizontalHeaderLabels([
+            "Date", "Product", "Type", "Total", "Paid", "Outstanding"
+        ])
+        for row, sale in enumerate(sales):
+            values = [
+                format_date(sale['sale_date'][:10]),
+                sale['product_name'],
+                sale['sale_type'].title(),
+                format_currency(sale['total_amount']),
+                format_currency(sale['paid_to_date']),
+                format_currency(sale['outstanding_amount'])
+            ]
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+        layout.addWidget(table)
+
+class CustomersPage(LazyTableMixin, QWidget):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
@@ -422,24 +600,50 @@ class CustomersPage(QWidget):
         self.search_box.setPlaceholderText("Search customers...")
         
         # Customers Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "Name", "Phone", "CNIC", "Address",
-            "Total Purchases", "Actions"
+        self.setup_table([
+            Column("Name", lambda c: c['name'], 'name'),
+            Column("Phone", lambda c: c['contact_number'], 'contact_number'),
+            Column("CNIC", lambda c: c['cnic'] or ""),
+            Column("Address", lambda c: c['address']),
+            Column("Sales", lambda c: c['sale_count']),
+            Column("Last Sale",
+                   lambda c: format_date(c['last_sale_date'][:10]) if c['last_sale_date'] else ""),
+            Column("Outstanding", lambda c: format_currency(c['outstanding_amount'])),
+            Column("Actions", lambda c: "")
         ])
+        self.search_box.textChanged.connect(
+            lambda text: self.proxy.set_filter('search', text.strip())
+        )
+        # Double-click a customer for their sales history
+        self.table.doubleClicked.connect(self.show_history)
         
         # Add widgets to layout
         layout.addWidget(self.search_box)
+        layout.addWidget(self.loading_label)
         layout.addWidget(self.table)
     
+    def fetch_page(self, cursor, sort, descending, filters):
+        return CustomerModel(self.db).get_customers_page(
+            filters.get('search'), view='full', sort=sort, descending=descending, **cursor
+        )
+
+    def show_history(self, index):
+        customer = self.proxy.record(index.row())
+        self.runner.submit('history', CustomerModel(self.db).get_customer_sales,
+                           self.open_history, self.show_load_error, customer['id'])
+
+    def open_history(self, customer):
+        if customer is not None:
+            CustomerHistoryDialog(customer, self).exec()
+    
     def refresh_data(self):
         # Refresh customers table
-        pass
+        self.reload_table()
 
-class InstallmentsPage(QWidget):
-    def __init__(self):
+class InstallmentsPage(LazyTableMixin, QWidget):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
@@ -458,24 +662,43 @@ class InstallmentsPage(QWidget):
         filters.addWidget(self.status_combo)
         
         # Installments Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            "Due Date", "Customer", "Product", "Installment",
-            "Amount", "Remaining", "Status", "Actions"
+        self.setup_table([
+            Column("Due Date", lambda i: format_date(i['due_date']), 'due_date'),
+            Column("Customer", lambda i: i['customer_name'], 'customer_name'),
+            Column("Product", lambda i: i['product_name'], 'product_name'),
+            Column("Installment", lambda i: i['installment_number']),
+            Column("Amount", lambda i: format_currency(i['amount']), 'amount'),
+            Column("Remaining", lambda i: format_currency(i['remaining_balance']),
+                   'remaining_balance'),
+            Column("Status", lambda i: i['status'], 'status'),
+            Column("Actions", lambda i: "")
         ])
+        self.search_box.textChanged.connect(
+            lambda text: self.proxy.set_filter('search', text.strip())
+        )
+        self.status_combo.currentTextChanged.connect(
+            lambda status: self.proxy.set_filter('status', None if status == "All" else status)
+        )
         
         # Add widgets to layout
         layout.addLayout(filters)
+        layout.addWidget(self.loading_label)
         layout.addWidget(self.table)
     
+    def fetch_page(self, cursor, sort, descending, filters):
+        return InstallmentModel(self.db).get_installments_page(
+            status=filters.get('status'), search_term=filters.get('search'),
+            sort=sort, descending=descending, **cursor
+        )
+    
     def refresh_data(self):
         # Refresh installments table
-        pass
+        self.reload_table()
 
-class ReportsPage(QWidget):
-    def __init__(self):
+class ReportsPage(BackgroundMixin, QWidget):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
@@ -488,6 +711,10 @@ class ReportsPage(QWidget):
         inventory_report_btn = QPushButton("Inventory Report")
         customer_report_btn = QPushButton("Customer Report")
         
+        sales_report_btn.clicked.connect(lambda: self.generate_report('sales'))
+        inventory_report_btn.clicked.connect(lambda: self.generate_report('inventory'))
+        customer_report_btn.clicked.connect(lambda: self.generate_report('customers'))
+
         report_types.addWidget(sales_report_btn)
         report_types.addWidget(inventory_report_btn)
         report_types.addWidget(customer_report_btn)
@@ -506,20 +733,38 @@ class ReportsPage(QWidget):
         date_range.addWidget(self.end_date)
         
         # Report Content Area
-        self.report_area = QWidget()
+        self.report_area = QTextBrowser()
+        self.current_report = None
+        self.setup_background()
         
         # Add widgets to layout
         layout.addLayout(report_types)
         layout.addLayout(date_range)
+        layout.addWidget(self.loading_label)
         layout.addWidget(self.report_area)
+
+    def generate_report(self, report_type):
+        # A newer request replaces one still running, so only the last click shows
+        self.current_report = report_type
+        start = self.start_date.date().toString("yyyy-MM-dd")
+        end = self.end_date.date().toString("yyyy-MM-dd")
+        self.runner.submit('report', self.build_report, self.report_area.setHtml,
+                           self.show_load_error, report_type, start, end)
+
+    def build_report(self, report_type, start, end):
+        # Runs on a pool thread; returns the HTML to show
+        sections = reports.build_report(self.db, report_type, start, end)
+        return generate_report_html(sections, report_type, (start, end))
     
     def refresh_data(self):
         # Refresh current report
-        pass
+        if self.current_report:
+            self.generate_report(self.current_report)
 
 class SettingsPage(QWidget):
-    def __init__(self):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
         self.init_ui()
         
     def init_ui(self):
@@ -0,0 +1,176 @@
+"""Versioned schema migrations applied on startup by Database.init_db"""
+import aging
+import balances
+import customers
+import importer
+import inventory
+import rollups
+
+def _add_lookup_indexes(c):
+    # Installment lookups by sale, status filters and due-date ordering
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_installments_sale_number
+        ON installments (sale_id, installment_number)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_installments_status_due
+        ON installments (status, due_date)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_installments_due_date
+        ON installments (due_date)
+    ''')
+
+    # Sales summaries by date range and joins to customers/products
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sales_created_at
+        ON sales (created_at)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sales_customer_id
+        ON sales (customer_id)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sales_product_id
+        ON sales (product_id)
+    ''')
+
+    # Witness lookup per sale
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_witnesses_sale_id
+        ON witnesses (sale_id)
+    ''')
+
+    # Low stock threshold scans
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_stock
+        ON products (stock)
+    ''')
+
+def _add_sales_daily_rollup(c):
+    rollups.create_rollup_table(c)
+    rollups.rebuild_sales_rollup(c)
+
+# Tables whose changes are counted for HTTP validators (ETag / Last-Modified)
+VERSIONED_TABLES = ('products', 'customers', 'sales', 'installments', 'settings')
+
+def _add_table_versions(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for table in VERSIONED_TABLES:
+        c.execute(
+            'INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)',
+            (table,)
+        )
+        for event, suffix in (('INSERT', 'ai'), ('UPDATE', 'au'), ('DELETE', 'ad')):
+            c.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix}
+                AFTER {event} ON {table} BEGIN
+                    UPDATE table_versions
+                    SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+                    WHERE table_name = '{table}';
+                END
+            ''')
+
+def _add_installment_aging(c):
+    aging.create_aging_table(c)
+
+def _add_installment_paid_amount(c):
+    # Running total received per installment, so partial payments can be posted
+    c.execute('ALTER TABLE installments ADD COLUMN paid_amount REAL NOT NULL DEFAULT 0')
+    c.execute("UPDATE installments SET paid_amount = amount WHERE status = 'Paid'")
+
+def _add_sale_balances(c):
+    balances.create_balance_table(c)
+    balances.rebuild_sale_balances(c)
+
+def _add_sort_indexes(c):
+    # Columns the desktop and web lists sort on, so ORDER BY ... LIMIT walks an index
+    c.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_products_price ON products (price)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_customers_name ON customers (name)')
+
+def _add_customer_keys(c):
+    # Normalized CNIC and phone keys; existing duplicates are merged before
+    # the unique indexes go on
+    c.execute('ALTER TABLE customers ADD COLUMN cnic_key TEXT')
+    c.execute('ALTER TABLE customers ADD COLUMN contact_key TEXT')
+    customers.merge_duplicates(c)
+    customers.create_customer_keys(c)
+
+def _add_stock_reservations(c):
+    inventory.create_inventory_tables(c)
+    # Low-stock lists filter and order on (stock, name) straight off the index
+    c.execute('CREATE INDEX IF NOT EXISTS idx_products_stock_name ON products (stock, name)')
+    c.execute('DROP INDEX IF EXISTS idx_products_stock')
+
+def _add_suspended_schema(c):
+    importer.create_import_tables(c)
+
+# (version, description, function taking a cursor); append only, never renumber
+MIGRATIONS = [
+    (1, 'Add lookup indexes for sales, installments and products', _add_lookup_indexes),
+    (2, 'Add sales_daily_rollup for date-range summaries', _add_sales_daily_rollup),
+    (3, 'Add table_versions change counters for HTTP caching', _add_table_versions),
+    (4, 'Add installment_aging overdue buckets', _add_installment_aging),
+    (5, 'Add installments.paid_amount for partial payments', _add_installment_paid_amount),
+    (6, 'Add sale_balances ledger of paid and outstanding amounts', _add_sale_balances),
+    (7, 'Add indexes for sorted product and customer lists', _add_sort_indexes),
+    (8, 'Add unique customer CNIC and phone keys, merging duplicates', _add_customer_keys),
+    (9, 'Add stock_reservations and the non-negative stock guard', _add_stock_reservations),
+    (10, 'Add suspended_schema for indexes a bulk import rebuilds', _add_suspended_schema),
+]
+
+def ensure_version_table(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def get_schema_version(conn):
+    """Return the highest applied migration version (0 for a fresh database)"""
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+def apply_migrations(conn, migrations=None):
+    """Apply pending migrations in order, each in its own transaction.
+
+    Returns the list of versions applied by this call.
+    """
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m[0])
+    ensure_version_table(conn.cursor())
+    conn.commit()
+
+    applied = []
+    for version, description, upgrade in migrations:
+        if version <= get_schema_version(conn):
+            continue
+
+        # IMMEDIATE takes the write lock up front so two processes starting
+        # together cannot both apply the same version
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            c = conn.cursor()
+            upgrade(c)
+            c.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+
+    return applied
@@ -1,121 +1,611 @@
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
 import json
+import aging
+import balances
+import customers
+import importer
+import inventory
+import migrations
+import payments
+import search
+import rollups
+import sales
+from cache import TTLCache, cached, invalidates
+from writer import WriteQueue, serialized
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection becomes free within the timeout"""
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by the model classes.
+
+    A thread that borrows a connection while already holding one gets the
+    same connection back, and an idle connection last used by the calling
+    thread is preferred so its page cache stays warm.
+    """
+
+    def __init__(self, connect, max_size=5, timeout=30.0, health_check_interval=60.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._closed = False
+
+    def acquire(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, 'conn', None) is not conn:
+            raise ValueError("connection was not acquired by this thread")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+
+        self._local.conn = None
+        self._local.last = conn
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle)
+            }
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolExhaustedError("connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._take_idle()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"no connection available after {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        if conn is None:
+            return self._open()
+        if time.monotonic() - idle_since >= self.health_check_interval and not self._is_healthy(conn):
+            conn.close()
+            return self._open()
+        return conn
+
+    def _take_idle(self):
+        # Prefer the connection this thread used last
+        last = getattr(self._local, 'last', None)
+        for index, (conn, idle_since) in enumerate(self._idle):
+            if conn is last:
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    def _open(self):
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+# PRAGMA settings applied to every pooled connection
+STORAGE_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000
+    },
+    'high-throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000
+    }
+}
+
+SYNCHRONOUS_LEVELS = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+TEMP_STORE_MODES = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+def resolve_storage_profile(profile, overrides=None):
+    """Merge a named storage profile with per-setting overrides"""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(
+            f"Unknown storage profile '{profile}'. "
+            f"Choose one of: {', '.join(STORAGE_PROFILES)}"
+        )
+    settings = dict(STORAGE_PROFILES[profile])
+    for name, value in (overrides or {}).items():
+        if name not in settings:
+            raise ValueError(f"Unsupported storage setting '{name}'")
+        settings[name] = value
+    return settings
+
+# Versioned tables each cache namespace is read from; an entry is reloaded
+# once any of them changes, in this process or another. Derived tables are
+# not versioned: rebuilding one counts as a change to its source table
+CACHE_TABLES = {
+    'products': ('products',),
+    # Read from sales_daily_rollup
+    'summary': ('sales',),
+    'dashboard': ('sales', 'installments', 'products', 'customers'),
+    'settings': ('settings',),
+    'aging': ('installments',),
+    # Closed-period aggregates: the rollup follows sales
+    'reports': ('sales', 'customers')
+}
+
+def _touch_table_versions(c, *tables):
+    c.executemany('''
+        UPDATE table_versions
+        SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+        WHERE table_name = ?
+    ''', [(table,) for table in tables])
 
 class Database:
-    def __init__(self, db_file="sales_management.db"):
+    def __init__(self, db_file="sales_management.db", pool_size=5, pool_timeout=30.0,
+                 storage_profile='durable', storage_overrides=None, statement_cache_size=256,
+                 cache_size=1024, cache_ttl=30.0, cache_recheck_interval=1.0,
+                 serialize_writes=True):
         self.db_file = db_file
+        # Shared by every model instance on this Database; cache_size=0 disables it
+        self.cache = TTLCache(cache_size, cache_ttl, self.cache_version) if cache_size else None
+        # Cache hits trust table versions read this recently instead of
+        # querying them again; see cache_version
+        self.cache_recheck_interval = cache_recheck_interval
+        self._seen_versions = {}
+        self._seen_versions_lock = threading.Lock()
+        self.statement_cache_size = statement_cache_size
+        self.storage_profile = storage_profile
+        self.storage_settings = resolve_storage_profile(storage_profile, storage_overrides)
+        self.fts_enabled = search.fts5_available()
+        self.pool = ConnectionPool(
+            self.get_connection,
+            max_size=pool_size,
+            timeout=pool_timeout
+        )
+        # Model writes in this process run one at a time on the writer thread
+        self.writer = WriteQueue(self) if serialize_writes else None
         self.init_db()
 
     def get_connection(self):
-        conn = sqlite3.connect(self.db_file)
+        # Pooled connections live for the whole process, so each one keeps its
+        # compiled statements; the models' SQL is constant text and hits this cache
+        conn = sqlite3.connect(
+            self.db_file,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
         conn.row_factory = sqlite3.Row
+        self._apply_storage_settings(conn)
         return conn
 
+    def _apply_storage_settings(self, conn):
+        settings = self.storage_settings
+        # busy_timeout first so switching journal mode can wait out other writers
+        conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+        conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+
+    def get_storage_settings(self):
+        """Read back the PRAGMA values actually in effect on a pooled connection"""
+        with self.connection() as conn:
+            def pragma(name):
+                return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+            return {
+                'profile': self.storage_profile,
+                'journal_mode': pragma('journal_mode').upper(),
+                'synchronous': SYNCHRONOUS_LEVELS.get(pragma('synchronous')),
+                'cache_size': pragma('cache_size'),
+                'mmap_size': pragma('mmap_size'),
+                'temp_store': TEMP_STORE_MODES.get(pragma('temp_store')),
+                'busy_timeout': pragma('busy_timeout')
+            }
+
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with-block"""
+        return self.pool.connection()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.pool.close()
+
     def init_db(self):
-        conn = self.get_connection()
+        with self.connection() as conn:
+            c = conn.cursor()
+
+            # Create Products table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    brand TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    price REAL NOT NULL,
+                    stock INTEGER NOT NULL,
+                    description TEXT,
+                    features TEXT,
+                    tags TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Create Customers table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS customers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    contact_number TEXT NOT NULL,
+                    cnic TEXT,
+                    address TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Create Sales table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS sales (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    customer_id INTEGER NOT NULL,
+                    product_id INTEGER NOT NULL,
+                    sale_type TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    markup_percentage REAL,
+                    total_with_markup REAL,
+                    advance_payment REAL,
+                    installment_count INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (customer_id) REFERENCES customers (id),
+                    FOREIGN KEY (product_id) REFERENCES products (id)
+                )
+            ''')
+
+            # Create Witnesses table for installment sales
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS witnesses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sale_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    cnic TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (sale_id) REFERENCES sales (id)
+                )
+            ''')
+
+            # Create Installments table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS installments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sale_id INTEGER NOT NULL,
+                    installment_number INTEGER NOT NULL,
+                    amount REAL NOT NULL,
+                    due_date DATE NOT NULL,
+                    status TEXT DEFAULT 'Pending',
+                    paid_date DATE,
+                    remaining_balance REAL NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (sale_id) REFERENCES sales (id)
+                )
+            ''')
+
+            # Create Settings table
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    business_name TEXT,
+                    business_address TEXT,
+                    business_phone TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            conn.commit()
+
+            # Upgrade existing databases in place
+            self.applied_migrations = migrations.apply_migrations(conn)
+
+            # Finish the rebuild of an import that stopped before its end
+            importer.resume_table_maintenance(conn)
+
+            # Full-text search tables, when SQLite was built with FTS5
+            if self.fts_enabled:
+                search.ensure_search_tables(conn)
+
+    def get_table_versions(self, tables):
+        """Change counter and last change time for each table, read fresh"""
+        placeholders = ', '.join('?' for _ in tables)
+        with self.connection() as conn:
+            rows = conn.execute(
+                f'SELECT table_name, version, changed_at FROM table_versions '
+                f'WHERE table_name IN ({placeholders})',
+                list(tables)
+            ).fetchall()
+        now = time.monotonic()
+        with self._seen_versions_lock:
+            for row in rows:
+                seen = self._seen_versions.get(row['table_name'])
+                # Keep the newest counter when reads from several threads overlap
+                version = max(row['version'], seen[0]) if seen else row['version']
+                self._seen_versions[row['table_name']] = (version, now)
+        return {row['table_name']: (row['version'], row['changed_at']) for row in rows}
+
+    def cache_version(self, namespace):
+        """Change counters of the tables behind a cache namespace, or None.
+
+        Counters read within cache_recheck_interval are reused, so a burst of
+        cache hits costs one table_versions query. A conditional request reads
+        its ETag's versions fresh first, so the body it gets from the cache is
+        never older than the ETag; other callers may see another process's
+        write up to the interval late.
+        """
+        tables = CACHE_TABLES.get(namespace)
+        if not tables:
+            return None
+        now = time.monotonic()
+        with self._seen_versions_lock:
+            seen = [self._seen_versions.get(table) for table in tables]
+        if all(s and now - s[1] < self.cache_recheck_interval for s in seen):
+            return tuple(version for version, _ in seen)
+        versions = self.get_table_versions(tables)
+        return tuple(versions[table][0] for table in tables)
+
+    def get_cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    def get_schema_version(self):
+        with self.connection() as conn:
+            return migrations.get_schema_version(conn)
+
+# Keyset pagination: page sizes and the columns each list view returns
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+PRODUCT_VIEWS = {
+    'list': ('p.id', 'p.name', 'p.brand', 'p.model', 'p.category', 'p.price', 'p.stock'),
+    'full': ('p.id', 'p.name', 'p.brand', 'p.model', 'p.category', 'p.price', 'p.stock',
+             'p.description', 'p.features', 'p.tags', 'p.created_at', 'p.updated_at')
+}
+
+# Outstanding totals come from the sale_balances ledger, one row per sale
+CUSTOMER_OUTSTANDING = '''(
+    SELECT COALESCE(SUM(b.outstanding_amount), 0) FROM sale_balances b
+    WHERE b.customer_id = cu.id
+) AS outstanding_amount'''
+CUSTOMER_OVERDUE = '''(
+    SELECT COALESCE(SUM(b.overdue_amount), 0) FROM sale_balances b
+    WHERE b.customer_id = cu.id
+) AS overdue_amount'''
+# Purchase history per customer through idx_sales_customer_id
+CUSTOMER_SALE_COUNT = '''(
+    SELECT COUNT(*) FROM sales s WHERE s.customer_id = cu.id
+) AS sale_count'''
+CUSTOMER_LAST_SALE = '''(
+    SELECT MAX(s.created_at) FROM sales s WHERE s.customer_id = cu.id
+) AS last_sale_date'''
+
+CUSTOMER_VIEWS = {
+    'list': ('cu.id', 'cu.name', 'cu.contact_number', 'cu.cnic', CUSTOMER_OUTSTANDING),
+    'full': ('cu.id', 'cu.name', 'cu.contact_number', 'cu.cnic', 'cu.address', 'cu.created_at',
+             CUSTOMER_OUTSTANDING, CUSTOMER_OVERDUE, CUSTOMER_SALE_COUNT, CUSTOMER_LAST_SALE)
+}
+
+INSTALLMENT_VIEWS = {
+    'list': ('i.id', 'i.sale_id', 'i.installment_number', 'i.amount', 'i.due_date',
+             'i.status', 'i.paid_amount', 'i.remaining_balance',
+             'c.name AS customer_name', 'p.name AS product_name'),
+    'full': ('i.id', 'i.sale_id', 'i.installment_number', 'i.amount', 'i.due_date',
+             'i.status', 'i.paid_amount', 'i.paid_date', 'i.remaining_balance', 's.sale_type',
+             's.total_with_markup', 's.advance_payment', 's.installment_count',
+             's.created_at AS sale_date', 'c.name AS customer_name',
+             'c.contact_number', 'c.cnic', 'p.name AS product_name', 'p.brand', 'p.model')
+}
+
+# Columns a list can be sorted on, pushed down to SQL as ORDER BY (value, id)
+PRODUCT_SORTS = {
+    'name': 'p.name', 'brand': 'p.brand', 'category': 'p.category',
+    'price': 'p.price', 'stock': 'p.stock'
+}
+
+CUSTOMER_SORTS = {
+    'name': 'cu.name', 'contact_number': 'cu.contact_number', 'created_at': 'cu.created_at'
+}
+
+INSTALLMENT_SORTS = {
+    'due_date': 'i.due_date', 'amount': 'i.amount', 'remaining_balance': 'i.remaining_balance',
+    'status': 'i.status', 'customer_name': 'c.name', 'product_name': 'p.name'
+}
+
+def _page_limit(limit):
+    return max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+def _projection(views, view):
+    if view not in views:
+        raise ValueError(f"Unknown view '{view}'. Choose one of: {', '.join(views)}")
+    return ', '.join(views[view])
+
+def _sort_expression(sorts, sort):
+    if sort not in sorts:
+        raise ValueError(f"Unknown sort '{sort}'. Choose one of: {', '.join(sorts)}")
+    return sorts[sort]
+
+def _keyset_after(value, row_id, descending):
+    """WHERE fragment resuming after a (value, id) pair in the given direction"""
+    op = '<' if descending else '>'
+    return f' AND ({value} {op} ? OR ({value} = ? AND {row_id} {op} ?))'
+
+def _fetch_page(c, query, params, limit, cursor_columns):
+    """Run a keyset-ordered query and return one page plus the cursor for the next.
+
+    cursor_columns maps each cursor parameter (e.g. 'after_id') to the row
+    column it is read from.
+    """
+    rows = c.execute(query + ' LIMIT ?', list(params) + [limit + 1]).fetchall()
+    items = [dict(row) for row in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = {param: last[column] for param, column in cursor_columns.items()}
+
+    for item in items:
+        item.pop('search_rank', None)
+        item.pop('sort_value', None)
+    return {'items': items, 'next_cursor': next_cursor}
+
+def _search_page(db, table, alias, fts_table, like_columns, columns, search_term,
+                 limit, after_id, after_rank, with_total, sort_expr=None, descending=False,
+                 after_value=None):
+    """Page through a table by id, or by FTS rank then id when searching.
+
+    With sort_expr the page is ordered by (sort_expr, id) instead, ascending
+    or descending, and the cursor carries after_value and after_id.
+    """
+    match = search.match_query(search_term) if search_term and db.fts_enabled else None
+    direction = 'DESC' if descending else 'ASC'
+    with db.connection() as conn:
         c = conn.cursor()
+        if match:
+            # Ranked results; the rank travels in the cursor so the next page
+            # resumes after the last (rank, id) pair
+            key = 'sort_value' if sort_expr else 'search_rank'
+            sort_column = f', {sort_expr} AS sort_value' if sort_expr else ''
+            query = f'''
+                SELECT * FROM (
+                    SELECT {columns}, {search.rank_expression(fts_table)} AS search_rank
+                        {sort_column}
+                    FROM {fts_table}
+                    JOIN {table} {alias} ON {alias}.id = {fts_table}.rowid
+                    WHERE {fts_table} MATCH ?
+                ) WHERE 1=1
+            '''
+            params = [match]
+            after_key = after_value if sort_expr else after_rank
+            if after_id is not None and after_key is not None:
+                query += _keyset_after(key, 'id', descending if sort_expr else False)
+                params.extend([after_key, after_key, after_id])
+            if sort_expr:
+                query += f' ORDER BY sort_value {direction}, id {direction}'
+                cursor_columns = {'after_value': 'sort_value', 'after_id': 'id'}
+            else:
+                query += ' ORDER BY search_rank, id'
+                cursor_columns = {'after_rank': 'search_rank', 'after_id': 'id'}
+            page = _fetch_page(c, query, params, limit, cursor_columns)
+            count_query = f'SELECT COUNT(*) FROM {fts_table} WHERE {fts_table} MATCH ?'
+            count_params = [match]
+        else:
+            where = ' WHERE 1=1'
+            count_params = []
+            if search_term:
+                where += ' AND (' + ' OR '.join(
+                    f'{alias}.{col} LIKE ?' for col in like_columns
+                ) + ')'
+                count_params = [f'%{search_term}%'] * len(like_columns)
 
-        # Create Products table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                brand TEXT NOT NULL,
-                model TEXT NOT NULL,
-                category TEXT NOT NULL,
-                price REAL NOT NULL,
-                stock INTEGER NOT NULL,
-                description TEXT,
-                features TEXT,
-                tags TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Create Customers table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                contact_number TEXT NOT NULL,
-                cnic TEXT,
-                address TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Create Sales table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                sale_type TEXT NOT NULL,
-                amount REAL NOT NULL,
-                markup_percentage REAL,
-                total_with_markup REAL,
-                advance_payment REAL,
-                installment_count INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers (id),
-                FOREIGN KEY (product_id) REFERENCES products (id)
-            )
-        ''')
-
-        # Create Witnesses table for installment sales
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS witnesses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sale_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                cnic TEXT NOT NULL,
-                address TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (sale_id) REFERENCES sales (id)
-            )
-        ''')
-
-        # Create Installments table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS installments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sale_id INTEGER NOT NULL,
-                installment_number INTEGER NOT NULL,
-                amount REAL NOT NULL,
-                due_date DATE NOT NULL,
-                status TEXT DEFAULT 'Pending',
-                paid_date DATE,
-                remaining_balance REAL NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (sale_id) REFERENCES sales (id)
-            )
-        ''')
-
-        # Create Settings table
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                business_name TEXT,
-                business_address TEXT,
-                business_phone TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+            params = list(count_params)
+            if sort_expr:
+                query = f'SELECT {columns}, {sort_expr} AS sort_value FROM {table} {alias}' + where
+                if after_id is not None and after_value is not None:
+                    query += _keyset_after(sort_expr, f'{alias}.id', descending)
+                    params.extend([after_value, after_value, after_id])
+                query += f' ORDER BY {sort_expr} {direction}, {alias}.id {direction}'
+                cursor_columns = {'after_value': 'sort_value', 'after_id': 'id'}
+            else:
+                query = f'SELECT {columns} FROM {table} {alias}' + where
+                if after_id is not None:
+                    query += f' AND {alias}.id > ?'
+                    params.append(after_id)
+                query += f' ORDER BY {alias}.id'
+                cursor_columns = {'after_id': 'id'}
+            page = _fetch_page(c, query, params, limit, cursor_columns)
+            count_query = f'SELECT COUNT(*) FROM {table} {alias}' + where
 
-        conn.commit()
-        conn.close()
+        if with_total:
+            page['total'] = c.execute(count_query, count_params).fetchone()[0]
+        return page
 
 class ProductModel:
     def __init__(self, db):
         self.db = db
 
+    @invalidates('products', 'dashboard')
+    @serialized
     def add_product(self, data):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
             c.execute('''
                 INSERT INTO products (
                     name, brand, model, category, price, stock,
@@ -123,7 +613,7 @@ class ProductModel:
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 data['name'], data['brand'], data['model'],
-                data['category'], data['price'], data['stock'],
+                data['category'], data['price'], inventory.check_stock_level(c, data['stock']),
                 data['description'],
                 json.dumps(data['features']),
                 json.dumps(data['tags'])
@@ -131,13 +621,12 @@ class ProductModel:
             product_id = c.lastrowid
             conn.commit()
             return product_id
-        finally:
-            conn.close()
 
+    @invalidates('products', 'dashboard')
+    @serialized
     def update_product(self, product_id, data):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
             c.execute('''
                 UPDATE products SET
                     name = ?, brand = ?, model = ?, category = ?,
@@ -145,8 +634,8 @@ class ProductModel:
                     features = ?, tags = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             ''', (
-                data['name'], data['brand'], data['model'],
-                data['category'], data['price'], data['stock'],
+                data['name'], data['brand'], data['model'], data['category'], data['price'],
+                inventory.check_stock_level(c, data['stock'], product_id),
                 data['description'],
                 json.dumps(data['features']),
                 json.dumps(data['tags']),
@@ -154,14 +643,26 @@ class ProductModel:
             ))
             conn.commit()
             return True
-        finally:
-            conn.close()
 
+    def has_products(self):
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            return c.execute('SELECT EXISTS (SELECT 1 FROM products)').fetchone()[0] == 1
+
+    @cached('products')
     def get_products(self, search_term=None):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
-            if search_term:
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            match = search.match_query(search_term) if search_term and self.db.fts_enabled else None
+            if match:
+                query = f'''
+                    SELECT p.* FROM products_fts
+                    JOIN products p ON p.id = products_fts.rowid
+                    WHERE products_fts MATCH ?
+                    ORDER BY {search.rank_expression('products_fts')}
+                '''
+                products = c.execute(query, (match,)).fetchall()
+            elif search_term:
                 query = '''
                     SELECT * FROM products 
                     WHERE name LIKE ? OR brand LIKE ? 
@@ -176,48 +677,85 @@ class ProductModel:
                 products = c.execute('SELECT * FROM products').fetchall()
             
             return [dict(product) for product in products]
-        finally:
-            conn.close()
 
+    @cached('products')
+    def get_products_page(self, search_term=None, limit=DEFAULT_PAGE_SIZE, after_id=None,
+                          after_rank=None, view='list', with_total=False, sort=None,
+                          descending=False, after_value=None):
+        return _search_page(
+            self.db, 'products', 'p', 'products_fts', ('name', 'brand', 'model', 'tags'),
+            _projection(PRODUCT_VIEWS, view), search_term,
+            _page_limit(limit), after_id, after_rank, with_total,
+            _sort_expression(PRODUCT_SORTS, sort) if sort else None, descending, after_value
+        )
+
+    @cached('products')
+    def get_product(self, product_id):
+        with self.db.connection() as conn:
+            product = conn.execute(
+                'SELECT * FROM products WHERE id = ?', (product_id,)
+            ).fetchone()
+            return dict(product) if product else None
+
+    @cached('products')
     def get_low_stock_products(self, threshold=5):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
             products = c.execute(
-                'SELECT * FROM products WHERE stock <= ?',
+                'SELECT * FROM products WHERE stock <= ? ORDER BY stock, name',
                 (threshold,)
             ).fetchall()
             return [dict(product) for product in products]
-        finally:
-            conn.close()
+
+    def get_available_stock(self, product_id):
+        """Units of a product not held by a reservation; None if there is no such product"""
+        with self.db.connection() as conn:
+            return inventory.available_stock(conn.cursor(), product_id)
+
+    @serialized
+    def reserve_stock(self, product_id, quantity=1, ttl=inventory.DEFAULT_RESERVATION_TTL):
+        """Hold units for an open sale form; raises InsufficientStockError if too few are free"""
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            reservation = inventory.reserve_stock(c, product_id, quantity, ttl)
+            conn.commit()
+            return reservation
+
+    @serialized
+    def release_reservation(self, reservation_id):
+        with self.db.connection() as conn:
+            released = inventory.release_reservation(conn.cursor(), reservation_id)
+            conn.commit()
+            return released
 
 class CustomerModel:
     def __init__(self, db):
         self.db = db
 
+    @serialized
     def add_customer(self, data):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
-            c.execute('''
-                INSERT INTO customers (
-                    name, contact_number, cnic, address
-                ) VALUES (?, ?, ?, ?)
-            ''', (
-                data['name'], data['contact_number'],
-                data.get('cnic'), data['address']
-            ))
-            customer_id = c.lastrowid
+        """Add a customer, or return the existing one with the same CNIC or phone"""
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            customer_id = customers.upsert_customer(
+                c, data['name'], data['contact_number'], data['address'], data.get('cnic')
+            )
             conn.commit()
             return customer_id
-        finally:
-            conn.close()
 
     def get_customers(self, search_term=None):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
-            if search_term:
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            match = search.match_query(search_term) if search_term and self.db.fts_enabled else None
+            if match:
+                query = f'''
+                    SELECT cu.* FROM customers_fts
+                    JOIN customers cu ON cu.id = customers_fts.rowid
+                    WHERE customers_fts MATCH ?
+                    ORDER BY {search.rank_expression('customers_fts')}
+                '''
+                customers = c.execute(query, (match,)).fetchall()
+            elif search_term:
                 query = '''
                     SELECT * FROM customers 
                     WHERE name LIKE ? OR contact_number LIKE ? 
@@ -231,144 +769,153 @@ class CustomerModel:
                 customers = c.execute('SELECT * FROM customers').fetchall()
             
             return [dict(customer) for customer in customers]
-        finally:
-            conn.close()
+
+    def get_customers_page(self, search_term=None, limit=DEFAULT_PAGE_SIZE, after_id=None,
+                           after_rank=None, view='list', with_total=False, sort=None,
+                           descending=False, after_value=None):
+        return _search_page(
+            self.db, 'customers', 'cu', 'customers_fts', ('name', 'contact_number', 'cnic'),
+            _projection(CUSTOMER_VIEWS, view), search_term,
+            _page_limit(limit), after_id, after_rank, with_total,
+            _sort_expression(CUSTOMER_SORTS, sort) if sort else None, descending, after_value
+        )
+
+    def get_customer_balance(self, customer_id):
+        """Totals and per-sale balances of one customer from the ledger"""
+        with self.db.connection() as conn:
+            rows = conn.execute('''
+                SELECT
+                    b.sale_id, b.total_amount, b.paid_to_date, b.outstanding_amount,
+                    b.overdue_amount, b.next_due_date, s.created_at AS sale_date,
+                    p.name AS product_name
+                FROM sale_balances b
+                JOIN sales s ON s.id = b.sale_id
+                JOIN products p ON p.id = s.product_id
+                WHERE b.customer_id = ?
+                ORDER BY b.sale_id
+            ''', (customer_id,)).fetchall()
+            sales = [dict(row) for row in rows]
+            due_dates = [s['next_due_date'] for s in sales if s['next_due_date']]
+            return {
+                'customer_id': customer_id,
+                'paid_to_date': sum(s['paid_to_date'] for s in sales),
+                'outstanding_amount': sum(s['outstanding_amount'] for s in sales),
+                'overdue_amount': sum(s['overdue_amount'] for s in sales),
+                'next_due_date': min(due_dates) if due_dates else None,
+                'sales': sales
+            }
+
+    def get_customer_sales(self, customer_id):
+        """A customer with every sale they made, newest first; None if there is no such customer"""
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            customer = c.execute(
+                'SELECT * FROM customers WHERE id = ?', (customer_id,)
+            ).fetchone()
+            if customer is None:
+                return None
+            rows = c.execute('''
+                SELECT
+                    s.id AS sale_id, s.sale_type, s.created_at AS sale_date,
+                    COALESCE(s.total_with_markup, s.amount) AS total_amount,
+                    p.name AS product_name, p.brand, p.model,
+                    COALESCE(b.paid_to_date, s.amount) AS paid_to_date,
+                    COALESCE(b.outstanding_amount, 0) AS outstanding_amount,
+                    COALESCE(b.overdue_amount, 0) AS overdue_amount,
+                    b.next_due_date
+                FROM sales s
+                JOIN products p ON p.id = s.product_id
+                LEFT JOIN sale_balances b ON b.sale_id = s.id
+                WHERE s.customer_id = ?
+                ORDER BY s.created_at DESC, s.id DESC
+            ''', (customer_id,)).fetchall()
+            return dict(customer, sales=[dict(row) for row in rows])
+
+    @invalidates('dashboard', 'reports')
+    @serialized
+    def merge_duplicates(self):
+        """Merge customers sharing a CNIC or phone and repoint their sales"""
+        with self.db.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            c = conn.cursor()
+            merged = customers.merge_duplicates(c)
+            conn.commit()
+            remaining = c.execute('SELECT COUNT(*) FROM customers').fetchone()[0]
+            return {'merged': merged, 'customers': remaining}
 
 class SaleModel:
     def __init__(self, db):
         self.db = db
 
+    @invalidates('products', 'summary', 'dashboard')
     def create_cash_sale(self, data):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
-            # Create customer
-            c.execute('''
-                INSERT INTO customers (name, contact_number, address)
-                VALUES (?, ?, ?)
-            ''', (data['customer_name'], data['contact_number'], data['address']))
-            customer_id = c.lastrowid
-
-            # Create sale
-            c.execute('''
-                INSERT INTO sales (
-                    customer_id, product_id, sale_type, amount
-                ) VALUES (?, ?, 'cash', ?)
-            ''', (customer_id, data['product_id'], data['amount']))
-            sale_id = c.lastrowid
-
-            # Update product stock
-            c.execute('''
-                UPDATE products 
-                SET stock = stock - ? 
-                WHERE id = ?
-            ''', (data['quantity'], data['product_id']))
-
+        if self.db.writer is not None:
+            # Group-committed with other sales arriving at the same time
+            return self.db.writer.run_grouped(sales.record_cash_sale, data)
+        with self.db.connection() as conn:
+            sale_id = sales.record_cash_sale(conn.cursor(), data)
             conn.commit()
             return sale_id
-        finally:
-            conn.close()
 
+    @invalidates('products', 'summary', 'dashboard')
     def create_installment_sale(self, data):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
-            # Create customer
-            c.execute('''
-                INSERT INTO customers (
-                    name, contact_number, cnic, address
-                ) VALUES (?, ?, ?, ?)
-            ''', (
-                data['customer_name'], data['contact_number'],
-                data['cnic'], data['address']
-            ))
-            customer_id = c.lastrowid
-
-            # Create sale
-            c.execute('''
-                INSERT INTO sales (
-                    customer_id, product_id, sale_type,
-                    amount, markup_percentage, total_with_markup,
-                    advance_payment, installment_count
-                ) VALUES (?, ?, 'installment', ?, ?, ?, ?, ?)
-            ''', (
-                customer_id, data['product_id'],
-                data['amount'], data['markup_percentage'],
-                data['total_with_markup'], data['advance_payment'],
-                data['installment_count']
-            ))
-            sale_id = c.lastrowid
-
-            # Create witness record
-            c.execute('''
-                INSERT INTO witnesses (
-                    sale_id, name, cnic, address
-                ) VALUES (?, ?, ?, ?)
-            ''', (
-                sale_id, data['witness_name'],
-                data['witness_cnic'], data['witness_address']
-            ))
-
-            # Create installment records
-            for installment in data['installments']:
-                c.execute('''
-                    INSERT INTO installments (
-                        sale_id, installment_number,
-                        amount, due_date, remaining_balance
-                    ) VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    sale_id, installment['number'],
-                    installment['amount'], installment['due_date'],
-                    installment['remaining_balance']
-                ))
-
-            # Update product stock
-            c.execute('''
-                UPDATE products 
-                SET stock = stock - 1 
-                WHERE id = ?
-            ''', (data['product_id'],))
-
+        if self.db.writer is not None:
+            return self.db.writer.run_grouped(sales.record_installment_sale, data)
+        with self.db.connection() as conn:
+            sale_id = sales.record_installment_sale(conn.cursor(), data)
             conn.commit()
             return sale_id
-        finally:
-            conn.close()
 
+    @cached('summary', ttl=60)
     def get_sales_summary(self, start_date=None, end_date=None):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            # Read the daily rollup: one row per day, type and category
             query = '''
                 SELECT 
-                    s.sale_type,
-                    COUNT(*) as count,
-                    SUM(CASE 
-                        WHEN s.sale_type = 'cash' THEN s.amount 
-                        ELSE s.total_with_markup 
-                    END) as total_amount
-                FROM sales s
+                    sale_type,
+                    SUM(sale_count) as count,
+                    SUM(total_amount) as total_amount
+                FROM sales_daily_rollup
             '''
             
             params = []
             if start_date and end_date:
-                query += ' WHERE s.created_at BETWEEN ? AND ?'
+                query += ' WHERE sale_date BETWEEN date(?) AND date(?)'
                 params.extend([start_date, end_date])
             
-            query += ' GROUP BY s.sale_type'
+            query += ' GROUP BY sale_type'
             
             results = c.execute(query, params).fetchall()
             return [dict(row) for row in results]
-        finally:
-            conn.close()
+
+    @invalidates('summary', 'dashboard', 'reports')
+    @serialized
+    def rebuild_sales_rollup(self):
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            rollups.rebuild_sales_rollup(c)
+            _touch_table_versions(c, 'sales')
+            conn.commit()
+            return c.execute('SELECT COUNT(*) FROM sales_daily_rollup').fetchone()[0]
+
+    @invalidates('dashboard')
+    @serialized
+    def rebuild_sale_balances(self):
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            balances.rebuild_sale_balances(c)
+            _touch_table_versions(c, 'sales')
+            conn.commit()
+            return c.execute('SELECT COUNT(*) FROM sale_balances').fetchone()[0]
 
 class InstallmentModel:
     def __init__(self, db):
         self.db = db
 
     def get_installments(self, status=None, search_term=None):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
             query = '''
                 SELECT 
                     i.*, s.*, c.name as customer_name,
@@ -385,7 +932,17 @@ class InstallmentModel:
                 query += ' AND i.status = ?'
                 params.append(status)
             
-            if search_term:
+            match = search.match_query(search_term) if search_term and self.db.fts_enabled else None
+            if match:
+                query += '''
+                    AND (s.customer_id IN (
+                        SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?
+                    ) OR s.product_id IN (
+                        SELECT rowid FROM products_fts WHERE products_fts MATCH ?
+                    ))
+                '''
+                params.extend([match, match])
+            elif search_term:
                 query += '''
                     AND (c.name LIKE ? OR p.name LIKE ? 
                     OR p.brand LIKE ? OR p.model LIKE ?)
@@ -395,44 +952,293 @@ class InstallmentModel:
             
             installments = c.execute(query, params).fetchall()
             return [dict(installment) for installment in installments]
-        finally:
-            conn.close()
 
+    def get_installments_page(self, status=None, search_term=None, limit=DEFAULT_PAGE_SIZE,
+                              after_due_date=None, after_id=None, view='list',
+                              with_total=False, sort=None, descending=False,
+                              after_value=None):
+        limit = _page_limit(limit)
+        columns = _projection(INSTALLMENT_VIEWS, view)
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            from_clause = '''
+                FROM installments i
+                JOIN sales s ON i.sale_id = s.id
+                JOIN customers c ON s.customer_id = c.id
+                JOIN products p ON s.product_id = p.id
+                WHERE 1=1
+            '''
+
+            params = []
+            if status:
+                from_clause += ' AND i.status = ?'
+                params.append(status)
+
+            match = search.match_query(search_term) if search_term and self.db.fts_enabled else None
+            if match:
+                from_clause += '''
+                    AND (s.customer_id IN (
+                        SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?
+                    ) OR s.product_id IN (
+                        SELECT rowid FROM products_fts WHERE products_fts MATCH ?
+                    ))
+                '''
+                params.extend([match, match])
+            elif search_term:
+                from_clause += '''
+                    AND (c.name LIKE ? OR p.name LIKE ? 
+                    OR p.brand LIKE ? OR p.model LIKE ?)
+                '''
+                params.extend([f'%{search_term}%'] * 4)
+
+            page_params = list(params)
+            if sort:
+                sort_expr = _sort_expression(INSTALLMENT_SORTS, sort)
+                direction = 'DESC' if descending else 'ASC'
+                query = f'SELECT {columns}, {sort_expr} AS sort_value ' + from_clause
+                if after_value is not None and after_id is not None:
+                    query += _keyset_after(sort_expr, 'i.id', descending)
+                    page_params.extend([after_value, after_value, after_id])
+                query += f' ORDER BY {sort_expr} {direction}, i.id {direction}'
+                cursor_columns = {'after_value': 'sort_value', 'after_id': 'id'}
+            else:
+                query = f'SELECT {columns} ' + from_clause
+                if after_due_date is not None and after_id is not None:
+                    query += ' AND (i.due_date > ? OR (i.due_date = ? AND i.id > ?))'
+                    page_params.extend([after_due_date, after_due_date, after_id])
+                query += ' ORDER BY i.due_date, i.id'
+                cursor_columns = {'after_due_date': 'due_date', 'after_id': 'id'}
+
+            page = _fetch_page(c, query, page_params, limit, cursor_columns)
+            if with_total:
+                page['total'] = c.execute(
+                    'SELECT COUNT(*) ' + from_clause, params
+                ).fetchone()[0]
+            return page
+
+    @invalidates('dashboard', 'aging')
+    @serialized
     def mark_installment_paid(self, sale_id, installment_number):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            was_overdue = c.execute('''
+                SELECT 1 FROM installments
+                WHERE sale_id = ? AND installment_number = ? AND status = 'Overdue'
+            ''', (sale_id, installment_number)).fetchone()
             c.execute('''
                 UPDATE installments 
                 SET status = 'Paid',
+                    paid_amount = amount,
                     paid_date = CURRENT_DATE
                 WHERE sale_id = ? 
                 AND installment_number = ?
             ''', (sale_id, installment_number))
+            payments.recompute_balances(c, sale_id, installment_number)
+            balances.refresh_sales(c, [sale_id])
+            if was_overdue:
+                aging.refresh_aging(c, date.today().isoformat())
             conn.commit()
             return True
-        finally:
-            conn.close()
+
+    @invalidates('dashboard', 'aging')
+    @serialized
+    def post_payments(self, items, paid_date=None, all_or_nothing=False):
+        """Post many payments in one transaction and report on each.
+
+        Each item has sale_id, an optional installment_number to start from
+        (default: the sale's earliest unpaid one) and an optional amount
+        (default: what that installment still owes); see payments.py. A
+        rejected item is rolled back on its own unless all_or_nothing is set,
+        in which case any rejection rolls back the whole batch.
+        """
+        paid_date = paid_date or date.today().isoformat()
+        results = []
+        first_paid = {}
+        overdue_touched = False
+        with self.db.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            c = conn.cursor()
+            for index, item in enumerate(items):
+                c.execute('SAVEPOINT payment_item')
+                try:
+                    posted = payments.apply_payment(c, item, paid_date)
+                except ValueError as e:
+                    c.execute('ROLLBACK TO payment_item')
+                    c.execute('RELEASE payment_item')
+                    sale_id = item.get('sale_id') if isinstance(item, dict) else None
+                    results.append({'index': index, 'sale_id': sale_id,
+                                    'success': False, 'error': str(e)})
+                    continue
+                c.execute('RELEASE payment_item')
+
+                sale_id = posted['sale_id']
+                first = posted['allocations'][0]['installment_number']
+                first_paid[sale_id] = min(first, first_paid.get(sale_id, first))
+                overdue_touched = overdue_touched or any(
+                    a['was_overdue'] for a in posted['allocations']
+                )
+                results.append(dict(posted, index=index, success=True))
+
+            failed = sum(1 for r in results if not r['success'])
+            if failed and all_or_nothing:
+                conn.rollback()
+                for result in results:
+                    if result['success']:
+                        result.update(success=False, error="Batch rolled back")
+                return {'posted': 0, 'failed': len(results), 'results': results}
+
+            for sale_id, first in first_paid.items():
+                payments.recompute_balances(c, sale_id, first)
+            balances.refresh_sales(c, first_paid)
+            if overdue_touched:
+                aging.refresh_aging(c, date.today().isoformat())
+            conn.commit()
+            return {'posted': len(results) - failed, 'failed': failed, 'results': results}
+
+    @invalidates('dashboard', 'aging')
+    @serialized
+    def refresh_overdue(self, as_of=None):
+        """Mark newly late installments overdue and recount the aging buckets"""
+        as_of = as_of or date.today().isoformat()
+        with self.db.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            c = conn.cursor()
+            sale_ids = aging.sales_falling_due(c, as_of)
+            newly_overdue = aging.mark_overdue(c, as_of)
+            balances.refresh_sales(c, sale_ids)
+            aging.refresh_aging(c, as_of)
+            conn.commit()
+            return {'as_of': as_of, 'newly_overdue': newly_overdue}
+
+    @cached('aging')
+    def get_aging_summary(self):
+        with self.db.connection() as conn:
+            buckets = aging.get_aging(conn.cursor())
+            return {
+                'as_of': buckets[0]['as_of'] if buckets else None,
+                'overdue_count': sum(b['installment_count'] for b in buckets),
+                'overdue_amount': sum(b['total_amount'] for b in buckets),
+                'buckets': buckets
+            }
+
+class DashboardModel:
+    def __init__(self, db):
+        self.db = db
+
+    @cached('dashboard', ttl=15)
+    def get_dashboard(self, low_stock_threshold=5, recent_limit=10, upcoming_limit=10):
+        """Collect every dashboard figure in one connection using SQL aggregates"""
+        with self.db.connection():
+            dashboard = dict(self.get_dashboard_totals(low_stock_threshold))
+            dashboard['recent_sales'] = self.get_recent_sales(recent_limit)
+            dashboard['upcoming_installments'] = self.get_upcoming_installments(upcoming_limit)
+            return dashboard
+
+    # The three parts are independent, so the async API reads them concurrently
+
+    @cached('dashboard', ttl=15)
+    def get_dashboard_totals(self, low_stock_threshold=5):
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            totals = c.execute('''
+                SELECT
+                    COALESCE(SUM(CASE WHEN sale_type = 'cash' THEN total_amount END), 0)
+                        AS cash_sales,
+                    COALESCE(SUM(CASE WHEN sale_type = 'installment' THEN total_amount END), 0)
+                        AS installment_sales
+                FROM sales_daily_rollup
+            ''').fetchone()
+
+            active_installments = c.execute('''
+                SELECT COUNT(*) FROM installments
+                WHERE status IN ('Pending', 'Overdue')
+            ''').fetchone()[0]
+
+            ledger = c.execute('''
+                SELECT
+                    COALESCE(SUM(outstanding_amount), 0) AS outstanding_amount,
+                    COALESCE(SUM(paid_to_date), 0) AS collected_amount
+                FROM sale_balances
+            ''').fetchone()
+
+            overdue = c.execute('''
+                SELECT
+                    COALESCE(SUM(installment_count), 0) AS overdue_count,
+                    COALESCE(SUM(total_amount), 0) AS overdue_amount
+                FROM installment_aging
+            ''').fetchone()
+
+            low_stock_count = c.execute(
+                'SELECT COUNT(*) FROM products WHERE stock <= ?',
+                (low_stock_threshold,)
+            ).fetchone()[0]
+
+            return {
+                'total_sales': totals['cash_sales'] + totals['installment_sales'],
+                'cash_sales': totals['cash_sales'],
+                'installment_sales': totals['installment_sales'],
+                'active_installments': active_installments,
+                'outstanding_amount': ledger['outstanding_amount'],
+                'collected_amount': ledger['collected_amount'],
+                'overdue_count': overdue['overdue_count'],
+                'overdue_amount': overdue['overdue_amount'],
+                'low_stock_count': low_stock_count
+            }
+
+    @cached('dashboard', ttl=15)
+    def get_recent_sales(self, limit=10):
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            recent_sales = c.execute('''
+                SELECT
+                    s.id, s.created_at, s.sale_type,
+                    CASE WHEN s.sale_type = 'cash' THEN s.amount
+                         ELSE s.total_with_markup END AS amount,
+                    c.name AS customer_name, p.name AS product_name
+                FROM sales s
+                JOIN customers c ON s.customer_id = c.id
+                JOIN products p ON s.product_id = p.id
+                ORDER BY s.created_at DESC, s.id DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
+            return [dict(row) for row in recent_sales]
+
+    @cached('dashboard', ttl=15)
+    def get_upcoming_installments(self, limit=10):
+        with self.db.connection() as conn:
+            c = conn.cursor()
+            upcoming_installments = c.execute('''
+                SELECT
+                    i.sale_id, i.installment_number, i.due_date, i.amount, i.status,
+                    c.name AS customer_name, p.name AS product_name
+                FROM installments i
+                JOIN sales s ON i.sale_id = s.id
+                JOIN customers c ON s.customer_id = c.id
+                JOIN products p ON s.product_id = p.id
+                WHERE i.status IN ('Pending', 'Overdue')
+                ORDER BY i.due_date, i.id
+                LIMIT ?
+            ''', (limit,)).fetchall()
+            return [dict(row) for row in upcoming_installments]
 
 class SettingsModel:
     def __init__(self, db):
         self.db = db
 
+    @cached('settings', ttl=300)
     def get_settings(self):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
             settings = c.execute(
                 'SELECT * FROM settings ORDER BY id DESC LIMIT 1'
             ).fetchone()
             return dict(settings) if settings else None
-        finally:
-            conn.close()
 
+    @invalidates('settings')
+    @serialized
     def update_settings(self, data):
-        conn = self.db.get_connection()
-        c = conn.cursor()
-        try:
+        with self.db.connection() as conn:
+            c = conn.cursor()
             c.execute('''
                 INSERT OR REPLACE INTO settings (
                     id, business_name, business_address,
@@ -446,6 +1252,4 @@ class SettingsModel:
                 data['business_phone']
             ))
             conn.commit()
-            return True
-        finally:
-            conn.close()
\ No newline at end of file
+            return True
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""Posting installment payments, including partial payments.
+
+A payment is applied to one sale starting at a given installment (or the
+earliest unpaid one). Money beyond what that installment still owes carries
+over to the sale's next unpaid installments. paid_amount records what each
+installment has received, and remaining_balance is what the sale still owes
+once the installment is settled.
+"""
+from plan_engine import to_cents, from_cents
+
+def apply_payment(c, payment, paid_date):
+    """Apply one payment dict inside the caller's transaction.
+
+    Raises ValueError, leaving the database untouched, when the payment
+    cannot be applied. Returns what was allocated to each installment.
+    """
+    if not isinstance(payment, dict):
+        raise ValueError("Each payment must be an object with a sale_id")
+    try:
+        sale_id = int(payment['sale_id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("A valid sale_id is required")
+
+    rows = c.execute('''
+        SELECT installment_number, amount, paid_amount, status
+        FROM installments
+        WHERE sale_id = ? AND status != 'Paid'
+        ORDER BY installment_number
+    ''', (sale_id,)).fetchall()
+
+    start = payment.get('installment_number')
+    if start is not None:
+        try:
+            start = int(start)
+        except (TypeError, ValueError):
+            raise ValueError("installment_number must be a whole number")
+        if not any(row['installment_number'] == start for row in rows):
+            raise ValueError(f"Installment {start} of sale {sale_id} is not open for payment")
+        rows = [row for row in rows if row['installment_number'] >= start]
+    if not rows:
+        raise ValueError(f"Sale {sale_id} has no unpaid installments")
+
+    due = [to_cents(row['amount']) - to_cents(row['paid_amount']) for row in rows]
+    amount = payment.get('amount')
+    try:
+        requested = due[0] if amount is None else to_cents(amount)
+    except (ArithmeticError, TypeError, ValueError):
+        raise ValueError("Payment amount must be a number")
+    if requested <= 0:
+        raise ValueError("Payment amount must be positive")
+    if requested > sum(due):
+        raise ValueError(
+            f"Payment of {from_cents(requested):.2f} exceeds the {from_cents(sum(due)):.2f} "
+            f"still owed on sale {sale_id}"
+        )
+
+    left = requested
+    allocations = []
+    updates = []
+    for row, row_due in zip(rows, due):
+        if not left:
+            break
+        take = min(row_due, left)
+        left -= take
+        settled = take == row_due
+        paid_amount = from_cents(to_cents(row['paid_amount']) + take)
+        updates.append((
+            paid_amount, 'Paid' if settled else row['status'],
+            paid_date if settled else None, sale_id, row['installment_number']
+        ))
+        allocations.append({
+            'installment_number': row['installment_number'],
+            'applied': from_cents(take),
+            'paid_amount': paid_amount,
+            'status': 'Paid' if settled else row['status'],
+            'was_overdue': row['status'] == 'Overdue'
+        })
+
+    c.executemany('''
+        UPDATE installments
+        SET paid_amount = ?, status = ?, paid_date = COALESCE(?, paid_date)
+        WHERE sale_id = ? AND installment_number = ?
+    ''', updates)
+    return {'sale_id': sale_id, 'applied': from_cents(requested), 'allocations': allocations}
+
+def recompute_balances(c, sale_id, from_number):
+    """Refresh remaining_balance from an installment onward and on every unpaid row"""
+    c.execute('''
+        UPDATE installments
+        SET remaining_balance = (
+            SELECT ROUND(COALESCE(SUM(later.amount - later.paid_amount), 0), 2)
+            FROM installments later
+            WHERE later.sale_id = installments.sale_id
+            AND later.installment_number > installments.installment_number
+        )
+        WHERE sale_id = ? AND (installment_number >= ? OR status != 'Paid')
+    ''', (sale_id, from_number))
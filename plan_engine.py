@@ -0,0 +1,189 @@
+"""Installment plan engine that computes many plans at once.
+
+Amounts are converted to integer paisa with decimal half-up rounding, so
+every plan adds up exactly: the monthly amount is the remaining balance
+divided by the tenure, rounded down, and the last installment absorbs the
+remainder. Batches run as NumPy arrays when NumPy is installed and fall
+back to plain Python integers otherwise; both give identical results.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Days between installments, matching the schedules stored so far
+INSTALLMENT_INTERVAL_DAYS = 30
+
+_CENT = Decimal('0.01')
+
+def to_cents(value):
+    """Convert a rupee amount (or percentage) to an integer number of hundredths"""
+    return int(Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP) * 100)
+
+def from_cents(cents):
+    return int(cents) / 100
+
+def _broadcast(values, size):
+    if isinstance(values, (list, tuple)) or (np is not None and isinstance(values, np.ndarray)):
+        if len(values) != size:
+            raise ValueError("All plan inputs must have the same length")
+        return list(values)
+    return [values] * size
+
+def _plan_size(*inputs):
+    sizes = {len(v) for v in inputs if isinstance(v, (list, tuple))
+             or (np is not None and isinstance(v, np.ndarray))}
+    if len(sizes) > 1:
+        raise ValueError("All plan inputs must have the same length")
+    return sizes.pop() if sizes else 1
+
+def compute_plans(amounts, advances, counts, markups, backend=None):
+    """Compute the figures of many plans in one call.
+
+    Each argument is a sequence or a scalar applied to every plan. Returns a
+    dict of equal-length lists in paisa: markup, total, remaining,
+    installment (regular monthly amount) and last_installment, plus counts.
+    backend is 'numpy', 'python' or None for the best available. Raises
+    ValueError if an advance is negative or more than its plan's total.
+    """
+    size = _plan_size(amounts, advances, counts, markups)
+    amount_c = [to_cents(a) for a in _broadcast(amounts, size)]
+    advance_c = [to_cents(a) for a in _broadcast(advances, size)]
+    markup_bp = [to_cents(m) for m in _broadcast(markups, size)]
+    count_n = [int(n) for n in _broadcast(counts, size)]
+    if any(n < 1 for n in count_n):
+        raise ValueError("Number of installments must be at least 1")
+    if any(a < 0 for a in advance_c):
+        raise ValueError("Advance payment cannot be negative")
+
+    if backend is None:
+        backend = 'numpy' if np is not None else 'python'
+    if backend == 'numpy':
+        if np is None:
+            raise ValueError("NumPy backend requested but NumPy is not installed")
+        plans = _compute_numpy(amount_c, advance_c, count_n, markup_bp)
+    elif backend == 'python':
+        plans = _compute_python(amount_c, advance_c, count_n, markup_bp)
+    else:
+        raise ValueError(f"Unknown plan backend '{backend}'")
+    if any(remaining < 0 for remaining in plans['remaining']):
+        raise ValueError("Advance payment cannot exceed the total with markup")
+    return plans
+
+def _compute_numpy(amount_c, advance_c, count_n, markup_bp):
+    amount = np.asarray(amount_c, dtype=np.int64)
+    advance = np.asarray(advance_c, dtype=np.int64)
+    counts = np.asarray(count_n, dtype=np.int64)
+    # Half-up rounding of amount * markup% in integer arithmetic
+    markup = (amount * np.asarray(markup_bp, dtype=np.int64) + 5000) // 10000
+    total = amount + markup
+    remaining = total - advance
+    installment = remaining // counts
+    last = remaining - installment * (counts - 1)
+    return {
+        'counts': counts.tolist(),
+        'markup': markup.tolist(),
+        'total': total.tolist(),
+        'remaining': remaining.tolist(),
+        'installment': installment.tolist(),
+        'last_installment': last.tolist()
+    }
+
+def _compute_python(amount_c, advance_c, count_n, markup_bp):
+    result = {key: [] for key in ('counts', 'markup', 'total', 'remaining',
+                                  'installment', 'last_installment')}
+    for amount, advance, count, bp in zip(amount_c, advance_c, count_n, markup_bp):
+        markup = (amount * bp + 5000) // 10000
+        total = amount + markup
+        remaining = total - advance
+        installment = remaining // count
+        result['counts'].append(count)
+        result['markup'].append(markup)
+        result['total'].append(total)
+        result['remaining'].append(remaining)
+        result['installment'].append(installment)
+        result['last_installment'].append(remaining - installment * (count - 1))
+    return result
+
+def balance_matrix(plans, backend=None):
+    """Remaining balance after each payment as a (plans x max tenure) grid.
+
+    Months past a plan's tenure are 0. Returns a NumPy array with the numpy
+    backend, otherwise a list of lists, in paisa.
+    """
+    if backend is None:
+        backend = 'numpy' if np is not None else 'python'
+    counts = plans['counts']
+    width = max(counts) if counts else 0
+    if backend == 'numpy':
+        months = np.arange(1, width + 1, dtype=np.int64)
+        remaining = np.asarray(plans['remaining'], dtype=np.int64)[:, None]
+        installment = np.asarray(plans['installment'], dtype=np.int64)[:, None]
+        balances = remaining - installment * months[None, :]
+        balances[months[None, :] >= np.asarray(counts)[:, None]] = 0
+        return balances
+    return [
+        [remaining - installment * m if m < count else 0 for m in range(1, width + 1)]
+        for remaining, installment, count in zip(
+            plans['remaining'], plans['installment'], counts
+        )
+    ]
+
+def expand_schedule(plans, index, advance_payment, start_date=None):
+    """Build the installment rows of one plan in the calculate_installments format"""
+    start_date = start_date or datetime.now().date()
+    count = plans['counts'][index]
+    remaining = plans['remaining'][index]
+    installment = plans['installment'][index]
+
+    # First row is the advance payment
+    rows = [{
+        'number': 1,
+        'due_date': start_date,
+        'amount': advance_payment,
+        'status': 'Paid',
+        'remaining_balance': from_cents(remaining)
+    }]
+    for month in range(1, count + 1):
+        amount = plans['last_installment'][index] if month == count else installment
+        rows.append({
+            'number': month + 1,
+            'due_date': start_date + timedelta(days=month * INSTALLMENT_INTERVAL_DAYS),
+            'amount': from_cents(amount),
+            'status': 'Pending',
+            'remaining_balance': from_cents(remaining - installment * month if month < count else 0)
+        })
+    return rows
+
+def calculate_plan(total_amount, advance_payment, number_of_installments, markup_percentage,
+                   start_date=None):
+    """Single plan with its full schedule"""
+    plans = compute_plans(total_amount, advance_payment, number_of_installments,
+                          markup_percentage, backend='python')
+    return {
+        'total_with_markup': from_cents(plans['total'][0]),
+        'markup_amount': from_cents(plans['markup'][0]),
+        'installment_amount': from_cents(plans['installment'][0]),
+        'last_installment_amount': from_cents(plans['last_installment'][0]),
+        'installments': expand_schedule(plans, 0, advance_payment, start_date)
+    }
+
+def compare_options(total_amount, advance_payment, options):
+    """Summaries of several (markup_percentage, months) options side by side"""
+    markups = [markup for markup, _ in options]
+    months = [count for _, count in options]
+    plans = compute_plans(total_amount, advance_payment, months, markups)
+    return [
+        {
+            'markup_percentage': markups[i],
+            'installment_count': months[i],
+            'markup_amount': from_cents(plans['markup'][i]),
+            'total_with_markup': from_cents(plans['total'][i]),
+            'installment_amount': from_cents(plans['installment'][i]),
+            'last_installment_amount': from_cents(plans['last_installment'][i])
+        }
+        for i in range(len(options))
+    ]
@@ -0,0 +1,339 @@
+"""Receipt and statement rendering, one at a time or in bundles.
+
+The templates are compiled once at import into %-format strings, so
+rendering a receipt is a single C-level substitution. Installment rows are
+built with one join, date strings are formatted once per distinct date, and
+the business header is rendered once per business. Bundles stream receipts
+or statements for many sales into one HTML document, reading sales in
+batches from a dedicated connection; write_pdf turns such a document into a
+PDF when PyQt6 is available.
+"""
+import functools
+import html
+import re
+from datetime import datetime
+
+from exporter import date_range_clause
+
+DEFAULT_BATCH_SIZE = 500
+
+_FIELD_RE = re.compile(r'\{\{(\w+)\}\}')
+
+class CompiledTemplate:
+    """A template with {{field}} slots, parsed once into a %-format string"""
+
+    def __init__(self, source):
+        self.fields = tuple(_FIELD_RE.findall(source))
+        self._format = _FIELD_RE.sub(r'%(\1)s', source.replace('%', '%%'))
+
+    def render(self, values):
+        return self._format % values
+
+DOCUMENT_HEAD = CompiledTemplate('''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{{title}}</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; }
+        .receipt { page-break-after: always; margin-bottom: 40px; }
+        .receipt:last-child { page-break-after: auto; }
+        .header { text-align: center; margin-bottom: 20px; }
+        .business-info { text-align: center; margin-bottom: 30px; }
+        .receipt-details { margin-bottom: 20px; }
+        .receipt-details table { width: 100%; border-collapse: collapse; }
+        .receipt-details td { padding: 5px; }
+        .installment-schedule { margin-top: 20px; }
+        .installment-schedule table { width: 100%; border-collapse: collapse; }
+        .installment-schedule th, .installment-schedule td {
+            border: 1px solid #ddd; padding: 8px; text-align: left;
+        }
+        .footer { margin-top: 30px; text-align: center; }
+    </style>
+</head>
+<body>
+''')
+
+DOCUMENT_TAIL = '''</body>
+</html>
+'''
+
+PRINT_SCRIPT = '''<script>
+    window.onload = function() { window.print(); };
+</script>
+'''
+
+BUSINESS_INFO = CompiledTemplate('''
+    <div class="business-info">
+        <h3>{{business_name}}</h3>
+        <p>{{business_address}}</p>
+        <p>Phone: {{business_phone}}</p>
+    </div>
+''')
+
+RECEIPT = CompiledTemplate('''<div class="receipt">
+    <div class="header">
+        <h2>{{title}}</h2>
+    </div>
+    {{business_info}}
+    <div class="receipt-details">
+        <table>
+            <tr>
+                <td><strong>Receipt No:</strong></td>
+                <td>{{receipt_no}}</td>
+                <td><strong>Date:</strong></td>
+                <td>{{date}}</td>
+            </tr>
+            <tr>
+                <td><strong>Customer Name:</strong></td>
+                <td>{{customer_name}}</td>
+                <td><strong>Contact:</strong></td>
+                <td>{{customer_contact}}</td>
+            </tr>
+            <tr>
+                <td><strong>Product:</strong></td>
+                <td colspan="3">{{product_name}}</td>
+            </tr>
+            <tr>
+                <td><strong>Sale Type:</strong></td>
+                <td>{{sale_type}}</td>
+                <td><strong>Amount:</strong></td>
+                <td>{{amount}}</td>
+            </tr>
+        </table>
+    </div>
+    {{balance_section}}
+    {{installment_section}}
+    <div class="footer">
+        <p>Thank you for your business!</p>
+    </div>
+</div>
+''')
+
+BALANCE = CompiledTemplate('''
+    <div class="receipt-details">
+        <table>
+            <tr>
+                <td><strong>Paid to Date:</strong></td>
+                <td>{{paid_to_date}}</td>
+                <td><strong>Outstanding:</strong></td>
+                <td>{{outstanding_amount}}</td>
+            </tr>
+            <tr>
+                <td><strong>Overdue:</strong></td>
+                <td>{{overdue_amount}}</td>
+                <td><strong>Next Due:</strong></td>
+                <td>{{next_due_date}}</td>
+            </tr>
+        </table>
+    </div>
+''')
+
+SCHEDULE = CompiledTemplate('''
+    <div class="installment-schedule">
+        <h3>Installment Schedule</h3>
+        <table>
+            <thead>
+                <tr>
+                    <th>No.</th>
+                    <th>Due Date</th>
+                    <th>Amount</th>
+                    <th>Remaining</th>
+                    <th>Status</th>
+                </tr>
+            </thead>
+            <tbody>
+{{rows}}
+            </tbody>
+        </table>
+    </div>
+''')
+
+SCHEDULE_ROW = CompiledTemplate(
+    '<tr><td>{{number}}</td><td>{{due_date}}</td><td>{{amount}}</td>'
+    '<td>{{remaining_balance}}</td><td>{{status}}</td></tr>'
+)
+
+TITLES = {'receipt': 'Sales Receipt', 'statement': 'Account Statement'}
+
+def _currency(amount):
+    return f"Rs. {amount or 0:,.2f}"
+
+@functools.lru_cache(maxsize=4096)
+def _date(value):
+    if not value:
+        return ''
+    if isinstance(value, str):
+        # Accept both dates and SQLite timestamps
+        value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return value.strftime('%d %b, %Y')
+
+@functools.lru_cache(maxsize=16)
+def _business_block(name, address, phone):
+    return BUSINESS_INFO.render({
+        'business_name': html.escape(name or ''),
+        'business_address': html.escape(address or ''),
+        'business_phone': html.escape(phone or '')
+    })
+
+def _business_info_html(business_info):
+    business_info = business_info or {}
+    return _business_block(
+        business_info.get('business_name'), business_info.get('business_address'),
+        business_info.get('business_phone')
+    )
+
+def _schedule_html(installments):
+    rows = '\n'.join([
+        SCHEDULE_ROW.render({
+            'number': inst['number'],
+            'due_date': _date(inst['due_date']),
+            'amount': _currency(inst['amount']),
+            'remaining_balance': _currency(inst['remaining_balance']),
+            'status': html.escape(inst['status'] or '')
+        })
+        for inst in installments
+    ])
+    return SCHEDULE.render({'rows': rows})
+
+def _balance_html(balance):
+    if not balance:
+        return ''
+    return BALANCE.render({
+        'paid_to_date': _currency(balance['paid_to_date']),
+        'outstanding_amount': _currency(balance['outstanding_amount']),
+        'overdue_amount': _currency(balance['overdue_amount']),
+        'next_due_date': _date(balance['next_due_date']) or '-'
+    })
+
+def _check_kind(kind):
+    if kind not in TITLES:
+        raise ValueError(f"Unknown receipt kind '{kind}'. Choose one of: {', '.join(TITLES)}")
+
+def render_receipt_body(sale_data, business_info, kind='receipt'):
+    """One receipt or statement as a <div>, without the document wrapper"""
+    installments = sale_data.get('installments') or []
+    show_schedule = sale_data['sale_type'] == 'installment' and installments
+    return RECEIPT.render({
+        'title': TITLES[kind],
+        'business_info': _business_info_html(business_info),
+        'receipt_no': sale_data['id'],
+        'date': _date(sale_data['created_at']),
+        'customer_name': html.escape(sale_data['customer_name'] or ''),
+        'customer_contact': html.escape(sale_data['customer_contact'] or ''),
+        'product_name': html.escape(sale_data['product_name'] or ''),
+        'sale_type': sale_data['sale_type'].title(),
+        'amount': _currency(sale_data['amount']),
+        'balance_section': _balance_html(sale_data.get('balance')) if kind == 'statement' else '',
+        'installment_section': _schedule_html(installments) if show_schedule else ''
+    })
+
+def document_head(title, print_on_load=False):
+    head = DOCUMENT_HEAD.render({'title': html.escape(title)})
+    return head + PRINT_SCRIPT if print_on_load else head
+
+def render_receipt(sale_data, business_info, kind='receipt', print_on_load=False):
+    """A complete HTML document for one sale"""
+    _check_kind(kind)
+    return ''.join([
+        document_head(f"{TITLES[kind]} {sale_data['id']}", print_on_load),
+        render_receipt_body(sale_data, business_info, kind),
+        DOCUMENT_TAIL
+    ])
+
+_SALES_QUERY = '''
+    SELECT
+        s.id, s.created_at, s.sale_type,
+        CASE WHEN s.sale_type = 'cash' THEN s.amount
+             ELSE s.total_with_markup END AS amount,
+        c.name AS customer_name, c.contact_number AS customer_contact,
+        p.name AS product_name,
+        b.paid_to_date, b.outstanding_amount, b.overdue_amount, b.next_due_date
+    FROM sales s
+    JOIN customers c ON s.customer_id = c.id
+    JOIN products p ON s.product_id = p.id
+    LEFT JOIN sale_balances b ON b.sale_id = s.id
+    WHERE 1=1
+'''
+
+def _attach_installments(conn, sales):
+    """Load the schedules of a batch of sales with one query"""
+    by_id = {sale['id']: sale for sale in sales}
+    for sale in sales:
+        sale['installments'] = []
+        if sale['paid_to_date'] is not None:
+            sale['balance'] = {key: sale[key] for key in (
+                'paid_to_date', 'outstanding_amount', 'overdue_amount', 'next_due_date'
+            )}
+        else:
+            # Cash sales are paid in full on the day
+            sale['balance'] = {'paid_to_date': sale['amount'], 'outstanding_amount': 0,
+                               'overdue_amount': 0, 'next_due_date': None}
+    placeholders = ', '.join('?' for _ in by_id)
+    rows = conn.execute(f'''
+        SELECT sale_id, installment_number AS number, due_date, amount,
+               remaining_balance, status
+        FROM installments
+        WHERE sale_id IN ({placeholders})
+        ORDER BY sale_id, installment_number
+    ''', list(by_id)).fetchall()
+    for row in rows:
+        by_id[row['sale_id']]['installments'].append(row)
+
+def load_sale(db, sale_id):
+    """Everything a receipt needs for one sale, or None"""
+    with db.connection() as conn:
+        row = conn.execute(_SALES_QUERY + ' AND s.id = ?', (sale_id,)).fetchone()
+        if row is None:
+            return None
+        sale = dict(row)
+        _attach_installments(conn, [sale])
+        return sale
+
+def iter_bundle(db, business_info, kind='receipt', start_date=None, end_date=None,
+                sale_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield one HTML document with a receipt or statement per sale, in chunks.
+
+    Sales are selected by creation date range and/or explicit ids and read
+    in batches, each batch rendered and yielded as one chunk.
+    """
+    _check_kind(kind)
+
+    clause, params = date_range_clause('s.created_at', start_date, end_date)
+    query = _SALES_QUERY + clause
+    if sale_ids is not None:
+        sale_ids = list(sale_ids)
+        query += f" AND s.id IN ({', '.join('?' for _ in sale_ids) or 'NULL'})"
+        params.extend(sale_ids)
+    query += ' ORDER BY s.id'
+
+    yield document_head(f"{TITLES[kind]}s")
+    conn = db.get_connection()
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            sales = [dict(row) for row in cursor.fetchmany(batch_size)]
+            if not sales:
+                break
+            _attach_installments(conn, sales)
+            yield ''.join([render_receipt_body(sale, business_info, kind) for sale in sales])
+    finally:
+        conn.close()
+    yield DOCUMENT_TAIL
+
+def write_pdf(html_text, path):
+    """Print an HTML document to a PDF file with Qt's rich text engine"""
+    try:
+        from PyQt6.QtGui import QGuiApplication, QPageSize, QPdfWriter, QTextDocument
+    except ImportError:
+        raise RuntimeError("PDF output needs PyQt6; write an HTML bundle instead")
+
+    # QTextDocument needs a GUI application for fonts
+    app = QGuiApplication.instance() or QGuiApplication([])
+    writer = QPdfWriter(path)
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    document = QTextDocument()
+    document.setHtml(html_text)
+    document.print(writer)
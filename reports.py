@@ -0,0 +1,411 @@
+"""Sales, inventory and customer reports for a date range.
+
+Reports are built from SQL aggregates, mostly the daily sales rollup, and
+rendered to HTML or CSV as a stream of chunks. Aggregates over a date range
+are split into the closed days before today, which are cached until the
+tables they read change, and today, which is always read fresh; the two
+parts are merged. Cached parts hold only ids and numbers: names and contact
+details are looked up each time a report is built. Long listings (low stock,
+outstanding balances) are read in batches from a dedicated connection while
+they are rendered, so a report is consumed once.
+"""
+import csv
+import html
+import io
+from datetime import date, datetime, timedelta, timezone
+
+from exporter import date_range_clause
+from rollups import SALE_VALUE
+
+DEFAULT_BATCH_SIZE = 500
+TOP_LIMIT = 20
+# Cached closed days are also dropped as soon as the tables they read change
+CLOSED_PERIOD_TTL = 6 * 3600
+
+TITLES = {
+    'sales': 'Sales Report',
+    'inventory': 'Inventory Report',
+    'customers': 'Customer Report'
+}
+
+CONTENT_TYPES = {'html': 'text/html', 'csv': 'text/csv'}
+
+DOCUMENT_HEAD = '''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>%(title)s</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; }
+        table { width: 100%%; border-collapse: collapse; margin-bottom: 30px; }
+        th, td { border: 1px solid #ddd; padding: 6px; text-align: left; }
+        td.number { text-align: right; }
+    </style>
+</head>
+<body>
+<h2>%(title)s</h2>
+<p>%(period)s</p>
+'''
+
+DOCUMENT_TAIL = '''</body>
+</html>
+'''
+
+def _today():
+    # created_at defaults to CURRENT_TIMESTAMP, which is UTC
+    return datetime.now(timezone.utc).date()
+
+def _check_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD")
+
+def split_period(start_date, end_date, today=None):
+    """Split a date range into (closed, current) parts.
+
+    closed is the (start, end) range of days before today, current is
+    (today, today); either is None when the range does not reach it. None
+    bounds mean an open range.
+    """
+    today = today or _today()
+    yesterday = (today - timedelta(days=1)).isoformat()
+    today = today.isoformat()
+
+    closed_end = yesterday if end_date is None or end_date > yesterday else end_date
+    closed = None
+    if start_date is None or start_date <= closed_end:
+        closed = (start_date, closed_end)
+
+    current = None
+    if (start_date is None or start_date <= today) and (end_date is None or end_date >= today):
+        current = (today, today)
+    return closed, current
+
+def _query(db, query, params=()):
+    with db.connection() as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+def period_rows(db, name, query, column, start_date, end_date):
+    """Rows of an aggregate query over a range: cached closed days plus today.
+
+    query ends in a WHERE clause the range condition on column is appended
+    to, and may contain a {range} placeholder for it instead (before a
+    GROUP BY). The parts are returned concatenated; merge them by key.
+    """
+    closed, current = split_period(start_date, end_date)
+
+    def run(period):
+        clause, params = date_range_clause(column, *period)
+        sql = query.format(range=clause) if '{range}' in query else query + clause
+        return _query(db, sql, params)
+
+    rows = []
+    if closed is not None:
+        if db.cache is None:
+            rows.extend(run(closed))
+        else:
+            rows.extend(db.cache.get_or_load(
+                ('reports', name, closed), lambda: run(closed), CLOSED_PERIOD_TTL
+            ))
+    if current is not None:
+        rows.extend(run(current))
+    return rows
+
+def with_names(db, rows, table, id_key, columns):
+    """Copy current columns of table onto aggregate rows by id_key.
+
+    columns maps each field to add to its column in table; the fields are
+    None for ids no longer in the table.
+    """
+    ids = sorted({row[id_key] for row in rows})
+    if not ids:
+        return rows
+    selected = ', '.join(f'{column} AS {field}' for field, column in columns.items())
+    placeholders = ', '.join('?' for _ in ids)
+    found = {
+        row.pop('id'): row
+        for row in _query(db, f'SELECT id, {selected} FROM {table} WHERE id IN ({placeholders})', ids)
+    }
+    missing = dict.fromkeys(columns)
+    return [dict(row, **found.get(row[id_key], missing)) for row in rows]
+
+def merge_rows(rows, keys, sums):
+    """Add up the sums fields of rows sharing the same keys, keeping first-seen order"""
+    merged = {}
+    for row in rows:
+        key = tuple(row[k] for k in keys)
+        target = merged.get(key)
+        if target is None:
+            merged[key] = dict(row)
+        else:
+            for field in sums:
+                target[field] += row[field]
+    return list(merged.values())
+
+def _stream(db, query, params=(), batch_size=DEFAULT_BATCH_SIZE):
+    """Yield rows as dicts from a dedicated connection, one batch at a time"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
+
+def section(title, columns, rows):
+    """columns are (header, key, kind) with kind 'text', 'int', 'money' or 'date'"""
+    return {'title': title, 'columns': columns, 'rows': rows}
+
+def _daily_rollup(db, start_date, end_date):
+    return period_rows(db, 'daily_rollup', '''
+        SELECT sale_date, sale_type, category, sale_count, total_amount
+        FROM sales_daily_rollup
+        WHERE 1=1
+    ''', 'sale_date', start_date, end_date)
+
+def _sales_by_product(db, start_date, end_date):
+    rows = period_rows(db, 'sales_by_product', f'''
+        SELECT s.product_id, COUNT(*) AS sale_count, SUM({SALE_VALUE}) AS total_amount
+        FROM sales s
+        WHERE 1=1 {{range}}
+        GROUP BY s.product_id
+    ''', 's.created_at', start_date, end_date)
+    return merge_rows(rows, ['product_id'], ['sale_count', 'total_amount'])
+
+def _top(rows, field, limit=TOP_LIMIT):
+    return sorted(rows, key=lambda row: row[field], reverse=True)[:limit]
+
+def sales_sections(db, start_date, end_date, **options):
+    daily = _daily_rollup(db, start_date, end_date)
+    sums = ['sale_count', 'total_amount']
+
+    by_type = merge_rows(daily, ['sale_type'], sums)
+    by_type.append({
+        'sale_type': 'Total',
+        'sale_count': sum(row['sale_count'] for row in by_type),
+        'total_amount': sum(row['total_amount'] for row in by_type)
+    })
+    for row in by_type:
+        row['sale_type'] = row['sale_type'].title()
+
+    by_category = _top(merge_rows(daily, ['category'], sums), 'total_amount', None)
+    by_day = sorted(merge_rows(daily, ['sale_date'], sums), key=lambda row: row['sale_date'])
+    count_and_total = [('Sales', 'sale_count', 'int'), ('Total', 'total_amount', 'money')]
+    return [
+        section('Summary by Sale Type', [('Sale Type', 'sale_type', 'text')] + count_and_total,
+                by_type),
+        section('Sales by Category', [('Category', 'category', 'text')] + count_and_total,
+                by_category),
+        section('Daily Sales', [('Date', 'sale_date', 'date')] + count_and_total, by_day),
+        section('Top Products', [
+            ('Product', 'product_name', 'text'), ('Category', 'category', 'text')
+        ] + count_and_total, with_names(
+            db, _top(_sales_by_product(db, start_date, end_date), 'total_amount'),
+            'products', 'product_id', {'product_name': 'name', 'category': 'category'}
+        ))
+    ]
+
+def inventory_sections(db, start_date, end_date, low_stock_threshold=5, **options):
+    sold = {
+        row['category']: row['sale_count']
+        for row in merge_rows(_daily_rollup(db, start_date, end_date), ['category'], ['sale_count'])
+    }
+
+    def load_stock():
+        return _query(db, '''
+            SELECT category, COUNT(*) AS product_count, SUM(stock) AS units,
+                   SUM(price * stock) AS stock_value
+            FROM products
+            GROUP BY category
+            ORDER BY category
+        ''')
+
+    # Current stock changes with every sale, so it shares the products namespace
+    if db.cache is None:
+        stock = load_stock()
+    else:
+        stock = db.cache.get_or_load(('products', 'report_stock'), load_stock)
+    stock = [dict(row, sold=sold.get(row['category'], 0)) for row in stock]
+
+    low_stock = _stream(db, '''
+        SELECT name, brand, model, category, stock
+        FROM products
+        WHERE stock <= ?
+        ORDER BY stock, name
+    ''', (low_stock_threshold,))
+    return [
+        section('Stock by Category', [
+            ('Category', 'category', 'text'), ('Products', 'product_count', 'int'),
+            ('Units in Stock', 'units', 'int'), ('Stock Value', 'stock_value', 'money'),
+            ('Sold in Period', 'sold', 'int')
+        ], stock),
+        section(f'Low Stock (at most {low_stock_threshold})', [
+            ('Product', 'name', 'text'), ('Brand', 'brand', 'text'), ('Model', 'model', 'text'),
+            ('Category', 'category', 'text'), ('Stock', 'stock', 'int')
+        ], low_stock)
+    ]
+
+def customer_sections(db, start_date, end_date, **options):
+    new_customers = sum(row['customer_count'] for row in period_rows(db, 'new_customers', '''
+        SELECT COUNT(*) AS customer_count FROM customers WHERE 1=1
+    ''', 'created_at', start_date, end_date))
+
+    buyers = merge_rows(period_rows(db, 'sales_by_customer', f'''
+        SELECT s.customer_id, COUNT(*) AS sale_count, SUM({SALE_VALUE}) AS total_amount
+        FROM sales s
+        WHERE 1=1 {{range}}
+        GROUP BY s.customer_id
+    ''', 's.created_at', start_date, end_date), ['customer_id'], ['sale_count', 'total_amount'])
+
+    owing = _query(db, '''
+        SELECT COUNT(DISTINCT customer_id) AS customer_count,
+               COALESCE(SUM(outstanding_amount), 0) AS outstanding_amount,
+               COALESCE(SUM(overdue_amount), 0) AS overdue_amount
+        FROM sale_balances
+        WHERE outstanding_amount > 0
+    ''')[0]
+
+    summary = [
+        {'metric': 'New customers', 'value': str(new_customers)},
+        {'metric': 'Customers who bought', 'value': str(len(buyers))},
+        {'metric': 'Customers with a balance', 'value': str(owing['customer_count'])},
+        {'metric': 'Outstanding', 'value': _money(owing['outstanding_amount'])},
+        {'metric': 'Overdue', 'value': _money(owing['overdue_amount'])}
+    ]
+    balances = _stream(db, '''
+        SELECT c.name AS customer_name, c.contact_number,
+               COUNT(*) AS open_sales,
+               SUM(b.outstanding_amount) AS outstanding_amount,
+               SUM(b.overdue_amount) AS overdue_amount,
+               MIN(b.next_due_date) AS next_due_date
+        FROM sale_balances b
+        JOIN customers c ON c.id = b.customer_id
+        WHERE b.outstanding_amount > 0
+        GROUP BY b.customer_id
+        ORDER BY outstanding_amount DESC
+    ''')
+    customer_columns = [('Customer', 'customer_name', 'text'), ('Contact', 'contact_number', 'text')]
+    return [
+        section('Summary', [('Item', 'metric', 'text'), ('Value', 'value', 'text')], summary),
+        section('Top Customers', customer_columns + [
+            ('Sales', 'sale_count', 'int'), ('Total', 'total_amount', 'money')
+        ], with_names(db, _top(buyers, 'total_amount'), 'customers', 'customer_id', {
+            'customer_name': 'name', 'contact_number': 'contact_number'
+        })),
+        section('Outstanding Balances', customer_columns + [
+            ('Open Sales', 'open_sales', 'int'), ('Outstanding', 'outstanding_amount', 'money'),
+            ('Overdue', 'overdue_amount', 'money'), ('Next Due', 'next_due_date', 'date')
+        ], balances)
+    ]
+
+REPORTS = {
+    'sales': sales_sections,
+    'inventory': inventory_sections,
+    'customers': customer_sections
+}
+
+def _check_report(report_type):
+    if report_type not in REPORTS:
+        raise ValueError(f"Unknown report '{report_type}'. Choose one of: {', '.join(REPORTS)}")
+
+def build_report(db, report_type, start_date=None, end_date=None, **options):
+    """The sections of a report; listing sections are read as they are rendered"""
+    _check_report(report_type)
+    start_date, end_date = _check_date(start_date), _check_date(end_date)
+    return REPORTS[report_type](db, start_date, end_date, **options)
+
+def _money(value):
+    return f"Rs. {value or 0:,.2f}"
+
+def _cell(value, kind):
+    if value is None:
+        return '<td></td>'
+    if kind == 'money':
+        return f'<td class="number">{_money(value)}</td>'
+    if kind == 'int':
+        return f'<td class="number">{value}</td>'
+    return f'<td>{html.escape(str(value))}</td>'
+
+def _csv_value(value, kind):
+    if kind == 'money' and value is not None:
+        return round(value, 2)
+    return value
+
+def _period_text(date_range):
+    start_date, end_date = date_range or (None, None)
+    if start_date and end_date:
+        return f"{start_date} to {end_date}"
+    if start_date:
+        return f"From {start_date}"
+    if end_date:
+        return f"Up to {end_date}"
+    return "All time"
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_html(sections, report_type, date_range=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield a report as an HTML document in chunks"""
+    _check_report(report_type)
+    yield DOCUMENT_HEAD % {
+        'title': TITLES[report_type],
+        'period': html.escape(_period_text(date_range))
+    }
+    for part in sections:
+        columns = part['columns']
+        header = ''.join(f'<th>{html.escape(label)}</th>' for label, _, _ in columns)
+        yield f"<h3>{html.escape(part['title'])}</h3>\n<table>\n<tr>{header}</tr>\n"
+        empty = True
+        for batch in _batches(part['rows'], batch_size):
+            empty = False
+            yield ''.join([
+                '<tr>' + ''.join([_cell(row[key], kind) for _, key, kind in columns]) + '</tr>\n'
+                for row in batch
+            ])
+        if empty:
+            yield f'<tr><td colspan="{len(columns)}">No data</td></tr>\n'
+        yield '</table>\n'
+    yield DOCUMENT_TAIL
+
+def iter_csv(sections, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield a report as CSV in chunks: a title line and a header per section"""
+    for index, part in enumerate(sections):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if index:
+            writer.writerow([])
+        writer.writerow([part['title']])
+        writer.writerow([label for label, _, _ in part['columns']])
+        yield buffer.getvalue()
+        columns = part['columns']
+        for batch in _batches(part['rows'], batch_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([
+                [_csv_value(row[key], kind) for _, key, kind in columns] for row in batch
+            ])
+            yield buffer.getvalue()
+
+def report_chunks(db, report_type, file_format='html', start_date=None, end_date=None,
+                  **options):
+    """Build a report and yield it as HTML or CSV text chunks"""
+    if file_format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported report format '{file_format}'. Use html or csv")
+    sections = build_report(db, report_type, start_date, end_date, **options)
+    if file_format == 'csv':
+        yield from iter_csv(sections)
+    else:
+        yield from iter_html(sections, report_type, (start_date, end_date))
@@ -0,0 +1,49 @@
+"""Daily sales rollup kept in step with the sales table.
+
+Each row of sales_daily_rollup holds the count and value of one day's sales
+for a sale type and product category, so date-range summaries read one row
+per day instead of every sale.
+"""
+
+# Value of a sale as reported in summaries
+SALE_VALUE = "CASE WHEN s.sale_type = 'cash' THEN s.amount ELSE s.total_with_markup END"
+
+def create_rollup_table(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            sale_date DATE NOT NULL,
+            sale_type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            sale_count INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, sale_type, category)
+        ) WITHOUT ROWID
+    ''')
+
+def record_sale(c, sale_id):
+    """Add one sale to its day's rollup row; call inside the sale's transaction"""
+    c.execute(f'''
+        INSERT INTO sales_daily_rollup (
+            sale_date, sale_type, category, sale_count, total_amount
+        )
+        SELECT date(s.created_at), s.sale_type, p.category, 1, {SALE_VALUE}
+        FROM sales s
+        JOIN products p ON p.id = s.product_id
+        WHERE s.id = ?
+        ON CONFLICT (sale_date, sale_type, category) DO UPDATE SET
+            sale_count = sale_count + excluded.sale_count,
+            total_amount = total_amount + excluded.total_amount
+    ''', (sale_id,))
+
+def rebuild_sales_rollup(c):
+    """Recompute the whole rollup from the sales table"""
+    c.execute('DELETE FROM sales_daily_rollup')
+    c.execute(f'''
+        INSERT INTO sales_daily_rollup (
+            sale_date, sale_type, category, sale_count, total_amount
+        )
+        SELECT date(s.created_at), s.sale_type, p.category, COUNT(*), SUM({SALE_VALUE})
+        FROM sales s
+        JOIN products p ON p.id = s.product_id
+        GROUP BY date(s.created_at), s.sale_type, p.category
+    ''')
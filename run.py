@@ -1,21 +1,38 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import sys
-import webbrowser
-from models import Database, ProductModel, SettingsModel
-from app import app
+from models import CustomerModel, ProductModel, SaleModel, SettingsModel, InstallmentModel
+from app import app, get_db
+import server
+import asgi
+import importer
+import exporter
+import receipts
+from scheduler import PeriodicJob
+
+# Seconds between overdue checks while the server runs
+OVERDUE_CHECK_INTERVAL = 3600
 
 def init_database():
     """Initialize the database with tables"""
     print("Initializing database...")
-    db = Database()
-    db.init_db()
+    db = get_db()
     print("Database initialized successfully!")
+    settings = db.get_storage_settings()
+    print("Storage settings: " + ", ".join(f"{k}={v}" for k, v in settings.items()))
+    return db
+
+def prepare_database():
+    """Create or upgrade the schema and add sample data to an empty database"""
+    db = init_database()
+    if not ProductModel(db).has_products():
+        add_sample_data(db)
+    return db
 
-def add_sample_data():
+def add_sample_data(db):
     """Add sample data to the database"""
     print("Adding sample data...")
-    db = Database()
     
     # Add sample products
     product_model = ProductModel(db)
@@ -57,26 +74,122 @@ def add_sample_data():
     
     print("Sample data added successfully!")
 
-def main():
-    """Main function to run the application"""
+def rebuild_rollup():
+    """Recompute the daily sales rollup from the sales table"""
+    db = init_database()
+    print("Rebuilding sales rollup...")
+    rows = SaleModel(db).rebuild_sales_rollup()
+    print(f"Sales rollup rebuilt: {rows} daily rows")
+
+def rebuild_balances():
+    """Recompute the per-sale balance ledger from the installments table"""
+    db = init_database()
+    print("Rebuilding sale balances...")
+    rows = SaleModel(db).rebuild_sale_balances()
+    print(f"Sale balances rebuilt: {rows} sales")
+
+def mark_overdue():
+    """Mark late installments overdue and print the aging buckets"""
+    db = init_database()
+    model = InstallmentModel(db)
+    result = model.refresh_overdue()
+    print(f"{result['newly_overdue']} installments newly overdue as of {result['as_of']}")
+    for bucket in model.get_aging_summary()['buckets']:
+        print(f"  {bucket['bucket']:>6} days: {bucket['installment_count']} installments, "
+              f"Rs. {bucket['total_amount']:,.2f}")
+
+def merge_customers():
+    """Merge customers recorded more than once under the same CNIC or phone"""
+    db = init_database()
+    print("Merging duplicate customers...")
+    result = CustomerModel(db).merge_duplicates()
+    print(f"Merged {result['merged']} duplicates; {result['customers']} customers remain")
+
+def import_data(args):
+    """Stream a CSV/JSONL file into products or customers"""
+    db = init_database()
+    file_format = args.format or importer.detect_format(args.path)
+    print(f"Importing {args.entity} from {args.path} ({file_format})...")
+    with open(args.path, encoding='utf-8-sig', newline='') as stream:
+        report = importer.import_file(db, args.entity, stream, file_format, args.chunk_size)
+
+    print(f"Imported {report['imported']} of {report['rows_read']} rows "
+          f"in {report['elapsed_seconds']}s ({report['rows_per_second']} rows/s)")
+    if report['duplicates']:
+        print(f"  {report['duplicates']} rows already on file were skipped")
+    for error in report['errors']:
+        print(f"  row {error['row']}: {error['error']}")
+    if report['failed'] > len(report['errors']):
+        print(f"  ... and {report['failed'] - len(report['errors'])} more errors")
+
+def export_data(args):
+    """Stream sales, installments or customers to a CSV/JSONL file or stdout"""
+    if args.output == '-':
+        # No progress output so stdout can be piped
+        exporter.export_to_file(get_db(), args.entity, sys.stdout, args.format,
+                                args.start_date, args.end_date)
+        return
+
+    db = init_database()
+    with open(args.output, 'w', encoding='utf-8', newline='') as stream:
+        exporter.export_to_file(db, args.entity, stream, args.format,
+                                args.start_date, args.end_date)
+    print(f"Exported {args.entity} to {args.output}")
+
+def write_receipts(args):
+    """Render receipts or statements for a date range into one HTML or PDF bundle"""
+    db = init_database()
+    business_info = SettingsModel(db).get_settings()
+    chunks = receipts.iter_bundle(db, business_info, args.kind, args.start_date, args.end_date)
+    if args.output.lower().endswith('.pdf'):
+        # Qt lays out the whole document at once, so the bundle is collected first
+        receipts.write_pdf(''.join(chunks), args.output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as stream:
+            for chunk in chunks:
+                stream.write(chunk)
+    print(f"Wrote {args.kind}s to {args.output}")
+
+def serve(args):
+    """Start the web application under gunicorn, or Flask's server with --dev"""
     # Create necessary directories
     os.makedirs('static/js', exist_ok=True)
     os.makedirs('templates', exist_ok=True)
-    
-    # Initialize database
-    init_database()
-    
-    # Add sample data if database is empty
-    db = Database()
-    product_model = ProductModel(db)
-    products = product_model.get_products()
-    if not products:
-        add_sample_data()
-    
-    # Start the Flask application
-    port = 8000
-    url = f'http://localhost:{port}'
-    
+
+    url = f'http://localhost:{args.port}'
+    print_banner(url)
+
+    missing = [] if args.dev else server.missing_requirements(args.asgi)
+    if missing:
+        print(f"{', '.join(missing)} not installed (pip install -r requirements.txt); "
+              "falling back to Flask's development server", file=sys.stderr)
+
+    if not args.dev and not missing:
+        if args.asgi:
+            application = asgi.Application(args.threads, OVERDUE_CHECK_INTERVAL)
+        else:
+            application = app
+        # Schema and sample data are prepared once in the master, before forking
+        server.serve(
+            application, prepare_database, host=args.host, port=args.port, workers=args.workers,
+            threads=args.threads, timeout=args.timeout,
+            graceful_timeout=args.graceful_timeout, max_requests=args.max_requests,
+            pidfile=args.pid, keep_alive=args.keep_alive,
+            overdue_interval=OVERDUE_CHECK_INTERVAL, asgi=args.asgi
+        )
+        return
+
+    db = prepare_database()
+
+    # Keep overdue statuses and aging buckets current while serving
+    overdue_job = PeriodicJob('overdue-check', InstallmentModel(db).refresh_overdue,
+                              OVERDUE_CHECK_INTERVAL)
+    overdue_job.start()
+
+    # Run the development server
+    app.run(host=args.host, port=args.port)
+
+def print_banner(url):
     print(f"""
 ╔════════════════════════════════════════════════════════════════╗
 ║                   Sales Management System                       ║
@@ -97,9 +210,91 @@ def main():
 ║                                                                ║
 ╚════════════════════════════════════════════════════════════════╝
     """)
-    
-    # Run the application
-    app.run(host='0.0.0.0', port=port)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sales Management System")
+    subparsers = parser.add_subparsers(dest='command')
+    serve_parser = subparsers.add_parser('serve', help='Start the web application (default)')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--workers', type=int,
+                              help='worker processes (default: 2 x CPUs + 1, at most '
+                                   f'{server.MAX_DEFAULT_WORKERS})')
+    serve_parser.add_argument('--threads', type=int, default=server.DEFAULT_THREADS,
+                              help='request threads per worker')
+    serve_parser.add_argument('--timeout', type=int, default=server.DEFAULT_TIMEOUT,
+                              help='seconds before an unresponsive worker is restarted')
+    serve_parser.add_argument('--graceful-timeout', type=int,
+                              default=server.DEFAULT_GRACEFUL_TIMEOUT,
+                              help='seconds workers get to finish requests on reload or stop')
+    serve_parser.add_argument('--max-requests', type=int, default=0,
+                              help='restart a worker after this many requests (0: never)')
+    serve_parser.add_argument('--pid', help='write the master PID here; send it SIGHUP to reload')
+    serve_parser.add_argument('--keep-alive', type=int, default=server.DEFAULT_KEEP_ALIVE,
+                              help='seconds an idle keep-alive connection stays open')
+    serve_parser.add_argument('--asgi', action='store_true',
+                              help='serve the asyncio API with uvicorn workers; --threads '
+                                   'sizes each worker\'s database executor')
+    serve_parser.add_argument('--dev', action='store_true',
+                              help="use Flask's single-process development server")
+    subparsers.add_parser('rebuild-rollup', help='Recompute the daily sales rollup')
+    subparsers.add_parser('rebuild-balances', help='Recompute the per-sale balance ledger')
+    subparsers.add_parser('mark-overdue', help='Mark late installments overdue and show aging')
+    subparsers.add_parser('merge-customers',
+                          help='Merge customers sharing a CNIC or phone number')
+
+    import_parser = subparsers.add_parser('import', help='Bulk import products or customers')
+    import_parser.add_argument('entity', choices=sorted(importer.IMPORTERS))
+    import_parser.add_argument('path', help='CSV or JSONL file')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'],
+                               help='file format (default: from the file extension)')
+    import_parser.add_argument('--chunk-size', type=int, default=importer.DEFAULT_CHUNK_SIZE,
+                               help='rows per transaction')
+
+    export_parser = subparsers.add_parser('export', help='Export sales, installments or customers')
+    export_parser.add_argument('entity', choices=sorted(exporter.EXPORTS))
+    export_parser.add_argument('output', help="output file, or '-' for stdout")
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    export_parser.add_argument('--start-date', help='YYYY-MM-DD, inclusive')
+    export_parser.add_argument('--end-date', help='YYYY-MM-DD, inclusive')
+
+    receipts_parser = subparsers.add_parser('receipts',
+                                            help='Bundle receipts or statements for mailing')
+    receipts_parser.add_argument('output', help='.html or .pdf file')
+    receipts_parser.add_argument('--kind', choices=sorted(receipts.TITLES), default='receipt')
+    receipts_parser.add_argument('--start-date', help='YYYY-MM-DD, inclusive')
+    receipts_parser.add_argument('--end-date', help='YYYY-MM-DD, inclusive')
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(['serve'])
+    return args
+
+def main():
+    """Main function to run the application"""
+    args = parse_args()
+    if args.command == 'rebuild-rollup':
+        rebuild_rollup()
+        return
+    if args.command == 'rebuild-balances':
+        rebuild_balances()
+        return
+    if args.command == 'mark-overdue':
+        mark_overdue()
+        return
+    if args.command == 'merge-customers':
+        merge_customers()
+        return
+    if args.command == 'import':
+        import_data(args)
+        return
+    if args.command == 'export':
+        export_data(args)
+        return
+    if args.command == 'receipts':
+        write_receipts(args)
+        return
+
+    serve(args)
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,87 @@
+"""Recording cash and installment sales inside the caller's transaction.
+
+Each function runs every write of one sale on the given cursor and leaves
+committing to the caller, so a sale can be committed on its own or
+together with others in one group commit.
+"""
+import balances
+import customers
+import inventory
+import rollups
+
+def record_cash_sale(c, data):
+    """Insert a cash sale and take it out of stock; returns the sale id.
+
+    Raises InsufficientStockError before writing anything if the units are
+    not free; data may carry the reservation_id of units held for the sale.
+    """
+    inventory.take_stock(c, data['product_id'], data['quantity'], data.get('reservation_id'))
+
+    # Reuse the customer if they have bought before
+    customer_id = customers.upsert_customer(
+        c, data['customer_name'], data['contact_number'], data['address']
+    )
+
+    # Create sale
+    c.execute('''
+        INSERT INTO sales (
+            customer_id, product_id, sale_type, amount
+        ) VALUES (?, ?, 'cash', ?)
+    ''', (customer_id, data['product_id'], data['amount']))
+    sale_id = c.lastrowid
+    rollups.record_sale(c, sale_id)
+    return sale_id
+
+def record_installment_sale(c, data):
+    """Insert an installment sale with its witness and schedule and take the unit
+    out of stock; returns the sale id
+    """
+    inventory.take_stock(c, data['product_id'], 1, data.get('reservation_id'))
+
+    # Reuse the customer if they have bought before
+    customer_id = customers.upsert_customer(
+        c, data['customer_name'], data['contact_number'], data['address'], data['cnic']
+    )
+
+    # Create sale
+    c.execute('''
+        INSERT INTO sales (
+            customer_id, product_id, sale_type,
+            amount, markup_percentage, total_with_markup,
+            advance_payment, installment_count
+        ) VALUES (?, ?, 'installment', ?, ?, ?, ?, ?)
+    ''', (
+        customer_id, data['product_id'],
+        data['amount'], data['markup_percentage'],
+        data['total_with_markup'], data['advance_payment'],
+        data['installment_count']
+    ))
+    sale_id = c.lastrowid
+    rollups.record_sale(c, sale_id)
+
+    # Create witness record
+    c.execute('''
+        INSERT INTO witnesses (
+            sale_id, name, cnic, address
+        ) VALUES (?, ?, ?, ?)
+    ''', (
+        sale_id, data['witness_name'],
+        data['witness_cnic'], data['witness_address']
+    ))
+
+    # Create installment records in one batched statement
+    c.executemany('''
+        INSERT INTO installments (
+            sale_id, installment_number,
+            amount, due_date, remaining_balance
+        ) VALUES (?, ?, ?, ?, ?)
+    ''', [
+        (
+            sale_id, installment['number'],
+            installment['amount'], installment['due_date'],
+            installment['remaining_balance']
+        )
+        for installment in data['installments']
+    ])
+    balances.refresh_sales(c, [sale_id])
+    return sale_id
@@ -0,0 +1,44 @@
+"""Background jobs that run on a fixed interval in a daemon thread"""
+import threading
+import traceback
+
+class PeriodicJob:
+    """Call a function now and then every interval seconds until stopped.
+
+    A failing run is logged and retried at the next interval rather than
+    stopping the job.
+    """
+
+    def __init__(self, name, func, interval=3600.0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self):
+        self.last_result = self.func()
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                print(f"Job {self.name} failed:")
+                traceback.print_exc()
+            self._stop.wait(self.interval)
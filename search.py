@@ -0,0 +1,95 @@
+"""FTS5 full-text search tables for products and customers.
+
+The virtual tables use external content, so they store only the index and
+read column values from the base tables. Triggers keep them in sync, and
+installment search joins against both through the sale's customer and product.
+"""
+import re
+import sqlite3
+
+# name -> (base table, indexed columns, bm25 column weights)
+SEARCH_TABLES = {
+    'products_fts': ('products', ('name', 'brand', 'model', 'tags'), (10.0, 4.0, 4.0, 2.0)),
+    'customers_fts': ('customers', ('name', 'contact_number', 'cnic'), (10.0, 5.0, 5.0)),
+}
+
+_TOKEN_RE = re.compile(r'\w', re.UNICODE)
+
+def fts5_available():
+    """Check whether the linked SQLite library was built with FTS5"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(x)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+def ensure_search_tables(conn):
+    """Create missing FTS tables and sync triggers, backfilling new tables"""
+    c = conn.cursor()
+    for fts_table, (table, columns, _) in SEARCH_TABLES.items():
+        exists = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (fts_table,)
+        ).fetchone()
+
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{col}' for col in columns)
+        old_values = ', '.join(f'old.{col}' for col in columns)
+
+        c.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                {column_list},
+                content='{table}', content_rowid='id'
+            )
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list})
+                VALUES (new.id, {new_values});
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        # Only fire for indexed columns so stock updates skip the index
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_au
+            AFTER UPDATE OF {column_list} ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list})
+                VALUES (new.id, {new_values});
+            END
+        ''')
+
+        if not exists:
+            c.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+    conn.commit()
+
+def rebuild_search_tables(conn, fts_tables=None):
+    """Rebuild FTS indexes (all of them by default) from their base tables"""
+    for fts_table in fts_tables or SEARCH_TABLES:
+        conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+    conn.commit()
+
+def match_query(search_term):
+    """Turn user input into an FTS5 query that prefix-matches every word.
+
+    Returns None when the input has no searchable characters.
+    """
+    terms = []
+    for word in search_term.split():
+        if _TOKEN_RE.search(word):
+            terms.append('"' + word.replace('"', '""') + '"*')
+    return ' '.join(terms) or None
+
+def rank_expression(fts_table):
+    """bm25() call weighting the indexed columns of an FTS table"""
+    weights = ', '.join(str(w) for w in SEARCH_TABLES[fts_table][2])
+    return f'bm25({fts_table}, {weights})'
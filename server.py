@@ -0,0 +1,163 @@
+"""Production serving with gunicorn: pre-forked worker processes with threads.
+
+The master prepares the database once before forking (schema, migrations,
+sample data) and then closes its connections, so no SQLite handle crosses
+a fork. Each worker opens its own connection pool, sized to its threads,
+on first use. SIGHUP to the master reloads gracefully: new workers start
+and old ones finish their requests within graceful_timeout. A worker that
+stops responding for longer than timeout is killed and replaced.
+
+With asgi=True the workers are uvicorn's and run the asyncio application
+from asgi.py; it sets up its own pool and executor when a worker starts.
+
+The overdue check runs in one worker only: whichever holds the scheduler
+lock file. If that worker exits, another takes over at its next check.
+"""
+import importlib.util
+import multiprocessing
+
+import app as web
+from models import InstallmentModel
+from scheduler import PeriodicJob
+
+# SQLite has a single writer, so more processes stop helping early
+MAX_DEFAULT_WORKERS = 8
+
+DEFAULT_THREADS = 4
+DEFAULT_TIMEOUT = 30
+DEFAULT_GRACEFUL_TIMEOUT = 30
+DEFAULT_KEEP_ALIVE = 5
+
+_overdue_job = None
+_scheduler_lock = None
+_scheduler_lock_path = None
+
+def default_workers():
+    return min(multiprocessing.cpu_count() * 2 + 1, MAX_DEFAULT_WORKERS)
+
+def _acquire_scheduler_lock():
+    """Take the scheduler lock without blocking; it is held until the process exits"""
+    global _scheduler_lock
+    if _scheduler_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        # No flock on Windows; the check is idempotent, so every worker runs it
+        return True
+    handle = open(_scheduler_lock_path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _scheduler_lock = handle
+    return True
+
+def _overdue_check():
+    if not _acquire_scheduler_lock():
+        return None
+    return InstallmentModel(web.get_db()).refresh_overdue()
+
+def start_overdue_job(db_file, interval):
+    """Run the overdue check in this worker whenever it holds the scheduler lock"""
+    global _overdue_job, _scheduler_lock_path
+    _scheduler_lock_path = db_file + '.scheduler.lock'
+    _overdue_job = PeriodicJob('overdue-check', _overdue_check, interval)
+    _overdue_job.start()
+
+def stop_overdue_job():
+    if _overdue_job is not None:
+        _overdue_job.stop()
+
+def _hooks(prepare, threads, overdue_interval, lifespan=False):
+    def on_starting(server):
+        prepare()
+        # Workers open their own pools; nothing SQLite is inherited
+        web.close_db()
+
+    def post_fork(server, worker):
+        # One connection per request thread plus one for the writer thread,
+        # which also runs the overdue job's writes
+        web.configure_db(pool_size=threads + 1)
+
+    def post_worker_init(worker):
+        start_overdue_job(web.get_db().db_file, overdue_interval)
+
+    def worker_exit(server, worker):
+        stop_overdue_job()
+        web.close_db()
+
+    if lifespan:
+        # The ASGI application sets up and tears down its worker itself
+        return {'on_starting': on_starting}
+    return {
+        'on_starting': on_starting,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit
+    }
+
+def missing_requirements(asgi=False):
+    """Names of the packages serve() needs that are not installed"""
+    names = ['gunicorn', 'uvicorn'] if asgi else ['gunicorn']
+    return [name for name in names if importlib.util.find_spec(name) is None]
+
+def _uvicorn_worker_class():
+    try:
+        import uvicorn_worker
+        return 'uvicorn_worker.UvicornWorker'
+    except ImportError:
+        pass
+    try:
+        import uvicorn.workers
+        return 'uvicorn.workers.UvicornWorker'
+    except ImportError:
+        raise RuntimeError("The ASGI server needs uvicorn; install it or serve without --asgi")
+
+def serve(application, prepare, host='0.0.0.0', port=8000, workers=None,
+          threads=DEFAULT_THREADS, timeout=DEFAULT_TIMEOUT,
+          graceful_timeout=DEFAULT_GRACEFUL_TIMEOUT, max_requests=0, pidfile=None,
+          keep_alive=DEFAULT_KEEP_ALIVE, overdue_interval=3600, asgi=False):
+    """Run the application under gunicorn until the master is stopped.
+
+    prepare() runs once in the master before forking. max_requests recycles
+    a worker after that many requests (0 never does). With asgi=True the
+    application is an asgi.Application run by uvicorn workers, and threads
+    sizes each worker's database executor instead.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("Production serving needs gunicorn; install it or use --dev")
+
+    class Server(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    if asgi:
+        worker_class = _uvicorn_worker_class()
+    else:
+        worker_class = 'gthread' if threads > 1 else 'sync'
+    options = {
+        'bind': f'{host}:{port}',
+        'workers': workers or default_workers(),
+        'threads': threads,
+        'worker_class': worker_class,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'keepalive': keep_alive,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'pidfile': pidfile
+    }
+    options.update(_hooks(prepare, threads, overdue_interval, lifespan=asgi))
+    Server(options).run()
@@ -1,13 +1,67 @@
 // API endpoint configuration
 const API_BASE_URL = '/api';
+const PAGE_SIZE = 50;
+
+// Build a query string, skipping empty values
+function buildQuery(params) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== null && value !== '') {
+            query.append(key, value);
+        }
+    });
+    return query.toString();
+}
+
+// List endpoints return one keyset page: { items, next_cursor, total? }.
+// Pass the previous page's next_cursor as `cursor` to fetch the following page.
+function pageParams({
+    cursor = null, limit = PAGE_SIZE, view = 'list', withTotal = false,
+    sort = '', descending = false
+} = {}) {
+    return {
+        ...(cursor || {}),
+        limit,
+        view,
+        total: withTotal ? 1 : '',
+        sort,
+        desc: descending ? 1 : ''
+    };
+}
+
+// Local copies of GET responses keyed by URL, revalidated with If-None-Match
+const responseCache = new Map();
+const RESPONSE_CACHE_LIMIT = 100;
+
+// GET a JSON resource, reusing the local copy when the server answers 304
+async function getJson(url, errorMessage) {
+    const cached = responseCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    // no-store: the browser cache would hide the 304 from us
+    const response = await fetch(url, { headers, cache: 'no-store' });
+
+    if (response.status === 304 && cached) return cached.data;
+    if (!response.ok) throw new Error(errorMessage);
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        // Re-insert so the Map's insertion order doubles as least-recently-stored
+        responseCache.delete(url);
+        if (responseCache.size >= RESPONSE_CACHE_LIMIT) {
+            responseCache.delete(responseCache.keys().next().value);
+        }
+        responseCache.set(url, { etag, data });
+    }
+    return data;
+}
 
 // API Calls
 const api = {
     // Products
-    async getProducts(searchTerm = '') {
-        const response = await fetch(`${API_BASE_URL}/products?search=${searchTerm}`);
-        if (!response.ok) throw new Error('Failed to fetch products');
-        return response.json();
+    async getProducts(searchTerm = '', page = {}) {
+        const query = buildQuery({ search: searchTerm, ...pageParams(page) });
+        return getJson(`${API_BASE_URL}/products?${query}`, 'Failed to fetch products');
     },
 
     async addProduct(productData) {
@@ -22,13 +76,42 @@ const api = {
         return response.json();
     },
 
-    // Customers
-    async getCustomers(searchTerm = '') {
-        const response = await fetch(`${API_BASE_URL}/customers?search=${searchTerm}`);
-        if (!response.ok) throw new Error('Failed to fetch customers');
+    // Hold stock while a sale form is open; send the id back as reservationId
+    async reserveStock(productId, quantity = 1) {
+        const response = await fetch(`${API_BASE_URL}/products/${productId}/reservations`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ quantity })
+        });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.error || 'Failed to reserve stock');
+        }
         return response.json();
     },
 
+    async releaseReservation(reservationId) {
+        const response = await fetch(`${API_BASE_URL}/reservations/${reservationId}`, {
+            method: 'DELETE'
+        });
+        if (!response.ok && response.status !== 404) {
+            throw new Error('Failed to release reservation');
+        }
+    },
+
+    // Customers
+    async getCustomers(searchTerm = '', page = {}) {
+        const query = buildQuery({ search: searchTerm, ...pageParams(page) });
+        return getJson(`${API_BASE_URL}/customers?${query}`, 'Failed to fetch customers');
+    },
+
+    async getCustomerBalance(customerId) {
+        return getJson(`${API_BASE_URL}/customers/${customerId}/balance`,
+            'Failed to fetch customer balance');
+    },
+
     // Sales
     async createCashSale(saleData) {
         const response = await fetch(`${API_BASE_URL}/sales/cash`, {
@@ -54,15 +137,43 @@ const api = {
         return response.json();
     },
 
+    // Compare several { markupPercentage, installmentCount } options for one amount
+    async compareInstallmentPlans(amount, advancePayment, options) {
+        const response = await fetch(`${API_BASE_URL}/sales/installment/plans`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ amount, advancePayment, options })
+        });
+        if (!response.ok) throw new Error('Failed to compare installment plans');
+        return response.json();
+    },
+
     // Installments
-    async getInstallments(status = '', searchTerm = '') {
-        const response = await fetch(
-            `${API_BASE_URL}/installments?status=${status}&search=${searchTerm}`
-        );
-        if (!response.ok) throw new Error('Failed to fetch installments');
+    async getInstallments(status = '', searchTerm = '', page = {}) {
+        const query = buildQuery({ status, search: searchTerm, ...pageParams(page) });
+        return getJson(`${API_BASE_URL}/installments?${query}`, 'Failed to fetch installments');
+    },
+
+    // Post many { saleId, installmentNumber, amount } payments in one request;
+    // installmentNumber and amount are optional for each item
+    async postPayments(payments, { paidDate = '', allOrNothing = false } = {}) {
+        const response = await fetch(`${API_BASE_URL}/installments/payments`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ payments, paidDate: paidDate || undefined, allOrNothing })
+        });
+        if (!response.ok) throw new Error('Failed to post payments');
         return response.json();
     },
 
+    async getInstallmentAging() {
+        return getJson(`${API_BASE_URL}/installments/aging`, 'Failed to fetch installment aging');
+    },
+
     async markInstallmentPaid(saleId, installmentNumber) {
         const response = await fetch(
             `${API_BASE_URL}/installments/${saleId}/${installmentNumber}/pay`,
@@ -74,18 +185,18 @@ const api = {
 
     // Reports
     async getSalesSummary(startDate = '', endDate = '') {
-        const response = await fetch(
-            `${API_BASE_URL}/reports/summary?start_date=${startDate}&end_date=${endDate}`
-        );
-        if (!response.ok) throw new Error('Failed to fetch sales summary');
-        return response.json();
+        const query = buildQuery({ start_date: startDate, end_date: endDate });
+        return getJson(`${API_BASE_URL}/reports/summary?${query}`, 'Failed to fetch sales summary');
+    },
+
+    // Dashboard
+    async getDashboard() {
+        return getJson(`${API_BASE_URL}/dashboard`, 'Failed to fetch dashboard');
     },
 
     // Settings
     async getSettings() {
-        const response = await fetch(`${API_BASE_URL}/settings`);
-        if (!response.ok) throw new Error('Failed to fetch settings');
-        return response.json();
+        return getJson(`${API_BASE_URL}/settings`, 'Failed to fetch settings');
     },
 
     async updateSettings(settingsData) {
@@ -109,4 +220,5 @@ const handleApiError = (error) => {
 
 // Export API
 window.api = api;
+window.PAGE_SIZE = PAGE_SIZE;
 window.handleApiError = handleApiError;
\ No newline at end of file
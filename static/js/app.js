@@ -28,6 +28,40 @@ function setupEventListeners() {
     document.querySelectorAll('[data-filter]').forEach(select => {
         select.addEventListener('change', handleFilter);
     });
+
+    // Sale forms hold the chosen product's stock until the sale completes
+    document.querySelectorAll('form [name="product"], form [name="quantity"]').forEach(input => {
+        input.addEventListener('change', handleProductSelected);
+    });
+}
+
+// Stock Reservations
+async function handleProductSelected(event) {
+    const form = event.target.form;
+    const formData = new FormData(form);
+    await releaseFormReservation(form);
+
+    const productId = formData.get('product');
+    if (!productId) return;
+    try {
+        const quantity = parseInt(formData.get('quantity')) || 1;
+        const reservation = await api.reserveStock(productId, quantity);
+        form.dataset.reservationId = reservation.id;
+    } catch (error) {
+        handleApiError(error);
+    }
+}
+
+async function releaseFormReservation(form) {
+    const reservationId = form.dataset.reservationId;
+    if (!reservationId) return;
+    delete form.dataset.reservationId;
+    // An expired reservation is already gone; nothing to report
+    await api.releaseReservation(reservationId).catch(() => {});
+}
+
+function formReservationId(form) {
+    return form.dataset.reservationId ? parseInt(form.dataset.reservationId) : undefined;
 }
 
 // Search Handler
@@ -36,20 +70,8 @@ async function handleSearch(event) {
     const searchTerm = event.target.value;
 
     try {
-        switch (searchType) {
-            case 'products':
-                const products = await api.getProducts(searchTerm);
-                updateProductsTable(products);
-                break;
-            case 'customers':
-                const customers = await api.getCustomers(searchTerm);
-                updateCustomersTable(customers);
-                break;
-            case 'installments':
-                const installments = await api.getInstallments('', searchTerm);
-                updateInstallmentsTable(installments);
-                break;
-        }
+        // Each table keeps its other filters and pages on from next_cursor
+        await loadTable(searchType, { search: searchTerm });
     } catch (error) {
         handleApiError(error);
     }
@@ -62,9 +84,8 @@ async function handleFilter(event) {
 
     try {
         switch (filterType) {
-            case 'installments':
-                const installments = await api.getInstallments(filterValue);
-                updateInstallmentsTable(installments);
+            case 'status':
+                await loadTable('installments', { status: filterValue });
                 break;
         }
     } catch (error) {
@@ -85,10 +106,13 @@ async function handleCashSale(event) {
             address: formData.get('address'),
             productId: formData.get('product'),
             quantity: parseInt(formData.get('quantity')),
-            amount: parseFloat(formData.get('amount'))
+            amount: parseFloat(formData.get('amount')),
+            reservationId: formReservationId(form)
         };
 
         const result = await api.createCashSale(saleData);
+        // The sale consumed the reservation
+        delete form.dataset.reservationId;
         showSuccess('Sale completed successfully');
         showReceiptModal(result.id, 'cash');
         form.reset();
@@ -116,10 +140,12 @@ async function handleInstallmentSale(event) {
             productId: formData.get('product'),
             markupPercentage: parseFloat(formData.get('markupPercentage')),
             installmentCount: parseInt(formData.get('installmentCount')),
-            advancePayment: parseFloat(formData.get('advancePayment'))
+            advancePayment: parseFloat(formData.get('advancePayment')),
+            reservationId: formReservationId(form)
         };
 
         const result = await api.createInstallmentSale(saleData);
+        delete form.dataset.reservationId;
         showSuccess('Installment sale completed successfully');
         showReceiptModal(result.id, 'installment');
         form.reset();
@@ -141,6 +167,7 @@ async function showReceiptModal(saleId, type) {
         const modalContent = generateReceiptHtml(sale, settings);
         const modal = document.getElementById('receiptModal');
         modal.innerHTML = modalContent;
+        modal.dataset.saleId = saleId;
         showModal('receiptModal');
     } catch (error) {
         handleApiError(error);
@@ -152,9 +179,9 @@ function generateReceiptHtml(sale, settings) {
     return `
         <div class="relative top-20 mx-auto p-5 border w-[800px] shadow-lg rounded-md bg-white">
             <div class="text-center mb-8">
-                <h2 class="text-2xl font-bold">${settings.businessName}</h2>
-                <p class="text-gray-600">${settings.businessAddress}</p>
-                <p class="text-gray-600">Phone: ${settings.businessPhone}</p>
+                <h2 class="text-2xl font-bold">${escapeHtml(settings.businessName)}</h2>
+                <p class="text-gray-600">${escapeHtml(settings.businessAddress)}</p>
+                <p class="text-gray-600">Phone: ${escapeHtml(settings.businessPhone)}</p>
             </div>
             
             <div class="mb-8">
@@ -165,8 +192,8 @@ function generateReceiptHtml(sale, settings) {
                     </div>
                     <div>
                         <p class="font-medium">Customer Details:</p>
-                        <p>${sale.customerName}</p>
-                        <p>${sale.contactNumber}</p>
+                        <p>${escapeHtml(sale.customerName)}</p>
+                        <p>${escapeHtml(sale.contactNumber)}</p>
                     </div>
                 </div>
                 
@@ -181,7 +208,7 @@ function generateReceiptHtml(sale, settings) {
                     </thead>
                     <tbody>
                         <tr>
-                            <td class="py-2">${sale.productDetails.name}</td>
+                            <td class="py-2">${escapeHtml(sale.productDetails.name)}</td>
                             <td class="text-right">${formatCurrency(sale.productDetails.price)}</td>
                             <td class="text-right">${sale.quantity}</td>
                             <td class="text-right">${formatCurrency(sale.amount)}</td>
@@ -235,27 +262,11 @@ function generateInstallmentScheduleHtml(sale) {
     `;
 }
 
-// Print Receipt
+// Print Receipt: the server renders the printable copy from the same template
+// as the desktop app and month-end bundles
 function printReceipt() {
-    const receiptContent = document.getElementById('receiptModal').innerHTML;
-    const printWindow = window.open('', '', 'height=600,width=800');
-    printWindow.document.write(`
-        <html>
-            <head>
-                <title>Print Receipt</title>
-                <link href="https://cdn.tailwindcss.com" rel="stylesheet">
-            </head>
-            <body class="p-8">
-                ${receiptContent}
-                <script>
-                    window.onload = function() {
-                        window.print();
-                        window.close();
-                    }
-                </script>
-            </body>
-        </html>
-    `);
+    const saleId = document.getElementById('receiptModal').dataset.saleId;
+    window.open(`${API_BASE_URL}/receipts/${saleId}?print=1`, '', 'height=600,width=800');
 }
 
 // Utility Functions
@@ -55,36 +55,221 @@ async function loadSectionData(sectionId) {
 // Dashboard Data Loading
 async function loadDashboardData() {
     try {
-        const summary = await api.getSalesSummary();
-        const installments = await api.getInstallments('pending');
-        const products = await api.getProducts();
+        // Totals, counts and both short lists come back in one request
+        const dashboard = await api.getDashboard();
 
         // Update stats
-        updateDashboardStats(summary, installments, products);
+        updateDashboardStats(dashboard);
 
         // Update recent sales
-        updateRecentSales(summary.recent_sales || []);
+        updateRecentSales(dashboard.recent_sales);
 
         // Update upcoming installments
-        updateUpcomingInstallments(installments);
+        updateUpcomingInstallments(dashboard.upcoming_installments);
     } catch (error) {
         handleApiError(error);
     }
 }
 
 // Update Dashboard Statistics
-function updateDashboardStats(summary, installments, products) {
-    // Total Sales
-    const totalSales = summary.cash_sales + summary.installment_sales;
-    document.getElementById('totalSales').textContent = formatCurrency(totalSales);
-
-    // Active Installments
-    const activeInstallments = installments.filter(i => i.status === 'pending').length;
-    document.getElementById('activeInstallments').textContent = activeInstallments;
-
-    // Low Stock Items
-    const lowStockItems = products.filter(p => p.stock <= 5).length;
-    document.getElementById('lowStockItems').textContent = lowStockItems;
+function updateDashboardStats(dashboard) {
+    document.getElementById('totalSales').textContent = formatCurrency(dashboard.total_sales);
+    document.getElementById('activeInstallments').textContent = dashboard.active_installments;
+    document.getElementById('lowStockItems').textContent = dashboard.low_stock_count;
+}
+
+// Update Recent Sales Table
+function updateRecentSales(sales) {
+    document.getElementById('recentSalesBody').innerHTML = sales.map(sale => `
+        <tr>
+            <td>${formatDate(sale.created_at)}</td>
+            <td>${escapeHtml(sale.customer_name)}</td>
+            <td>${escapeHtml(sale.product_name)}</td>
+            <td>${formatCurrency(sale.amount)}</td>
+            <td>${escapeHtml(sale.sale_type)}</td>
+        </tr>
+    `).join('');
+}
+
+// Update Upcoming Installments Table
+function updateUpcomingInstallments(installments) {
+    document.getElementById('upcomingInstallmentsBody').innerHTML = installments.map(inst => `
+        <tr>
+            <td>${formatDate(inst.due_date)}</td>
+            <td>${escapeHtml(inst.customer_name)}</td>
+            <td>${escapeHtml(inst.product_name)}</td>
+            <td>${formatCurrency(inst.amount)}</td>
+            <td>${escapeHtml(inst.status)}</td>
+        </tr>
+    `).join('');
+}
+
+// Paged Tables
+// Each list remembers the search and filter it was loaded with, so "Load more"
+// fetches the next page of the same results from the server's next_cursor
+const LOW_STOCK_THRESHOLD = 5;
+const tableQueries = {
+    products: { search: '' },
+    customers: { search: '' },
+    installments: { status: '', search: '' }
+};
+
+function fetchTablePage(table, query, cursor = null) {
+    switch (table) {
+        case 'products':
+            return api.getProducts(query.search, { cursor });
+        case 'customers':
+            // The full view carries the purchase count shown in the table
+            return api.getCustomers(query.search, { cursor, view: 'full' });
+        case 'installments':
+            return api.getInstallments(query.status, query.search, { cursor });
+    }
+}
+
+// Load the first page of a table, replacing its rows; filters update its query
+async function loadTable(table, filters = {}) {
+    const query = { ...tableQueries[table], ...filters };
+    tableQueries[table] = query;
+    const page = await fetchTablePage(table, query);
+    // A newer search started while this one was loading
+    if (tableQueries[table] !== query) return;
+    TABLE_RENDERERS[table](page.items, page.next_cursor);
+}
+
+async function loadMoreRows(table, cursor) {
+    const query = tableQueries[table];
+    try {
+        const page = await fetchTablePage(table, query, cursor);
+        if (tableQueries[table] !== query) return;
+        TABLE_RENDERERS[table](page.items, page.next_cursor, true);
+    } catch (error) {
+        handleApiError(error);
+    }
+}
+
+// Replace or extend a table body, ending it with a "Load more" row while
+// there are further pages
+function renderPagedRows(bodyId, table, rowsHtml, nextCursor, append) {
+    const body = document.getElementById(bodyId);
+    if (!body) return;
+    if (append) {
+        body.querySelector('.load-more-row')?.remove();
+        body.insertAdjacentHTML('beforeend', rowsHtml);
+    } else {
+        body.innerHTML = rowsHtml;
+    }
+
+    if (nextCursor) {
+        const row = document.createElement('tr');
+        row.className = 'load-more-row';
+        row.innerHTML = `
+            <td colspan="6" class="text-center py-2">
+                <button type="button" class="btn btn-secondary">Load more</button>
+            </td>
+        `;
+        row.querySelector('button').addEventListener('click', event => {
+            event.target.disabled = true;
+            loadMoreRows(table, nextCursor);
+        });
+        body.appendChild(row);
+    }
+}
+
+function stockStatus(stock) {
+    if (stock <= 0) return 'Out of stock';
+    return stock <= LOW_STOCK_THRESHOLD ? 'Low stock' : 'In stock';
+}
+
+// Update Products Table
+function updateProductsTable(products, nextCursor = null, append = false) {
+    const rows = products.map(product => `
+        <tr>
+            <td>
+                <div class="font-medium">${escapeHtml(product.name)}</div>
+                <div class="text-sm text-gray-500">${escapeHtml(product.brand)} ${escapeHtml(product.model)}</div>
+            </td>
+            <td>${escapeHtml(product.category)}</td>
+            <td>${formatCurrency(product.price)}</td>
+            <td>${product.stock}</td>
+            <td>${stockStatus(product.stock)}</td>
+            <td></td>
+        </tr>
+    `).join('');
+    renderPagedRows('productsTableBody', 'products', rows, nextCursor, append);
+}
+
+// Update Customers Table
+function updateCustomersTable(customers, nextCursor = null, append = false) {
+    const rows = customers.map(customer => `
+        <tr>
+            <td>${escapeHtml(customer.name)}</td>
+            <td>${escapeHtml(customer.contact_number)}</td>
+            <td>${escapeHtml(customer.cnic)}</td>
+            <td>${escapeHtml(customer.address)}</td>
+            <td>${customer.sale_count ?? ''}</td>
+            <td></td>
+        </tr>
+    `).join('');
+    renderPagedRows('customersTableBody', 'customers', rows, nextCursor, append);
+}
+
+// Update Installments Table
+function updateInstallmentsTable(installments, nextCursor = null, append = false) {
+    const rows = installments.map(inst => `
+        <tr>
+            <td>${formatDate(inst.due_date)}</td>
+            <td>${escapeHtml(inst.customer_name)}</td>
+            <td>${escapeHtml(inst.product_name)}</td>
+            <td>${formatCurrency(inst.amount)}</td>
+            <td>${escapeHtml(inst.status)}</td>
+            <td>
+                ${inst.status === 'Paid' ? '' : `
+                    <button type="button" class="btn btn-primary"
+                            data-sale-id="${inst.sale_id}"
+                            data-installment-number="${inst.installment_number}">
+                        Mark Paid
+                    </button>
+                `}
+            </td>
+        </tr>
+    `).join('');
+    renderPagedRows('installmentsTableBody', 'installments', rows, nextCursor, append);
+}
+
+const TABLE_RENDERERS = {
+    products: updateProductsTable,
+    customers: updateCustomersTable,
+    installments: updateInstallmentsTable
+};
+
+async function handleMarkPaid(event) {
+    const button = event.target.closest('button[data-sale-id]');
+    if (!button) return;
+    try {
+        await api.markInstallmentPaid(button.dataset.saleId, button.dataset.installmentNumber);
+        showSuccess('Installment marked as paid');
+        await loadTable('installments');
+    } catch (error) {
+        handleApiError(error);
+    }
+}
+
+// Section Data Loading
+async function loadInventoryData() {
+    await loadTable('products');
+}
+
+async function loadCustomersData() {
+    await loadTable('customers');
+}
+
+async function loadInstallmentsData() {
+    const body = document.getElementById('installmentsTableBody');
+    if (body && !body.dataset.bound) {
+        body.addEventListener('click', handleMarkPaid);
+        body.dataset.bound = '1';
+    }
+    await loadTable('installments');
 }
 
 // Product Management
@@ -19,6 +19,13 @@ function formatDate(date) {
     });
 }
 
+// Escape text for interpolation into innerHTML templates
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => HTML_ESCAPES[ch]);
+}
+
 // Show error message
 function showError(message) {
     const errorDiv = document.createElement('div');
@@ -37,15 +44,38 @@ function showSuccess(message) {
     setTimeout(() => successDiv.remove(), 3000);
 }
 
-// Calculate installment plan
+// Calculate installment plan. Mirrors plan_engine.py: amounts are worked in
+// whole paisa, monthly dues are rounded down and the last one takes the remainder.
+
+// Round to whole paisa half-up on the decimal digits, as plan_engine.to_cents
+// does; Math.round(value * 100) gets 1.005 wrong through binary floats
+function toPaisa(value) {
+    const match = /^\s*([+-]?)(\d*)\.?(\d*)(?:e([+-]?\d+))?\s*$/i.exec(String(value));
+    if (!match || !(match[2] || match[3])) return NaN;
+    const [, sign, whole, fraction, exponent] = match;
+
+    // Move the decimal point by the exponent, then keep two places
+    let digits = whole + fraction;
+    let point = whole.length + Number(exponent || 0);
+    if (point < 0) {
+        digits = '0'.repeat(-point) + digits;
+        point = 0;
+    }
+    digits = digits.padEnd(point + 3, '0');
+    let paisa = Number(digits.slice(0, point + 2));
+    if (digits[point + 2] >= '5') paisa += 1;
+    return sign === '-' ? -paisa : paisa;
+}
+
 function calculateInstallments(totalAmount, advancePayment, numberOfInstallments, markupPercentage) {
-    const markupAmount = (totalAmount * markupPercentage) / 100;
-    const totalWithMarkup = totalAmount + markupAmount;
-    const remainingAmount = totalWithMarkup - advancePayment;
-    const installmentAmount = Math.ceil(remainingAmount / numberOfInstallments);
+    const amount = toPaisa(totalAmount);
+    const markup = Math.floor((amount * toPaisa(markupPercentage) + 5000) / 10000);
+    const remaining = amount + markup - toPaisa(advancePayment);
+    if (remaining < 0) throw new Error('Advance payment cannot exceed the total with markup');
+    const installment = Math.floor(remaining / numberOfInstallments);
+    const lastInstallment = remaining - installment * (numberOfInstallments - 1);
 
     const installments = [];
-    let remainingBalance = remainingAmount;
     const today = new Date();
 
     // First installment is the advance payment
@@ -54,30 +84,28 @@ function calculateInstallments(totalAmount, advancePayment, numberOfInstallments
         dueDate: today.toISOString().split('T')[0],
         amount: advancePayment,
         status: 'Paid',
-        remainingBalance: remainingBalance
+        remainingBalance: remaining / 100
     });
 
-    // Calculate remaining installments
-    for (let i = 0; i < numberOfInstallments; i++) {
-        const dueDate = new Date(today);
-        dueDate.setMonth(dueDate.getMonth() + i + 1);
-        
-        remainingBalance -= installmentAmount;
-        if (remainingBalance < 0) remainingBalance = 0;
+    // Calculate remaining installments, 30 days apart like the stored schedule
+    for (let i = 1; i <= numberOfInstallments; i++) {
+        const dueDate = new Date(today.getTime() + i * 30 * 86400000);
+        const isLast = i === numberOfInstallments;
 
         installments.push({
-            installmentNumber: i + 2,
+            installmentNumber: i + 1,
             dueDate: dueDate.toISOString().split('T')[0],
-            amount: installmentAmount,
+            amount: (isLast ? lastInstallment : installment) / 100,
             status: 'Pending',
-            remainingBalance: remainingBalance
+            remainingBalance: isLast ? 0 : (remaining - installment * i) / 100
         });
     }
 
     return {
-        totalWithMarkup,
-        markupAmount,
-        installmentAmount,
+        totalWithMarkup: (amount + markup) / 100,
+        markupAmount: markup / 100,
+        installmentAmount: installment / 100,
+        lastInstallmentAmount: lastInstallment / 100,
         installments
     };
 }
@@ -101,6 +129,7 @@ function generateId() {
 // Export utility functions
 window.formatCurrency = formatCurrency;
 window.formatDate = formatDate;
+window.escapeHtml = escapeHtml;
 window.showError = showError;
 window.showSuccess = showSuccess;
 window.calculateInstallments = calculateInstallments;
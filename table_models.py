@@ -0,0 +1,130 @@
+"""Lazy Qt table models for the desktop list pages.
+
+LazyTableModel holds only the rows fetched so far and asks for the next
+keyset page when the view scrolls near the end (canFetchMore/fetchMore).
+Cell text is formatted when painted, so only visible rows cost anything.
+SqlSortFilterProxyModel sits between the model and the view and turns
+header clicks and filter changes into new queries instead of sorting or
+filtering the loaded rows in memory. Given a workers.TaskRunner, pages are
+fetched on a pool thread and a page from before a refresh is discarded.
+"""
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+class Column:
+    """One table column: header text, cell formatter and optional SQL sort key"""
+
+    def __init__(self, header, value, sort=None, align=None):
+        self.header = header
+        self.value = value
+        self.sort = sort
+        self.align = align
+
+class LazyTableModel(QAbstractTableModel):
+    def __init__(self, columns, fetch_page, parent=None, runner=None):
+        """fetch_page(cursor, sort, descending, filters) returns a page dict
+        with 'items' and 'next_cursor', as the model page methods do.
+        """
+        super().__init__(parent)
+        self.columns = columns
+        self.fetch_page = fetch_page
+        self.runner = runner
+        self.sort_key = None
+        self.descending = False
+        self.filters = {}
+        self._rows = []
+        self._cursor = {}
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self.columns[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = column.value(self._rows[index.row()])
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole and column.align is not None:
+            return column.align
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section].header
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return False
+        # One page in flight at a time; the view asks again once it lands
+        return self.runner is None or not self.runner.is_busy(self._task_key())
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        args = (dict(self._cursor), self.sort_key, self.descending, dict(self.filters))
+        if self.runner is None:
+            self._add_page(self.fetch_page(*args))
+        else:
+            self.runner.submit(self._task_key(), self.fetch_page, self._add_page, None, *args)
+
+    def _task_key(self):
+        return f'table-{id(self)}'
+
+    def _add_page(self, page):
+        self._cursor = page['next_cursor'] or {}
+        self._exhausted = page['next_cursor'] is None
+        items = page['items']
+        if items:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(items) - 1)
+            self._rows.extend(items)
+            self.endInsertRows()
+
+    def row(self, row):
+        """The record behind a table row"""
+        return self._rows[row]
+
+    def refresh(self):
+        """Drop loaded rows; the view fetches the first page again as needed"""
+        if self.runner is not None:
+            self.runner.cancel(self._task_key())
+        self.beginResetModel()
+        self._rows = []
+        self._cursor = {}
+        self._exhausted = False
+        self.endResetModel()
+
+    def set_sort(self, sort_key, descending=False):
+        self.sort_key = sort_key
+        self.descending = descending
+        self.refresh()
+
+    def set_filter(self, name, value):
+        if self.filters.get(name) == value:
+            return
+        self.filters[name] = value
+        self.refresh()
+
+class SqlSortFilterProxyModel(QSortFilterProxyModel):
+    """Proxy whose sorting and filtering are done by the source model's queries"""
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        source = self.sourceModel()
+        if source is None or not 0 <= column < len(source.columns):
+            return
+        sort_key = source.columns[column].sort
+        if sort_key is None:
+            return
+        source.set_sort(sort_key, order == Qt.SortOrder.DescendingOrder)
+
+    def set_filter(self, name, value):
+        self.sourceModel().set_filter(name, value or None)
+
+    def record(self, proxy_row):
+        source_index = self.mapToSource(self.index(proxy_row, 0))
+        return self.sourceModel().row(source_index.row())
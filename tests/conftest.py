@@ -0,0 +1,60 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import Database, ProductModel
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / 'test.db'))
+    yield database
+    database.close()
+
+@pytest.fixture
+def product_id(db):
+    return add_product(db)
+
+@pytest.fixture
+def client(tmp_path):
+    import app as web
+    web.configure_db(db_file=str(tmp_path / 'web.db'))
+    yield web.app.test_client()
+    web.close_db()
+    web._db_options.clear()
+
+def add_product(db, name='Test TV', stock=10, price=100000.0):
+    return ProductModel(db).add_product({
+        'name': name, 'brand': 'Test', 'model': 'T1', 'category': 'electronics',
+        'price': price, 'stock': stock, 'description': '', 'features': [], 'tags': []
+    })
+
+def cash_sale(product_id, quantity=1, **fields):
+    return dict({
+        'customer_name': 'Cash Customer', 'contact_number': '0300-1111111',
+        'address': 'Test Street', 'product_id': product_id, 'quantity': quantity,
+        'amount': 1000.0
+    }, **fields)
+
+def installment_sale(product_id, count=3, **fields):
+    today = date.today()
+    return dict({
+        'customer_name': 'Test Customer', 'contact_number': '0300-0000000',
+        'cnic': '35202-0000000-1', 'address': 'Test Street',
+        'witness_name': 'Test Witness', 'witness_cnic': '35202-0000000-2',
+        'witness_address': 'Test Street', 'product_id': product_id,
+        'amount': 3000.0, 'markup_percentage': 0, 'total_with_markup': 3000.0,
+        'advance_payment': 0, 'installment_count': count,
+        'installments': [
+            {
+                'number': n + 2, 'amount': 1000.0,
+                'due_date': (today + timedelta(days=30 * (n + 1))).isoformat(),
+                'remaining_balance': 1000.0 * (count - n - 1)
+            }
+            for n in range(count)
+        ]
+    }, **fields)
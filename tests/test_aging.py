@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+from conftest import installment_sale
+from models import InstallmentModel, SaleModel
+
+AS_OF = date(2024, 6, 30)
+
+def test_buckets_include_both_edges(db, product_id):
+    days_late = [0, 1, 30, 31, 60, 61, 90, 91, 400]
+    SaleModel(db).create_installment_sale(installment_sale(product_id, installments=[
+        {'number': n + 2, 'amount': 100.0 * (n + 1),
+         'due_date': (AS_OF - timedelta(days=days)).isoformat(), 'remaining_balance': 0}
+        for n, days in enumerate(days_late)
+    ]))
+
+    model = InstallmentModel(db)
+    # Due today is not late yet
+    assert model.refresh_overdue(AS_OF.isoformat())['newly_overdue'] == 8
+    buckets = {b['bucket']: (b['installment_count'], b['total_amount'])
+               for b in model.get_aging_summary()['buckets']}
+    assert buckets == {
+        '1-30': (2, 500.0), '31-60': (2, 900.0), '61-90': (2, 1300.0), '90+': (2, 1700.0)
+    }
+
+def test_a_later_run_moves_rows_across_an_edge(db, product_id):
+    due = AS_OF - timedelta(days=30)
+    SaleModel(db).create_installment_sale(installment_sale(product_id, installments=[
+        {'number': 2, 'amount': 100.0, 'due_date': due.isoformat(), 'remaining_balance': 0}
+    ]))
+    model = InstallmentModel(db)
+
+    def counts(as_of):
+        model.refresh_overdue(as_of.isoformat())
+        with db.connection() as conn:
+            return dict(conn.execute('SELECT bucket, installment_count FROM installment_aging'))
+
+    assert counts(AS_OF)['1-30'] == 1
+    assert counts(AS_OF + timedelta(days=1)) == {'1-30': 0, '31-60': 1, '61-90': 0, '90+': 0}
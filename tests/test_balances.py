@@ -0,0 +1,29 @@
+from conftest import installment_sale
+from models import CustomerModel, InstallmentModel, SaleModel
+
+def test_balance_follows_partial_payments_and_overdue_rows(db, product_id):
+    sale = installment_sale(product_id, advance_payment=600.0, total_with_markup=3600.0)
+    due_dates = [inst['due_date'] for inst in sale['installments']]
+    sale_id = SaleModel(db).create_installment_sale(sale)
+    with db.connection() as conn:
+        customer_id = conn.execute('SELECT customer_id FROM sales WHERE id = ?',
+                                   (sale_id,)).fetchone()[0]
+    customers = CustomerModel(db)
+
+    balance = customers.get_customer_balance(customer_id)
+    assert (balance['paid_to_date'], balance['outstanding_amount']) == (600.0, 3000.0)
+    assert balance['next_due_date'] == due_dates[0]
+
+    # Pays off the first installment and half of the second
+    InstallmentModel(db).post_payments([{'sale_id': sale_id, 'amount': 1500}])
+    balance = customers.get_customer_balance(customer_id)
+    assert (balance['paid_to_date'], balance['outstanding_amount']) == (2100.0, 1500.0)
+    assert balance['overdue_amount'] == 0
+    assert balance['next_due_date'] == due_dates[1]
+
+    # Once the second is late only its unpaid half is overdue
+    InstallmentModel(db).refresh_overdue(due_dates[2])
+    balance = customers.get_customer_balance(customer_id)
+    assert balance['overdue_amount'] == 500.0
+    assert balance['outstanding_amount'] == 1500.0
+    assert [s['sale_id'] for s in balance['sales']] == [sale_id]
@@ -0,0 +1,144 @@
+import pytest
+
+from cache import TTLCache
+from conftest import add_product, cash_sale
+from models import Database, DashboardModel, ProductModel, SaleModel, SettingsModel
+
+SETTINGS = {'business_name': 'Shop', 'business_address': 'Main Road', 'business_phone': '042'}
+
+@pytest.fixture
+def other_process(db):
+    """A second Database on the same file, with its own cache, as another worker has"""
+    other = Database(db.db_file)
+    yield other
+    other.close()
+
+def test_entries_expire_and_are_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set(('a', 1), 'one', ttl=-1)
+    assert cache.get(('a', 1)) == (False, None)
+    assert cache.expirations == 1
+
+    for n in range(3):
+        cache.set(('a', n), n)
+    assert cache.get(('a', 0)) == (False, None)
+    assert cache.get(('a', 2)) == (True, 2)
+    assert cache.evictions == 1
+
+def test_entry_is_dropped_when_its_version_moves():
+    version = [1]
+    cache = TTLCache(versions=lambda namespace: version[0])
+    loads = []
+
+    def load():
+        loads.append(version[0])
+        return version[0]
+
+    assert cache.get_or_load(('ns', 'k'), load) == 1
+    assert cache.get_or_load(('ns', 'k'), load) == 1
+    version[0] = 2
+    assert cache.get_or_load(('ns', 'k'), load) == 2
+    assert loads == [1, 2]
+    assert cache.stale == 1
+
+def test_invalidation_during_a_load_is_not_overwritten():
+    cache = TTLCache()
+
+    def load():
+        cache.invalidate('ns')
+        return 'old'
+
+    cache.get_or_load(('ns', 'k'), load)
+    assert cache.get(('ns', 'k')) == (False, None)
+
+def test_reads_are_cached_until_a_write(db):
+    products = ProductModel(db)
+    add_product(db, name='Fan')
+    products.get_products_page()
+    products.get_products_page()
+    assert db.get_cache_stats()['namespaces']['products']['hits'] == 1
+
+    add_product(db, name='Iron')
+    assert [p['name'] for p in products.get_products_page()['items']] == ['Fan', 'Iron']
+
+def test_writes_from_another_process_are_seen(db, other_process):
+    db.cache_recheck_interval = 0
+    products = ProductModel(db)
+    settings = SettingsModel(db)
+    assert products.get_products_page()['items'] == []
+    assert settings.get_settings() is None
+    dashboard = DashboardModel(db).get_dashboard()
+
+    # No @invalidates runs in this process for these writes
+    product_id = add_product(other_process, name='Fan')
+    SettingsModel(other_process).update_settings(SETTINGS)
+    SaleModel(other_process).create_cash_sale(cash_sale(product_id))
+
+    assert [p['name'] for p in products.get_products_page()['items']] == ['Fan']
+    assert products.get_product(product_id)['stock'] == 9
+    assert settings.get_settings()['business_name'] == 'Shop'
+    assert DashboardModel(db).get_dashboard()['total_sales'] != dashboard['total_sales']
+    assert db.get_cache_stats()['stale'] >= 3
+
+def test_version_checks_are_shared_within_the_interval(db, other_process):
+    queries = []
+    read_versions = db.get_table_versions
+
+    def counted(tables):
+        queries.append(tables)
+        return read_versions(tables)
+
+    db.get_table_versions = counted
+    products = ProductModel(db)
+    for _ in range(10):
+        products.get_products_page()
+    assert len(queries) == 1
+
+    add_product(other_process, name='Fan')
+    assert products.get_products_page()['items'] == []
+    db.cache_recheck_interval = 0
+    assert [p['name'] for p in products.get_products_page()['items']] == ['Fan']
+
+def test_summary_follows_a_rollup_rebuild_elsewhere(db, other_process):
+    db.cache_recheck_interval = 0
+    SaleModel(db).create_cash_sale(cash_sale(add_product(db)))
+    with db.connection() as conn:
+        # A rollup that drifted from sales, as rebuild-rollup exists to repair
+        conn.execute('DELETE FROM sales_daily_rollup')
+        conn.commit()
+    assert SaleModel(db).get_sales_summary() == []
+
+    SaleModel(other_process).rebuild_sales_rollup()
+    assert [row['count'] for row in SaleModel(db).get_sales_summary()] == [1]
+
+def test_etag_and_body_change_together_across_processes(client):
+    from app import get_db
+    first = client.get('/api/settings')
+    assert first.get_json() == {}
+
+    other = Database(get_db().db_file)
+    try:
+        SettingsModel(other).update_settings(SETTINGS)
+    finally:
+        other.close()
+
+    response = client.get('/api/settings', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['business_name'] == 'Shop'
+    again = client.get('/api/settings', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+def test_dashboard_etag_follows_customer_renames(client):
+    from app import get_db
+    db = get_db()
+    product_id = add_product(db)
+    SaleModel(db).create_cash_sale(cash_sale(product_id))
+    etag = client.get('/api/dashboard').headers['ETag']
+
+    with db.connection() as conn:
+        conn.execute("UPDATE customers SET name = 'Renamed'")
+        conn.commit()
+
+    response = client.get('/api/dashboard', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['recent_sales'][0]['customer_name'] == 'Renamed'
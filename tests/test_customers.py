@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+import customers
+from conftest import cash_sale, installment_sale
+from models import CustomerModel, SaleModel
+
+def customer_rows(db):
+    with db.connection() as conn:
+        return conn.execute('SELECT id, name, cnic, contact_number FROM customers ORDER BY id').fetchall()
+
+def test_keys_are_normalized():
+    assert customers.normalize_cnic('35202-1234567-1') == '3520212345671'
+    assert customers.normalize_cnic(' ') is None
+    assert customers.normalize_contact('+92 300 1234567') == '03001234567'
+    assert customers.normalize_contact('0092-300-1234567') == '03001234567'
+    assert customers.normalize_contact('0300-1234567') == '03001234567'
+
+def test_repeat_buyers_reuse_their_customer(db, product_id):
+    sales = SaleModel(db)
+    sales.create_cash_sale(cash_sale(product_id, contact_number='0300-1111111'))
+    sales.create_cash_sale(cash_sale(product_id, contact_number='+92 300 1111111',
+                                     address='New Address'))
+    sales.create_installment_sale(installment_sale(product_id, cnic='35202-0000000-1'))
+    sales.create_installment_sale(installment_sale(
+        product_id, cnic='3520200000001', contact_number='0333-9999999'
+    ))
+
+    rows = customer_rows(db)
+    assert len(rows) == 2
+    history = CustomerModel(db).get_customer_sales(rows[0]['id'])
+    assert len(history['sales']) == 2
+    assert history['address'] == 'New Address'
+    # A returning customer keeps their name but takes the latest phone
+    assert rows[1]['contact_number'] == '0333-9999999'
+
+def test_a_phone_shared_by_cnic_holders_identifies_neither(db):
+    model = CustomerModel(db)
+    first = model.add_customer({'name': 'A', 'contact_number': '0300-5555555',
+                                'cnic': '11111-1111111-1', 'address': 'x'})
+    second = model.add_customer({'name': 'B', 'contact_number': '0300-5555555',
+                                 'cnic': '22222-2222222-2', 'address': 'x'})
+    assert first != second
+
+    walk_in = model.add_customer({'name': 'C', 'contact_number': '0300-5555555', 'address': 'x'})
+    assert walk_in not in (first, second)
+    # With a single holder the phone alone finds them
+    assert model.add_customer({'name': 'A', 'contact_number': '0300-5555555',
+                               'cnic': '11111-1111111-1', 'address': 'y'}) == first
+
+def test_unique_keys_are_enforced(db):
+    CustomerModel(db).add_customer({'name': 'A', 'contact_number': '0300-1', 'cnic': '1', 'address': 'x'})
+    with db.connection() as conn:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute(
+                "INSERT INTO customers (name, contact_number, address, cnic_key) "
+                "VALUES ('B', '0300-2', 'x', '1')"
+            )
+        conn.rollback()
+
+def test_merge_folds_rows_written_without_keys(db, product_id):
+    SaleModel(db).create_cash_sale(cash_sale(product_id, contact_number='0300-7777777'))
+    with db.connection() as conn:
+        # Rows a pre-dedup writer or direct SQL left without keys
+        conn.execute('''
+            INSERT INTO customers (name, contact_number, address)
+            VALUES ('Copy', '+92 300 7777777', 'x')
+        ''')
+        conn.execute('''
+            INSERT INTO sales (customer_id, product_id, sale_type, amount)
+            VALUES (last_insert_rowid(), ?, 'cash', 500)
+        ''', (product_id,))
+        conn.commit()
+
+    assert CustomerModel(db).merge_duplicates() == {'merged': 1, 'customers': 1}
+    survivor = customer_rows(db)[0]['id']
+    assert len(CustomerModel(db).get_customer_sales(survivor)['sales']) == 2
+    assert CustomerModel(db).merge_duplicates()['merged'] == 0
+
+def test_customer_routes(client):
+    assert client.get('/api/customers/999/sales').status_code == 404
+    response = client.post('/api/customers/merge')
+    assert response.get_json() == {'merged': 0, 'customers': 0}
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import asgi
+import exporter
+from conftest import add_product, cash_sale
+from models import SaleModel
+
+def asgi_request(application, path, headers=(), method='GET', body=(b'',)):
+    """Run one request through the ASGI app, its body sent in the given
+    chunks; returns (status, headers, body)"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+        'headers': [(name.encode(), value.encode()) for name, value in headers]
+    }
+    messages = []
+    chunks = list(body)
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = messages[0]
+    response_headers = {k.decode(): v.decode() for k, v in start['headers']}
+    return start['status'], response_headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+def test_conditional_get_answers_304_until_a_table_changes(client):
+    first = client.get('/api/products')
+    etag = first.headers['ETag']
+    assert client.get('/api/products', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/products', headers={
+        'If-Modified-Since': first.headers['Last-Modified']
+    }).status_code == 304
+
+    client.post('/api/products', json={
+        'name': 'Fan', 'brand': 'B', 'model': 'M', 'category': 'c', 'price': 10, 'stock': 1
+    })
+    changed = client.get('/api/products', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert [p['name'] for p in changed.get_json()['items']] == ['Fan']
+
+def test_asgi_dashboard_shares_validators_with_flask(client):
+    application = asgi.Application(db_threads=2)
+    application.db.start()
+    try:
+        flask_etag = client.get('/api/dashboard').headers['ETag']
+        status, headers, _ = asgi_request(application, '/api/dashboard')
+        assert status == 200
+        assert headers['etag'] == flask_etag
+
+        status, _, body = asgi_request(application, '/api/dashboard', [('if-none-match', flask_etag)])
+        assert (status, body) == (304, b'')
+        status, _, _ = asgi_request(application, '/api/dashboard', [
+            ('if-modified-since', headers['last-modified'])
+        ])
+        assert status == 304
+    finally:
+        application.db.shutdown()
+
+def test_asgi_request_body_is_read_as_the_handler_consumes_it(client):
+    async def read(reader, size):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, reader.read, size)
+
+    async def main():
+        chunks = [b'name,brand', b',model', b'']
+        received = []
+
+        async def receive():
+            received.append(chunks.pop(0))
+            return {'type': 'http.request', 'body': received[-1], 'more_body': bool(chunks)}
+
+        reader = asgi.RequestBody(receive, asyncio.get_running_loop())
+        assert await read(reader, 4) == b'name'
+        assert len(received) == 1
+        assert await read(reader, -1) == b',brand,model'
+        assert len(received) == 3
+
+    asyncio.run(main())
+
+    application = asgi.Application(db_threads=2)
+    application.db.start()
+    try:
+        rows = ['name,brand,model,category,price,stock\n'] + [
+            f'Fan {n},B,M,c,10,1\n' for n in range(50)
+        ]
+        status, _, body = asgi_request(application, '/api/import/products', method='POST',
+                                   headers=[('content-type', 'text/csv')],
+                                   body=[row.encode() for row in rows])
+        assert status == 200
+        assert json.loads(body)['imported'] == 50
+    finally:
+        application.db.shutdown()
+
+def test_streams_reject_bad_arguments_before_streaming(client):
+    assert client.get('/api/export/sales.xml').status_code == 400
+    assert client.get('/api/export/nothing.csv').status_code == 400
+    assert client.get('/api/reports/sales.pdf').status_code == 400
+
+    response = client.get('/api/export/customers.csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.get_data(as_text=True).startswith('id,')
+
+def test_export_date_range_includes_both_end_days(db):
+    product_id = add_product(db)
+    sale_id = SaleModel(db).create_cash_sale(cash_sale(product_id))
+    with db.connection() as conn:
+        conn.execute("UPDATE sales SET created_at = '2024-03-31 23:59:59' WHERE id = ?", (sale_id,))
+        conn.commit()
+
+    def exported(start_date, end_date):
+        text = ''.join(exporter.export_chunks(db, 'sales', 'jsonl', start_date, end_date))
+        return text.count('\n')
+
+    assert exported('2024-03-31', '2024-03-31') == 1
+    assert exported('2024-03-01', '2024-03-30') == 0
+    assert exported('2024-04-01', None) == 0
+    assert exported(None, None) == 1
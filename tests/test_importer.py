@@ -0,0 +1,103 @@
+import io
+
+import pytest
+
+import importer
+from models import CustomerModel, Database, ProductModel
+
+PRODUCTS_CSV = '''name,brand,model,category,price,stock,tags
+Split AC,Haier,HSU-12,appliances,95000,4,"inverter,cooling"
+LED TV,Sony,X80,electronics,120000,2,
+Broken,Sony,X1,electronics,not a price,1,
+Fridge,Dawlance,9193,appliances,80000,3,
+Heater,Super Asia,H1,appliances,9000,-2,
+'''
+
+def schema(db):
+    with db.connection() as conn:
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')"
+        )}
+
+def test_products_import_reports_each_row(db):
+    report = importer.import_file(db, 'products', io.StringIO(PRODUCTS_CSV), 'csv', chunk_size=2)
+
+    assert (report['rows_read'], report['imported'], report['failed']) == (5, 3, 2)
+    assert [e['row'] for e in report['errors']] == [3, 5]
+    assert report['errors'][1]['error'] == 'Invalid value: Stock cannot be negative'
+    assert ProductModel(db).get_products_page(search_term='inverter')['items'][0]['name'] == 'Split AC'
+
+def test_indexes_are_suspended_while_it_runs_and_rebuilt_at_the_end(db):
+    before = schema(db)
+    seen = []
+
+    def rows():
+        for n in range(5):
+            seen.append(schema(db))
+            yield {'name': f'Heater {n}', 'brand': 'B', 'model': 'M', 'category': 'c',
+                   'price': 1, 'stock': 1}
+
+    importer.import_rows(db, 'products', rows(), chunk_size=2)
+    assert all('idx_products_name' not in names and 'products_fts_ai' not in names
+               for names in seen)
+    assert schema(db) == before
+    assert len(ProductModel(db).get_products_page(search_term='heater')['items']) == 5
+    with db.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM suspended_schema').fetchone()[0] == 0
+
+def test_small_imports_can_keep_the_schema(db):
+    before = schema(db)
+    seen = []
+
+    def rows():
+        seen.append(schema(db))
+        yield {'name': 'Kettle', 'brand': 'B', 'model': 'M', 'category': 'c',
+               'price': 1, 'stock': 1}
+
+    importer.import_rows(db, 'products', rows(), defer_indexes=False)
+    assert seen == [before]
+    assert ProductModel(db).get_products_page(search_term='kettle')['items']
+
+def test_customer_duplicates_are_skipped(db):
+    CustomerModel(db).add_customer({
+        'name': 'Ali', 'contact_number': '0300-1234567', 'cnic': '35202-1234567-1', 'address': 'x'
+    })
+    rows = [
+        {'name': 'Ali Khan', 'contact_number': '03001234567', 'cnic': '3520212345671', 'address': 'y'},
+        {'name': 'Sara', 'contact_number': '+92 321 7654321', 'address': 'z'},
+        {'name': 'Sara B', 'contact_number': '0321-7654321', 'address': 'z'},
+        {'name': 'No phone'},
+    ]
+    report = importer.import_rows(db, 'customers', rows)
+
+    assert (report['imported'], report['duplicates'], report['failed']) == (1, 2, 1)
+    assert [c['name'] for c in CustomerModel(db).get_customers_page()['items']] == ['Ali', 'Sara']
+
+def test_rejects_unknown_targets_and_formats(db):
+    with pytest.raises(ValueError):
+        importer.import_rows(db, 'sales', [])
+    with pytest.raises(ValueError):
+        importer.import_file(db, 'products', io.StringIO(''), 'xml')
+
+def test_startup_finishes_an_interrupted_import(tmp_path):
+    path = str(tmp_path / 'interrupted.db')
+    db = Database(path)
+    before = schema(db)
+    # An import that died after suspending the schema and loading a chunk
+    with db.connection() as conn:
+        importer._suspend_table_maintenance(conn, 'products')
+        conn.execute('''
+            INSERT INTO products (name, brand, model, category, price, stock)
+            VALUES ('Washing Machine', 'Haier', 'W1', 'appliances', 50000, 1)
+        ''')
+        conn.commit()
+    assert 'idx_products_name' not in schema(db)
+    db.close()
+
+    db = Database(path)
+    try:
+        assert schema(db) == before
+        page = ProductModel(db).get_products_page(search_term='washing')
+        assert [p['name'] for p in page['items']] == ['Washing Machine']
+    finally:
+        db.close()
@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+
+import pytest
+
+import inventory
+from conftest import add_product, cash_sale, installment_sale
+from models import ProductModel, SaleModel
+
+def product_data(**fields):
+    return dict({
+        'name': 'TV', 'brand': 'B', 'model': 'M', 'category': 'c', 'price': 10.0,
+        'stock': 5, 'description': '', 'features': [], 'tags': []
+    }, **fields)
+
+def stock(db, product_id):
+    return ProductModel(db).get_product(product_id)['stock']
+
+def test_concurrent_sales_cannot_oversell(db):
+    product_id = add_product(db, stock=10)
+    model = SaleModel(db)
+    results = []
+
+    def till(n):
+        try:
+            results.append(model.create_installment_sale(
+                installment_sale(product_id, cnic=f'{n:013d}')
+            ))
+        except inventory.InsufficientStockError:
+            results.append(None)
+
+    threads = [threading.Thread(target=till, args=(n,)) for n in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(1 for r in results if r is not None) == 10
+    assert stock(db, product_id) == 0
+
+def test_refused_sale_writes_nothing(db):
+    product_id = add_product(db, stock=1)
+    with pytest.raises(inventory.InsufficientStockError) as error:
+        SaleModel(db).create_cash_sale(cash_sale(product_id, quantity=2))
+    assert error.value.available == 1
+    with db.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0] == 0
+    assert stock(db, product_id) == 1
+
+def test_reservation_holds_units_until_consumed(db):
+    product_id = add_product(db, stock=3)
+    products = ProductModel(db)
+    reservation = products.reserve_stock(product_id, 2)
+    assert products.get_available_stock(product_id) == 1
+
+    with pytest.raises(inventory.InsufficientStockError):
+        SaleModel(db).create_cash_sale(cash_sale(product_id, quantity=2))
+    SaleModel(db).create_cash_sale(cash_sale(product_id, quantity=2,
+                                             reservation_id=reservation['id']))
+    assert stock(db, product_id) == 1
+    assert products.release_reservation(reservation['id']) is False
+
+def test_expired_reservation_frees_units(db):
+    product_id = add_product(db, stock=1)
+    reservation = ProductModel(db).reserve_stock(product_id, 1)
+    with db.connection() as conn:
+        conn.execute("UPDATE stock_reservations SET expires_at = datetime('now', '-1 second')")
+        conn.commit()
+    assert ProductModel(db).get_available_stock(product_id) == 1
+    assert ProductModel(db).reserve_stock(product_id, 1)['id'] != reservation['id']
+
+def test_stock_cannot_be_set_negative_or_below_reserved(db):
+    products = ProductModel(db)
+    with pytest.raises(ValueError):
+        products.add_product(product_data(stock=-1))
+    product_id = products.add_product(product_data(stock=5))
+    products.reserve_stock(product_id, 3)
+    with pytest.raises(ValueError):
+        products.update_product(product_id, product_data(stock=-2))
+    with pytest.raises(ValueError):
+        products.update_product(product_id, product_data(stock=2))
+    products.update_product(product_id, product_data(stock=3))
+    assert stock(db, product_id) == 3
+
+def test_trigger_blocks_other_writes_below_zero(db):
+    product_id = add_product(db, stock=1)
+    with db.connection() as conn:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute('UPDATE products SET stock = -1 WHERE id = ?', (product_id,))
+        conn.rollback()
+
+def test_stock_routes(client):
+    created = client.post('/api/products', json=product_data(stock=1)).get_json()
+    assert client.post('/api/products', json=product_data(stock=-1)).status_code == 400
+
+    response = client.post(f"/api/products/{created['id']}/reservations", json={'quantity': 2})
+    assert response.status_code == 409
+    assert response.get_json()['available'] == 1
+    assert client.post('/api/products/999/reservations', json={}).status_code == 404
+
+    reservation = client.post(f"/api/products/{created['id']}/reservations").get_json()
+    response = client.post('/api/sales/cash', json=cash_sale(
+        created['id'], reservationId=reservation['id']
+    ))
+    assert response.status_code == 201
+    assert client.delete(f"/api/reservations/{reservation['id']}").status_code == 404
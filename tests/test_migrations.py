@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from models import CustomerModel, Database
+
+LATEST = max(version for version, _, _ in migrations.MIGRATIONS)
+
+def test_fresh_database_is_fully_migrated(tmp_path):
+    db = Database(str(tmp_path / 'fresh.db'))
+    try:
+        assert db.applied_migrations == sorted(v for v, _, _ in migrations.MIGRATIONS)
+        assert db.get_schema_version() == LATEST
+    finally:
+        db.close()
+
+    db = Database(str(tmp_path / 'fresh.db'))
+    try:
+        assert db.applied_migrations == []
+    finally:
+        db.close()
+
+def test_versions_are_unique_and_append_only():
+    versions = [version for version, _, _ in migrations.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+def test_failed_migration_is_rolled_back_and_retried():
+    conn = sqlite3.connect(':memory:')
+
+    def broken(c):
+        c.execute('CREATE TABLE half_done (x)')
+        raise RuntimeError('boom')
+
+    steps = [(1, 'create', lambda c: c.execute('CREATE TABLE t (x)')), (2, 'broken', broken)]
+    with pytest.raises(RuntimeError):
+        migrations.apply_migrations(conn, steps)
+    assert migrations.get_schema_version(conn) == 1
+    assert not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'half_done'"
+    ).fetchone()
+
+    steps[1] = (2, 'fixed', lambda c: c.execute('CREATE TABLE half_done (x)'))
+    assert migrations.apply_migrations(conn, steps) == [2]
+
+def test_upgrade_merges_duplicate_customers(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    Database(path).close()
+
+    # Take the file back to version 7, before customer keys existed, with the
+    # duplicates that sales used to create for every repeat buyer
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        DROP INDEX idx_customers_cnic_key;
+        DROP INDEX idx_customers_contact_key;
+        ALTER TABLE customers DROP COLUMN cnic_key;
+        ALTER TABLE customers DROP COLUMN contact_key;
+        DELETE FROM schema_version WHERE version >= 8;
+        INSERT INTO products (name, brand, model, category, price, stock)
+        VALUES ('TV', 'B', 'M', 'c', 1000, 5);
+        INSERT INTO customers (name, contact_number, cnic, address) VALUES
+            ('Ali', '0300-1234567', '35202-1234567-1', 'a'),
+            ('Ali K', '03001234567', '3520212345671', 'b'),
+            ('Sara', '0321-7654321', NULL, 'c'),
+            ('Sara B', '+92 321 7654321', NULL, 'd');
+        INSERT INTO sales (customer_id, product_id, sale_type, amount) VALUES
+            (1, 1, 'cash', 1000), (2, 1, 'cash', 1000), (4, 1, 'cash', 1000);
+    ''')
+    conn.close()
+
+    db = Database(path)
+    try:
+        assert db.applied_migrations == list(range(8, LATEST + 1))
+        names = [c['name'] for c in CustomerModel(db).get_customers_page(view='full')['items']]
+        assert names == ['Ali', 'Sara']
+        with db.connection() as conn:
+            owners = conn.execute('SELECT customer_id FROM sales ORDER BY id').fetchall()
+            assert [row[0] for row in owners] == [1, 1, 3]
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+from models import ProductModel
+
+def add(db, name, price=1000.0):
+    return ProductModel(db).add_product({
+        'name': name, 'brand': 'Pak', 'model': 'F1', 'category': 'appliances',
+        'price': price, 'stock': 1, 'description': '', 'features': [], 'tags': []
+    })
+
+def walk(db, limit=2, **query):
+    """Follow next_cursor to the end, returning every id in page order"""
+    model = ProductModel(db)
+    ids, cursor, pages = [], {}, 0
+    while cursor is not None:
+        page = model.get_products_page(limit=limit, **query, **cursor)
+        ids.extend(p['id'] for p in page['items'])
+        cursor = page['next_cursor']
+        pages += 1
+        assert pages <= 10
+    return ids
+
+def test_id_walk_visits_every_row_once(db):
+    ids = [add(db, f'Product {n}') for n in range(5)]
+    assert walk(db) == ids
+    assert walk(db, limit=5) == ids
+
+def test_ranked_walk_breaks_tied_ranks_by_id(db):
+    add(db, 'Table Lamp')
+    # Identical rows score the same, so only the id orders them
+    fans = [add(db, 'Ceiling Fan') for _ in range(5)]
+    assert walk(db, search_term='fan') == fans
+
+def test_sorted_walk_descends_through_ties_with_query_string_cursors(db):
+    prices = [200.0, 300.0, 200.0, 100.0, 200.0]
+    ids = [add(db, f'Pedestal Fan {n}', price) for n, price in enumerate(prices)]
+    expected = [ids[1], ids[4], ids[2], ids[0], ids[3]]
+    model = ProductModel(db)
+
+    for search_term in (None, 'fan'):
+        seen, cursor = [], {}
+        while cursor is not None:
+            page = model.get_products_page(search_term=search_term, limit=2, sort='price',
+                                           descending=True, **cursor)
+            seen.extend(p['id'] for p in page['items'])
+            # after_value arrives as a string, as request.args gives it
+            cursor = page['next_cursor'] and dict(
+                page['next_cursor'], after_value=str(page['next_cursor']['after_value'])
+            )
+        assert seen == expected
@@ -0,0 +1,29 @@
+from conftest import installment_sale
+from models import InstallmentModel, SaleModel
+
+def test_partial_payment_carries_over(db, product_id):
+    sale_id = SaleModel(db).create_installment_sale(installment_sale(product_id))
+    result = InstallmentModel(db).post_payments([{'sale_id': sale_id, 'amount': 1500}])
+
+    assert result['posted'] == 1
+    allocations = result['results'][0]['allocations']
+    assert [a['applied'] for a in allocations] == [1000.0, 500.0]
+
+def test_bad_items_fail_alone(db, product_id):
+    sale_id = SaleModel(db).create_installment_sale(installment_sale(product_id))
+    result = InstallmentModel(db).post_payments([
+        1, {'sale_id': sale_id, 'amount': 'lots'}, {'sale_id': sale_id, 'amount': 100}
+    ])
+
+    assert result['posted'] == 1
+    assert [r['success'] for r in result['results']] == [False, False, True]
+    assert 'object' in result['results'][0]['error']
+
+def test_payment_route_rejects_malformed_batches(client):
+    response = client.post('/api/installments/payments', json={'payments': [1]})
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['success'] is False
+
+    for body in ({'payments': 'x'}, {'payments': []}, [1], None):
+        response = client.post('/api/installments/payments', json=body)
+        assert response.status_code == 400
@@ -0,0 +1,57 @@
+import pytest
+
+import plan_engine
+
+BACKENDS = [
+    'python',
+    pytest.param('numpy', marks=pytest.mark.skipif(plan_engine.np is None, reason='needs NumPy'))
+]
+
+def test_to_cents_rounds_decimal_half_up():
+    assert plan_engine.to_cents(1.005) == 101
+    assert plan_engine.to_cents('2.675') == 268
+    assert plan_engine.to_cents(0.125) == 13
+    assert plan_engine.to_cents(10) == 1000
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_plans_add_up_exactly(backend):
+    plans = plan_engine.compute_plans(
+        [100000, 33333.33, 5000], [10000, 0, 5000], [3, 7, 12], [10, 12.5, 0], backend=backend
+    )
+    for i, count in enumerate(plans['counts']):
+        paid = plans['installment'][i] * (count - 1) + plans['last_installment'][i]
+        assert paid == plans['remaining'][i]
+    assert plans['markup'][0] == 1000000
+    assert plans['remaining'][2] == 0
+
+@pytest.mark.skipif(plan_engine.np is None, reason='needs NumPy')
+def test_backends_agree():
+    args = ([12345.67, 99999.99], [1000.5, 0], [6, 24], [7.5, 20])
+    assert (plan_engine.compute_plans(*args, backend='numpy')
+            == plan_engine.compute_plans(*args, backend='python'))
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_advance_above_total_is_rejected(backend):
+    # 1000 plus 10% markup is 1100
+    plan_engine.compute_plans(1000, 1100, 3, 10, backend=backend)
+    with pytest.raises(ValueError, match='exceed'):
+        plan_engine.compute_plans([1000, 1000], [500, 1100.01], 3, 10, backend=backend)
+    with pytest.raises(ValueError, match='negative'):
+        plan_engine.compute_plans(1000, -1, 3, 10, backend=backend)
+
+def test_calculate_plan_schedule():
+    plan = plan_engine.calculate_plan(1000, 100, 3, 0)
+    amounts = [row['amount'] for row in plan['installments'][1:]]
+    assert amounts == [300.0, 300.0, 300.0]
+    assert plan['installments'][-1]['remaining_balance'] == 0
+
+    with pytest.raises(ValueError):
+        plan_engine.calculate_plan(1000, 5000, 3, 0)
+
+def test_plan_route_rejects_advance_above_total(client):
+    response = client.post('/api/sales/installment/plans', json={
+        'amount': 1000, 'advancePayment': 2000,
+        'options': [{'markupPercentage': 10, 'installmentCount': 3}]
+    })
+    assert response.status_code == 400
+    assert 'exceed' in response.get_json()['error']
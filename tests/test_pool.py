@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+
+import pytest
+
+from models import ConnectionPool, PoolExhaustedError
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / 'pool.db')
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(connect, max_size=2, timeout=0.2)
+    pool.opened = opened
+    yield pool
+    pool.close()
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert len(pool.opened) == 1
+    assert pool.stats() == {'max_size': 2, 'open': 1, 'idle': 1, 'in_use': 0}
+
+def test_nested_borrows_share_the_thread_connection(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+        assert pool.stats()['in_use'] == 1
+    assert pool.stats()['in_use'] == 0
+
+def test_release_rolls_back_an_open_transaction(pool):
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (x)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+        assert conn.in_transaction
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+
+def test_waits_for_a_free_connection_then_times_out(pool):
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            done.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        held.wait()
+        held.clear()
+    try:
+        with pytest.raises(PoolExhaustedError):
+            pool.acquire()
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+    with pool.connection():
+        pass
+    assert len(pool.opened) == 2
+
+def test_release_from_another_thread_is_refused(pool):
+    conn = pool.acquire()
+    refused = []
+
+    def release():
+        try:
+            pool.release(conn)
+        except ValueError:
+            refused.append(True)
+
+    thread = threading.Thread(target=release)
+    thread.start()
+    thread.join()
+    assert refused
+    pool.release(conn)
+
+def test_closed_pool_refuses_new_borrows(pool):
+    with pool.connection():
+        pass
+    pool.close()
+    assert pool.stats()['open'] == 0
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
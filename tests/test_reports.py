@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import reports
+from conftest import add_product, cash_sale
+from models import Database, SaleModel
+
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+def backdated_sale(db, product_id, **fields):
+    """A cash sale made yesterday, so it falls in the cached closed period"""
+    sales = SaleModel(db)
+    sale_id = sales.create_cash_sale(cash_sale(product_id, **fields))
+    with db.connection() as conn:
+        conn.execute("UPDATE sales SET created_at = datetime('now', '-1 day') WHERE id = ?",
+                     (sale_id,))
+        conn.commit()
+    sales.rebuild_sales_rollup()
+    return sale_id
+
+def rows(db, report_type, title):
+    sections = reports.build_report(db, report_type, None, YESTERDAY)
+    return next(list(s['rows']) for s in sections if s['title'] == title)
+
+def test_split_period():
+    today = date(2024, 5, 10)
+    assert reports.split_period(None, None, today) == ((None, '2024-05-09'), ('2024-05-10', '2024-05-10'))
+    assert reports.split_period('2024-05-01', '2024-05-05', today) == (('2024-05-01', '2024-05-05'), None)
+    assert reports.split_period('2024-05-10', None, today) == (None, ('2024-05-10', '2024-05-10'))
+
+def test_cached_periods_hold_no_names(db):
+    product_id = add_product(db, name='Secret TV')
+    backdated_sale(db, product_id, customer_name='Private Person', contact_number='0300-5550000')
+    rows(db, 'sales', 'Top Products')
+    rows(db, 'customers', 'Top Customers')
+
+    cached = [value for key, (_, _, value) in db.cache._entries.items() if key[0] == 'reports']
+    assert cached
+    text = repr(cached)
+    for detail in ('Secret TV', 'Private Person', '0300-5550000'):
+        assert detail not in text
+
+def test_names_are_read_when_the_report_is_built(db):
+    product_id = add_product(db, name='Old Name')
+    backdated_sale(db, product_id, customer_name='Ali')
+    assert rows(db, 'sales', 'Top Products')[0]['product_name'] == 'Old Name'
+
+    with db.connection() as conn:
+        conn.execute("UPDATE products SET name = 'New Name'")
+        conn.execute("UPDATE customers SET name = 'Ali Raza'")
+        conn.commit()
+
+    top_products = rows(db, 'sales', 'Top Products')
+    assert [(r['product_name'], r['sale_count']) for r in top_products] == [('New Name', 1)]
+    assert rows(db, 'customers', 'Top Customers')[0]['customer_name'] == 'Ali Raza'
+
+def test_closed_periods_follow_other_processes(db):
+    db.cache_recheck_interval = 0
+    product_id = add_product(db)
+    backdated_sale(db, product_id)
+    assert rows(db, 'sales', 'Top Products')[0]['sale_count'] == 1
+
+    other = Database(db.db_file)
+    try:
+        backdated_sale(other, product_id)
+    finally:
+        other.close()
+    assert rows(db, 'sales', 'Top Products')[0]['sale_count'] == 2
+
+def test_report_routes(client):
+    response = client.get('/api/reports/sales.csv')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith('Summary by Sale Type')
+    response = client.get('/api/reports/customers.html')
+    assert '<h3>Top Customers</h3>' in response.get_data(as_text=True)
+    assert client.get('/api/reports/nothing.html').status_code == 400
@@ -0,0 +1,32 @@
+from conftest import add_product, cash_sale, installment_sale
+from models import ProductModel, SaleModel
+
+def rollup(db):
+    with db.connection() as conn:
+        return [tuple(row) for row in conn.execute(
+            'SELECT * FROM sales_daily_rollup ORDER BY sale_date, sale_type, category'
+        )]
+
+def test_incremental_rollup_matches_a_rebuild(db):
+    tv = add_product(db)
+    fan = ProductModel(db).add_product({
+        'name': 'Fan', 'brand': 'Pak', 'model': 'F1', 'category': 'appliances',
+        'price': 5000.0, 'stock': 10, 'description': '', 'features': [], 'tags': []
+    })
+    sales = SaleModel(db)
+    sales.create_cash_sale(cash_sale(tv, amount=1200.5))
+    sales.create_cash_sale(cash_sale(tv, amount=800.25))
+    sales.create_cash_sale(cash_sale(fan, amount=5000.0))
+    sales.create_installment_sale(installment_sale(fan, total_with_markup=3300.0))
+
+    incremental = rollup(db)
+    assert [(r[1], r[2], r[3], r[4]) for r in incremental] == [
+        ('cash', 'appliances', 1, 5000.0),
+        ('cash', 'electronics', 2, 2000.75),
+        ('installment', 'appliances', 1, 3300.0),
+    ]
+    sales.rebuild_sales_rollup()
+    assert rollup(db) == incremental
+    assert {s['sale_type']: s['count'] for s in sales.get_sales_summary()} == {
+        'cash': 3, 'installment': 1
+    }
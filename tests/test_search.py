@@ -0,0 +1,53 @@
+import search
+from models import CustomerModel, ProductModel
+
+def add(db, name, tags=()):
+    return ProductModel(db).add_product({
+        'name': name, 'brand': 'Haier', 'model': 'H1', 'category': 'appliances',
+        'price': 1000.0, 'stock': 1, 'description': '', 'features': [], 'tags': list(tags)
+    })
+
+def indexed(db, term):
+    """Ids the products index matches, read straight from the FTS table"""
+    with db.connection() as conn:
+        rows = conn.execute(
+            'SELECT rowid FROM products_fts WHERE products_fts MATCH ? ORDER BY rowid',
+            (search.match_query(term),)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+def test_match_query_prefixes_every_word():
+    assert search.match_query('split ac') == '"split"* "ac"*'
+    assert search.match_query('say "hi') == '"say"* """hi"*'
+    assert search.match_query(' - ') is None
+
+def test_name_matches_rank_above_tag_matches(db):
+    tagged = add(db, 'Split AC', tags=['inverter'])
+    named = add(db, 'Inverter Fridge')
+    add(db, 'Washing Machine')
+
+    results = ProductModel(db).get_products('invert')
+    assert [p['id'] for p in results] == [named, tagged]
+
+def test_index_follows_updates_and_deletes(db):
+    product_id = add(db, 'Old Name')
+    with db.connection() as conn:
+        conn.execute("UPDATE products SET name = 'Deep Freezer' WHERE id = ?", (product_id,))
+        conn.commit()
+    assert indexed(db, 'old') == []
+    assert indexed(db, 'freezer') == [product_id]
+
+    with db.connection() as conn:
+        conn.execute('DELETE FROM products WHERE id = ?', (product_id,))
+        conn.commit()
+    assert indexed(db, 'freezer') == []
+
+def test_customers_are_found_by_phone_and_cnic(db):
+    model = CustomerModel(db)
+    model.add_customer({'name': 'Ali', 'contact_number': '0300-1234567',
+                        'cnic': '35202-7654321-1', 'address': 'x'})
+    model.add_customer({'name': 'Sara', 'contact_number': '0321-1111111', 'address': 'y'})
+
+    assert [c['name'] for c in model.get_customers('1234567')] == ['Ali']
+    assert [c['name'] for c in model.get_customers('35202')] == ['Ali']
+    assert [c['name'] for c in model.get_customers('sar')] == ['Sara']
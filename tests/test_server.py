@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Fails the import of PyQt6, as on a server without the desktop stack
+BLOCK_QT = '''
+import sys
+class BlockQt:
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] == 'PyQt6':
+            raise ImportError('PyQt6 is not installed')
+sys.meta_path.insert(0, BlockQt())
+'''
+
+def test_servers_import_without_pyqt():
+    result = subprocess.run(
+        [sys.executable, '-c', BLOCK_QT + 'import app, asgi, server, run'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+def test_installment_sale_route_computes_plan(client):
+    product = client.post('/api/products', json={
+        'name': 'TV', 'brand': 'B', 'model': 'M', 'category': 'c', 'price': 1200, 'stock': 2
+    }).get_json()
+    response = client.post('/api/sales/installment', json={
+        'customerName': 'A', 'contactNumber': '0300-1234567', 'cnic': '35202-1234567-1',
+        'address': 'x', 'witnessName': 'W', 'witnessCnic': '35202-7654321-1',
+        'witnessAddress': 'y', 'productId': product['id'], 'markupPercentage': 0,
+        'installmentCount': 12, 'advancePayment': 0
+    })
+    assert response.status_code == 201
+
+def test_serve_falls_back_to_the_dev_server_without_gunicorn(monkeypatch, capsys):
+    import run
+    import server
+
+    started = []
+    monkeypatch.setattr(server, 'missing_requirements', lambda asgi: ['gunicorn'])
+    monkeypatch.setattr(server, 'serve', lambda *args, **kwargs: started.append('gunicorn'))
+    monkeypatch.setattr(run, 'prepare_database', lambda: None)
+    monkeypatch.setattr(run, 'InstallmentModel', lambda db: type('M', (), {'refresh_overdue': None}))
+    monkeypatch.setattr(run, 'PeriodicJob', lambda *args: type('J', (), {'start': lambda self: None})())
+    monkeypatch.setattr(run.app, 'run', lambda **kwargs: started.append('dev'))
+
+    run.serve(run.parse_args(['serve']))
+    assert started == ['dev']
+    assert 'gunicorn not installed' in capsys.readouterr().err
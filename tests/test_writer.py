@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from conftest import add_product, installment_sale
+from models import ProductModel, SaleModel
+from sales import record_installment_sale
+
+def count(db, table):
+    with db.connection() as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+def hold_writer(db):
+    """Block the writer thread until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+
+    def wait():
+        started.set()
+        release.wait(5)
+
+    db.writer.submit(wait)
+    started.wait(5)
+    return release
+
+def test_queued_sales_share_one_commit(db, product_id):
+    release = hold_writer(db)
+    futures = [
+        db.writer.submit_grouped(record_installment_sale,
+                                 installment_sale(product_id, cnic=f'35202-000000{n}-1'))
+        for n in range(5)
+    ]
+    release.set()
+    sale_ids = [future.result(5) for future in futures]
+
+    assert len(set(sale_ids)) == 5
+    assert db.writer.stats()['groups_committed'] == 1
+    assert db.writer.stats()['grouped_jobs'] == 5
+    assert count(db, 'sales') == 5
+
+def test_failed_sale_rolls_back_alone(db, product_id):
+    release = hold_writer(db)
+    good = db.writer.submit_grouped(record_installment_sale, installment_sale(product_id))
+    bad_data = installment_sale(product_id, cnic='35202-9999999-1')
+    del bad_data['witness_name']
+    bad = db.writer.submit_grouped(record_installment_sale, bad_data)
+    release.set()
+
+    assert good.result(5)
+    with pytest.raises(KeyError):
+        bad.result(5)
+    assert count(db, 'sales') == 1
+    assert count(db, 'customers') == 1
+    assert ProductModel(db).get_product(product_id)['stock'] == 9
+
+def test_concurrent_sales_all_commit(db):
+    product_id = add_product(db, stock=40)
+    model = SaleModel(db)
+    errors = []
+
+    def till(n):
+        try:
+            model.create_installment_sale(installment_sale(product_id, cnic=f'{n:013d}'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=till, args=(n,)) for n in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert count(db, 'sales') == 40
+    assert ProductModel(db).get_product(product_id)['stock'] == 0
+
+def test_write_from_writer_thread_runs_inline(db):
+    # A serialized method called from a job on the writer must not wait on itself
+    product_id = db.writer.run(add_product, db)
+    assert ProductModel(db).get_product(product_id) is not None
+
+def test_direct_writes_without_queue(tmp_path):
+    from models import Database
+    database = Database(str(tmp_path / 'direct.db'), serialize_writes=False)
+    try:
+        assert database.writer is None
+        product_id = add_product(database)
+        assert SaleModel(database).create_installment_sale(installment_sale(product_id))
+    finally:
+        database.close()
@@ -0,0 +1,101 @@
+"""Background work for the desktop UI on a QThreadPool.
+
+TaskRunner runs a function on a pool thread and hands the result back to the
+GUI thread through a queued signal. Requests are grouped by key: submitting
+a new request under a key supersedes the previous one, whose result is then
+dropped rather than delivered, so a slow query can never overwrite newer
+data. Database access from the workers goes through the shared connection
+pool, which is safe to use from any thread.
+"""
+import itertools
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, str)
+
+class Worker(QRunnable):
+    def __init__(self, key, request_id, func, args, kwargs):
+        super().__init__()
+        self.key = key
+        self.request_id = request_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = WorkerSignals()
+
+    def run(self):
+        # Superseded before a thread picked it up
+        if self.cancelled:
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.key, self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.key, self.request_id, result)
+
+class TaskRunner(QObject):
+    """Run callables off the GUI thread, keeping only the latest request per key"""
+
+    # True while any request of this runner is in flight
+    busy_changed = pyqtSignal(bool)
+
+    _request_ids = itertools.count(1)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        # key -> (worker, on_result, on_error)
+        self._pending = {}
+
+    def submit(self, key, func, on_result, on_error=None, *args, **kwargs):
+        """Run func(*args, **kwargs) in the pool and pass its result to on_result"""
+        was_busy = self.is_busy()
+        self.cancel(key, notify=False)
+        worker = Worker(key, next(self._request_ids), func, args, kwargs)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.failed.connect(self._on_failed)
+
+        self._pending[key] = (worker, on_result, on_error)
+        self.pool.start(worker)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return worker.request_id
+
+    def cancel(self, key, notify=True):
+        """Drop the request under key; its result will be discarded"""
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending[0].cancelled = True
+            if notify and not self.is_busy():
+                self.busy_changed.emit(False)
+
+    def is_busy(self, key=None):
+        return key in self._pending if key is not None else bool(self._pending)
+
+    def _take(self, key, request_id):
+        pending = self._pending.get(key)
+        if pending is None or pending[0].request_id != request_id:
+            # Superseded or cancelled; the result is stale
+            return None
+        del self._pending[key]
+        if not self._pending:
+            self.busy_changed.emit(False)
+        return pending
+
+    @pyqtSlot(str, int, object)
+    def _on_finished(self, key, request_id, result):
+        pending = self._take(key, request_id)
+        if pending is not None:
+            pending[1](result)
+
+    @pyqtSlot(str, int, str)
+    def _on_failed(self, key, request_id, message):
+        pending = self._take(key, request_id)
+        if pending is not None and pending[2] is not None:
+            pending[2](message)
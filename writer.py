@@ -0,0 +1,185 @@
+"""Single-writer queue that serializes a Database's writes on one thread.
+
+SQLite allows one writer at a time, so concurrent writers in a process
+only wait on each other's locks, or fail with "database is locked" once
+busy_timeout runs out. Instead, model write methods marked @serialized
+hand their call to the Database's WriteQueue and wait for its result. The
+queue's thread runs them one after another.
+
+Sales are group-committed. While the writer is busy, sales submitted with
+submit_grouped queue up. The writer then takes every queued sale into one
+transaction, runs each inside its own savepoint and commits once, so one
+fsync covers the burst. A sale that fails rolls back only its savepoint,
+and its caller gets the exception. Results are handed back only after
+the commit.
+"""
+import functools
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH = 64
+
+class _Job:
+    def __init__(self, func, args, kwargs, grouped):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.grouped = grouped
+        self.future = Future()
+
+_STOP = object()
+
+class WriteQueue:
+    def __init__(self, db, max_batch=DEFAULT_MAX_BATCH):
+        self.db = db
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # A non-grouped job taken while collecting a group, run next
+        self._held = None
+        self.groups_committed = 0
+        self.grouped_jobs = 0
+
+    def in_writer(self):
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _submit(self, job):
+        if self.in_writer():
+            # A write made by a job already on the writer thread runs inline
+            try:
+                job.future.set_result(job.func(*job.args, **job.kwargs))
+            except Exception as e:
+                job.future.set_exception(e)
+            return job.future
+        self._start()
+        self._queue.put(job)
+        return job.future
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs), which commits its own transaction; returns a Future"""
+        return self._submit(_Job(func, args, kwargs, grouped=False))
+
+    def submit_grouped(self, func, *args, **kwargs):
+        """Queue func(cursor, *args, **kwargs) to run inside a shared, group-committed
+        transaction; func must not commit. Returns a Future.
+        """
+        if self.in_writer():
+            # Called from a job already on the writer thread: run it there and then
+            return self._submit(_Job(self._commit_alone, (func,) + args, kwargs, grouped=False))
+        return self._submit(_Job(func, args, kwargs, grouped=True))
+
+    def run(self, func, *args, **kwargs):
+        return self.submit(func, *args, **kwargs).result()
+
+    def run_grouped(self, func, *args, **kwargs):
+        return self.submit_grouped(func, *args, **kwargs).result()
+
+    def close(self, timeout=10.0):
+        """Finish the queued writes and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _next(self):
+        if self._held is not None:
+            job, self._held = self._held, None
+            return job
+        return self._queue.get()
+
+    def _run(self):
+        while True:
+            job = self._next()
+            if job is _STOP:
+                return
+            if not job.grouped:
+                self._run_job(job)
+                continue
+
+            # Everything already waiting joins this group; stop at a non-grouped job
+            group = [job]
+            while len(group) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP or not job.grouped:
+                    self._held = job
+                    break
+                group.append(job)
+            self._run_group(group)
+
+    def _commit_alone(self, func, *args, **kwargs):
+        with self.db.connection() as conn:
+            result = func(conn.cursor(), *args, **kwargs)
+            conn.commit()
+            return result
+
+    def _run_job(self, job):
+        try:
+            job.future.set_result(job.func(*job.args, **job.kwargs))
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _run_group(self, group):
+        outcomes = []
+        try:
+            with self.db.connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                c = conn.cursor()
+                for job in group:
+                    c.execute('SAVEPOINT grouped_write')
+                    try:
+                        outcomes.append((True, job.func(c, *job.args, **job.kwargs)))
+                    except Exception as e:
+                        c.execute('ROLLBACK TO grouped_write')
+                        outcomes.append((False, e))
+                    c.execute('RELEASE grouped_write')
+                conn.commit()
+        except Exception as e:
+            if isinstance(e, sqlite3.Error) and len(group) > 1:
+                # Commit each on its own so one failure does not sink the rest
+                for job in group:
+                    self._run_group([job])
+                return
+            for job in group:
+                job.future.set_exception(e)
+            return
+
+        self.groups_committed += 1
+        self.grouped_jobs += len(group)
+        for job, (ok, value) in zip(group, outcomes):
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+    def stats(self):
+        return {
+            'groups_committed': self.groups_committed,
+            'grouped_jobs': self.grouped_jobs,
+            'average_group': round(self.grouped_jobs / self.groups_committed, 2)
+            if self.groups_committed else None,
+            'queued': self._queue.qsize()
+        }
+
+def serialized(method):
+    """Run a model write method on its Database's writer thread, if it has one"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        writer = self.db.writer
+        if writer is None:
+            return method(self, *args, **kwargs)
+        return writer.run(method, self, *args, **kwargs)
+    return wrapper